@@ -0,0 +1,223 @@
+"""
+Hot-path benchmark
+
+Builds a database from synthetic data at each size and times:
+
+* import: CSV import into an empty database (database.importer)
+* sync_unchanged: syncing the same CSV again, so every row is compared and none written
+* get_all_students: loading every student into a StudentTable
+* preprocess_data: loading the students frame and preprocessing it
+* train_model: fitting a decision tree on the default features
+* chart_aggregation: rebuilding the aggregate tables and loading every chart
+
+Each step also records its peak Python/NumPy allocation (tracemalloc, in a
+separate untimed pass so tracing does not skew the times). Results are
+compared against a stored baseline and regressions beyond the tolerance
+are flagged.
+
+Usage::
+
+    python -m benchmarks.hot_paths --sizes 10000 100000
+    python -m benchmarks.hot_paths --save-baseline
+    python -m benchmarks.hot_paths --check      # exit 1 on regressions
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import write_csv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+DATA_DIR = os.path.join(os.environ.get('STUDENT_CACHE_DIR', os.path.join(ROOT, 'cache')), 'benchmarks')
+
+# Differences smaller than this are noise, whatever the relative change
+NOISE_FLOOR = {'seconds': 0.02, 'peak_mb': 1.0}
+
+
+def _step_import(csv_path):
+    from database.importer import import_csv
+    import_csv(csv_path)
+
+
+def _step_sync(csv_path):
+    from database.importer import sync_csv
+    sync_csv(csv_path)
+
+
+def _step_get_all_students(csv_path):
+    from database.db_operations import get_all_students
+    get_all_students()
+
+
+def _step_preprocess(csv_path):
+    from database.db_operations import get_students_frame
+    from utils.data_processor import preprocess_data
+    preprocess_data(get_students_frame(), 'mean', 'standard')
+
+
+def _step_train(csv_path):
+    from database.db_operations import get_students_frame
+    from utils.ml_models import DEFAULT_FEATURES, train_model
+    df = get_students_frame(columns=DEFAULT_FEATURES + ['performance_category'])
+    train_model(df[DEFAULT_FEATURES], df['performance_category'])
+
+
+def _step_chart_aggregation(csv_path):
+    from database.aggregates import rebuild_aggregates
+    from database.connection import transaction
+    from utils.charts import CHART_TYPES, load_chart_data
+    with transaction() as conn:
+        rebuild_aggregates(conn)
+    for chart_type in CHART_TYPES:
+        load_chart_data(chart_type)
+
+
+STEPS = [
+    ('import', _step_import),
+    ('sync_unchanged', _step_sync),
+    ('get_all_students', _step_get_all_students),
+    ('preprocess_data', _step_preprocess),
+    ('train_model', _step_train),
+    ('chart_aggregation', _step_chart_aggregation),
+]
+
+
+def _warm_up():
+    """Import the heavy libraries up front so no step pays for them"""
+    import pandas  # noqa: F401
+    import sklearn.tree  # noqa: F401
+    import sklearn.naive_bayes  # noqa: F401
+    import sklearn.model_selection  # noqa: F401
+    import utils.ml_models  # noqa: F401
+    import utils.charts  # noqa: F401
+
+
+def _time(fn, *args) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def _peak_mb(fn, *args) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def synthetic_csv(size: int, seed: int = 0) -> str:
+    """Path of the synthetic CSV for ``size`` students, generating it once"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"students_{size}_{seed}.csv")
+    if not os.path.exists(path):
+        write_csv(size, path + '.tmp', seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def run_size(size: int, repeat: int = 1, memory: bool = True) -> dict:
+    """Benchmark every step against a fresh database of ``size`` students"""
+    from database.connection import configure, get_pool
+    from database.db_operations import initialize_database
+
+    csv_path = synthetic_csv(size)
+    _warm_up()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, 'bench.db'))
+        initialize_database()
+        for name, step in STEPS:
+            # Best of ``repeat``: the minimum is the least noisy estimate
+            seconds = min(_time(step, csv_path) for _ in range(repeat))
+            results[name] = {'seconds': seconds}
+            if memory:
+                results[name]['peak_mb'] = _peak_mb(step, csv_path)
+        # Release the pooled connections before the directory is removed
+        get_pool().close()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """(size, step, metric, current, baseline) for every metric over tolerance"""
+    regressions = []
+    for size, steps in results.items():
+        for step, metrics in steps.items():
+            reference = baseline.get(size, {}).get(step, {})
+            for metric, value in metrics.items():
+                before = reference.get(metric)
+                if before and value > before * (1 + tolerance) \
+                        and value - before > NOISE_FLOOR[metric]:
+                    regressions.append((size, step, metric, value, before))
+    return regressions
+
+
+def _print_results(results: dict, baseline: dict):
+    print(f"{'students':>10} {'step':<18} {'seconds':>9} {'vs base':>8} {'peak MB':>9} {'vs base':>8}")
+    for size, steps in results.items():
+        for step, metrics in steps.items():
+            reference = baseline.get(size, {}).get(step, {})
+            cells = []
+            for metric, fmt in (('seconds', '9.3f'), ('peak_mb', '9.1f')):
+                value, before = metrics.get(metric), reference.get(metric)
+                cells.append(format(value, fmt) if value is not None else ' ' * 9)
+                cells.append(f"{(value / before - 1):+8.0%}" if value is not None and before else ' ' * 8)
+            print(f"{int(size):>10,} {step:<18} " + " ".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=1, help="Timed runs per step (best is kept)")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the peak memory pass")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store these results as the baseline for their sizes")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown or growth before flagging (default 20%%)")
+    parser.add_argument('--check', action='store_true', help="Exit with status 1 on regressions")
+    parser.add_argument('--json', help="Append the results as a JSON line to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        baseline = {}
+
+    results = {}
+    for size in args.sizes:
+        print(f"Benchmarking {size:,} students...", file=sys.stderr)
+        results[str(size)] = run_size(size, args.repeat, memory=not args.no_memory)
+    _print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, 'a') as f:
+            f.write(json.dumps({'timestamp': time.time(), 'results': results}) + '\n')
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    for size, step, metric, value, before in regressions:
+        print(f"REGRESSION {int(size):,} students {step} {metric}: {value:.3f} vs baseline {before:.3f}")
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Startup-time benchmark
+
+Launches the GUI in fresh interpreters and records:
+
+* time-to-login-window: process spawn until the login window is shown
+* time-to-first-table: MainWindow construction until the first page of
+  the student table is loaded
+
+Usage::
+
+    python -m benchmarks.startup --runs 5 --offscreen
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import sys, time
+t0 = float(sys.argv[1])
+from PyQt5.QtWidgets import QApplication
+from database.db_operations import initialize_database
+from ui.login_window import LoginWindow
+initialize_database()
+app = QApplication(sys.argv[:1])
+login = LoginWindow()
+login.show()
+app.processEvents()
+print("login", time.time() - t0, flush=True)
+
+t1 = time.time()
+from ui.main_window import MainWindow
+window = MainWindow(1, "admin")
+window.show()
+app.processEvents()
+print("table", time.time() - t1, window.student_model.rowCount(), flush=True)
+window.jobs.wait()
+'''
+
+
+def run_once(env) -> dict:
+    start = time.time()
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD, repr(start)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = {}
+    for line in out.splitlines():
+        parts = line.split()
+        if parts and parts[0] == 'login':
+            result['time_to_login_window'] = float(parts[1])
+        elif parts and parts[0] == 'table':
+            result['time_to_first_table'] = float(parts[1])
+            result['rows_in_first_page'] = int(parts[2])
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--db', help="Database to open (defaults to STUDENT_DB_PATH)")
+    parser.add_argument('--offscreen', action='store_true', help="Use Qt's offscreen platform")
+    parser.add_argument('--json', help="Append the summary as a JSON line to this file")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if args.db:
+        env['STUDENT_DB_PATH'] = os.path.abspath(args.db)
+    if args.offscreen:
+        env['QT_QPA_PLATFORM'] = 'offscreen'
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    summary = {'timestamp': time.time(), 'runs': args.runs}
+    for metric in ('time_to_login_window', 'time_to_first_table'):
+        values = [r[metric] for r in runs]
+        summary[metric] = {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+        print(f"{metric:<22} median {summary[metric]['median'] * 1000:8.1f} ms  "
+              f"(min {summary[metric]['min'] * 1000:.1f}, max {summary[metric]['max'] * 1000:.1f})")
+
+    if args.json:
+        with open(args.json, 'a') as f:
+            f.write(json.dumps(summary) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+"""
+Headless command-line interface
+
+Runs the import, preprocessing, training, prediction, charting and
+reporting steps without PyQt5, e.g.::
+
+    python cli.py --db school_a.db import train.csv
+    python cli.py train --model naive_bayes
+    python cli.py chart distribution --output distribution.png
+"""
+import argparse
+import sys
+import time
+
+from database.connection import configure
+from database.db_operations import initialize_database
+
+CHART_NAMES = {
+    'distribution': "Performance Distribution",
+    'gender': "Score by Gender",
+    'absences': "Absences vs Score",
+}
+
+MODEL_TYPES = ['decision_tree', 'naive_bayes']
+
+
+def cmd_import(args):
+    if args.sync:
+        return _sync(args)
+    if args.delete_missing:
+        sys.exit("--delete-missing only applies with --sync")
+    from database.importer import import_csv
+
+    result = import_csv(args.file, chunksize=args.chunksize)
+    print(f"Imported {result.rows} students in {result.seconds:.2f}s "
+          f"({result.rows_per_second:,.0f} rows/s)")
+
+
+def _sync(args):
+    from database.importer import sync_csv
+
+    result = sync_csv(args.file, delete_missing=args.delete_missing, chunksize=args.chunksize)
+    print(f"Synced {result.rows} rows in {result.seconds:.2f}s ({result.rows_per_second:,.0f} rows/s): "
+          f"{result.inserted} inserted, {result.updated} updated, {result.unchanged} unchanged, "
+          f"{result.deleted} deleted")
+
+
+def cmd_preprocess(args):
+    from database.snapshot import snapshot_with_version
+    from utils.data_processor import build_preprocessed, save_preprocessed
+
+    scaling = args.scaling or ('standard' if args.normalize else None)
+    table, version = snapshot_with_version()
+    data = build_preprocessed(table.to_frame(), args.missing, scaling, data_version=version)
+    save_preprocessed(data)
+    print(f"Fitted preprocessing on {len(data.features)} students "
+          f"({data.features.shape[1]} features)")
+    if args.output:
+        frame = data.features.copy()
+        frame.insert(0, 'student_id', data.student_ids)
+        frame['performance_category'] = data.target
+        frame.to_csv(args.output, index=False)
+        print(f"Wrote {len(frame)} preprocessed rows to {args.output}")
+
+
+def cmd_train(args):
+    if args.segment_by:
+        if args.streaming or args.csv:
+            sys.exit("--segment-by cannot be combined with --streaming or --csv")
+        return _train_segmented(args)
+    if args.streaming or args.csv:
+        return _train_streaming(args)
+
+    from utils.model_registry import ModelRegistry, get_or_train
+
+    if args.preprocessed:
+        from utils.data_processor import load_preprocessed
+
+        data = load_preprocessed()
+        if data is None:
+            sys.exit("No up-to-date preprocessed data found; run 'preprocess' first")
+        X, y, preprocessor, version = data.features, data.target, data.pipeline, data.data_version
+    else:
+        from database.snapshot import snapshot_with_version
+
+        table, version = snapshot_with_version(args.features + ['performance_category'])
+        df = table.to_frame()
+        X, y, preprocessor = df[args.features], df['performance_category'], None
+    model, accuracy, cached = get_or_train(ModelRegistry(), X, y, args.model, preprocessor,
+                                           data_version=version)
+    source = "Reused saved" if cached else "Trained"
+    print(f"{source} {args.model} model on {len(X)} samples "
+          f"({X.shape[1]} features), accuracy {accuracy:.2%}")
+
+
+def _train_segmented(args):
+    from utils.segmented import train_segments
+
+    preprocessor = None
+    if args.preprocessed:
+        from utils.data_processor import load_preprocessed
+
+        data = load_preprocessed()
+        if data is None:
+            sys.exit("No up-to-date preprocessed data found; run 'preprocess' first")
+        preprocessor = data.pipeline
+    result = train_segments(args.segment_by, args.features, args.model, preprocessor,
+                            max_workers=args.jobs)
+    print(result.results.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"Trained {len(result.models)} {args.model} models by {args.segment_by} "
+          f"in {result.seconds:.2f}s, weighted accuracy {result.accuracy:.2%}")
+    if args.results:
+        result.save(args.results)
+        print(f"Wrote per-segment results to {args.results}")
+
+
+def _train_streaming(args):
+    import uuid
+    from utils.ml_models import train_model_streaming, student_batches, csv_batches
+    from utils.model_registry import ModelRegistry
+
+    if args.csv:
+        batches = csv_batches(args.csv, args.features, batch_size=args.batch_size)
+    else:
+        batches = student_batches(args.features, batch_size=args.batch_size)
+
+    def report(rows, rate):
+        print(f"\r{rows:,} rows ({rate:,.0f} rows/s)", end='', file=sys.stderr, flush=True)
+
+    model, accuracy = train_model_streaming(batches, args.model, progress=report)
+    print(file=sys.stderr)
+    stats = model.training_stats_
+    # Streamed data is never fingerprinted as a whole, so each run is its own entry
+    ModelRegistry().put(model, args.model, args.features, uuid.uuid4().hex, accuracy)
+    print(f"Trained {args.model} model incrementally on {stats['rows']:,} rows "
+          f"({stats['rows_per_second']:,.0f} rows/s), accuracy {accuracy:.2%} "
+          f"on {stats['test_rows']:,} held-out rows")
+
+
+def cmd_tune(args):
+    from utils.model_registry import ModelRegistry, version_fingerprint
+    from database.snapshot import snapshot_with_version
+    from utils.model_selection import search_models
+
+    table, version = snapshot_with_version(args.features + ['performance_category'])
+    df = table.to_frame()
+    X, y = df[args.features], df['performance_category']
+    result = search_models(
+        X, y, model_types=args.models, search=args.search, n_iter=args.n_iter,
+        cv=args.cv, n_jobs=args.jobs, time_budget=args.time_budget,
+        early_stopping=not args.no_early_stopping,
+    )
+    print(result.results.head(args.top).to_string(index=False))
+    print(f"Best: {result.model_type} {result.best_params} "
+          f"(mean CV accuracy {result.best_score:.2%})")
+    if args.results:
+        result.save(args.results)
+        print(f"Wrote search results to {args.results}")
+    if args.save:
+        ModelRegistry().put(result.best_model, result.model_type, args.features,
+                            version_fingerprint(version, args.features), result.best_score)
+        print("Saved the best model to the registry")
+
+
+def cmd_predict(args):
+    from utils.model_registry import ModelRegistry
+    from utils.predictor import predict_csv, score_students
+
+    entry = ModelRegistry().latest(args.model)
+    if entry is None:
+        sys.exit("No trained model found; run 'train' first")
+
+    if args.csv:
+        if not args.output:
+            sys.exit("--output is required with --csv")
+        result = predict_csv(entry.model, args.csv, args.output, chunksize=args.chunksize)
+        target = args.output
+    else:
+        result = score_students(entry.model, batch_size=args.chunksize)
+        target = "the students table"
+    print(f"Predicted {result.rows} students into {target} in {result.seconds:.2f}s "
+          f"({result.rows_per_second:,.0f} rows/s)")
+
+
+def cmd_chart(args):
+    # Figure without pyplot renders through Agg; no GUI backend is loaded
+    from matplotlib.figure import Figure
+    from utils.charts import load_chart_data, draw_chart
+
+    chart_type = CHART_NAMES[args.chart]
+    figure = Figure(figsize=(8, 5), dpi=100)
+    density = {'auto': None, 'on': True, 'off': False}[args.density]
+    draw_chart(figure, chart_type, load_chart_data(chart_type), density=density)
+    figure.savefig(args.output)
+    print(f"Saved {chart_type} chart to {args.output}")
+
+
+def cmd_bands(args):
+    from database.categories import (DEFAULT_BANDS, ScoreBands, get_score_bands,
+                                     recategorize_students, set_score_bands)
+
+    if args.thresholds or args.reset:
+        if not args.location:
+            sys.exit("--location is required to change score bands")
+        bands = None if args.reset else ScoreBands(args.thresholds, args.labels or DEFAULT_BANDS.labels)
+        updated = set_score_bands(args.location, bands)
+        print(f"Recategorized {updated} students")
+    elif args.recategorize:
+        print(f"Recategorized {recategorize_students()} students")
+
+    print(f"default: {DEFAULT_BANDS.thresholds} -> {DEFAULT_BANDS.labels}")
+    for location, bands in sorted(get_score_bands().items()):
+        print(f"{location}: {bands.thresholds} -> {bands.labels}")
+
+
+def cmd_report(args):
+    from utils.reports import REPORT_NAMES, build_report, export_report, generate_school_reports
+
+    report_type = REPORT_NAMES[args.report]
+    model = accuracy = None
+    if args.report == 'model':
+        from utils.model_registry import ModelRegistry
+
+        entry = ModelRegistry().latest(args.model)
+        if entry is None:
+            sys.exit("No trained model found; run 'train' first")
+        model, accuracy = entry.model, entry.accuracy
+
+    if args.per_school:
+        if not args.output:
+            sys.exit("--output (a directory) is required with --per-school")
+        results = generate_school_reports(report_type, args.output, args.format or 'pdf',
+                                          model, accuracy, max_workers=args.jobs)
+        for result in results:
+            print(f"Wrote {result.rows:,} rows to {result.path}")
+        return
+
+    report = build_report(report_type, args.location, model, accuracy)
+    if args.output:
+        result = export_report(report, args.output, args.format)
+        print(f"Wrote {report_type} report ({result.rows:,} rows) to {args.output} "
+              f"in {result.seconds:.2f}s ({result.rows_per_second:,.0f} rows/s)")
+    else:
+        print(report.preview(args.rows))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Student performance prediction (headless)")
+    parser.add_argument('--db', help="SQLite database file (default: STUDENT_DB_PATH or student_performance.db)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('import', help="Replace the students table with a CSV file")
+    p.add_argument('file')
+    p.add_argument('--chunksize', type=int, default=50_000)
+    p.add_argument('--sync', action='store_true',
+                   help="Update the table in place, writing only new and changed rows (matched on S/N)")
+    p.add_argument('--delete-missing', action='store_true',
+                   help="With --sync, delete students whose S/N is not in the file")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('preprocess', help="Fit and save imputation, scaling and encoding for all features")
+    p.add_argument('--missing', choices=['drop', 'mean', 'median'], default='drop')
+    p.add_argument('--scaling', choices=['minmax', 'standard'])
+    p.add_argument('--normalize', action='store_true', help="Same as --scaling standard")
+    p.add_argument('--output', help="Also write the preprocessed features to this CSV file")
+    p.set_defaults(func=cmd_preprocess)
+
+    p = sub.add_parser('train', help="Train (or reuse) a model and report its accuracy")
+    p.add_argument('--model', choices=MODEL_TYPES, default=None,
+                   help="Defaults to decision_tree, or naive_bayes when streaming")
+    p.add_argument('--features', nargs='+', default=None)
+    p.add_argument('--streaming', action='store_true',
+                   help="Train incrementally in batches (bounded memory, partial_fit models only)")
+    p.add_argument('--csv', help="Stream training data from this CSV file (implies --streaming)")
+    p.add_argument('--batch-size', type=int, default=50_000)
+    p.add_argument('--preprocessed', action='store_true',
+                   help="Train on every feature saved by 'preprocess' instead of --features")
+    p.add_argument('--segment-by', metavar='COLUMN',
+                   help="Train one model per value of this column (e.g. location) in parallel")
+    p.add_argument('--jobs', type=int, help="Worker processes for --segment-by (default: one per core)")
+    p.add_argument('--results', help="Write the per-segment table for --segment-by (.csv or .json)")
+    p.set_defaults(func=cmd_train)
+
+    p = sub.add_parser('tune', help="Cross-validated hyperparameter search across all cores")
+    p.add_argument('--models', nargs='+', choices=MODEL_TYPES, default=MODEL_TYPES)
+    p.add_argument('--features', nargs='+', default=None)
+    p.add_argument('--search', choices=['grid', 'random'], default='grid')
+    p.add_argument('--n-iter', type=int, default=20, help="Samples per model for random search")
+    p.add_argument('--cv', type=int, default=5)
+    p.add_argument('--jobs', type=int, default=-1)
+    p.add_argument('--time-budget', type=float, help="Stop starting new folds after this many seconds")
+    p.add_argument('--no-early-stopping', action='store_true')
+    p.add_argument('--top', type=int, default=10, help="Rows of the results table to print")
+    p.add_argument('--results', help="Write the full results table (.csv or .json)")
+    p.add_argument('--save', action='store_true', help="Store the best model in the registry")
+    p.set_defaults(func=cmd_tune)
+
+    p = sub.add_parser('predict', help="Score students with the most recent model")
+    p.add_argument('--model', choices=MODEL_TYPES, default=None)
+    p.add_argument('--csv', help="Score this CSV file instead of the database")
+    p.add_argument('--output', help="Output CSV for --csv")
+    p.add_argument('--chunksize', type=int, default=50_000)
+    p.set_defaults(func=cmd_predict)
+
+    p = sub.add_parser('chart', help="Render a chart to an image or PDF file")
+    p.add_argument('chart', choices=list(CHART_NAMES))
+    p.add_argument('--output', required=True)
+    p.add_argument('--density', choices=['auto', 'on', 'off'], default='auto',
+                   help="Histogram rendering for 'absences' (auto switches on for large cohorts)")
+    p.set_defaults(func=cmd_chart)
+
+    p = sub.add_parser('bands', help="Show or change per-school (location) score bands")
+    p.add_argument('--location', help="School location whose bands to change")
+    p.add_argument('--thresholds', nargs='+', type=float,
+                   help="Ascending lower bounds of each band above the lowest")
+    p.add_argument('--labels', nargs='+', help="One label per band, lowest first")
+    p.add_argument('--reset', action='store_true', help="Return the location to the default bands")
+    p.add_argument('--recategorize', action='store_true',
+                   help="Recompute every student's category from their score")
+    p.set_defaults(func=cmd_bands)
+
+    p = sub.add_parser('report', help="Print or export a report (CSV, Excel or PDF)")
+    p.add_argument('report', nargs='?', choices=['summary', 'statistics', 'model'], default='summary')
+    p.add_argument('--output', help="File to write (format from the extension) instead of printing; "
+                                    "a directory with --per-school")
+    p.add_argument('--format', choices=['csv', 'xlsx', 'pdf'])
+    p.add_argument('--location', help="Report on one school (location) only")
+    p.add_argument('--per-school', action='store_true',
+                   help="Write one report per school into --output, in parallel processes")
+    p.add_argument('--jobs', type=int, help="Worker processes for --per-school (default: one per core)")
+    p.add_argument('--model', choices=MODEL_TYPES, default=None, help="Model for the 'model' report")
+    p.add_argument('--rows', type=int, default=10, help="Rows per section when printing")
+    p.set_defaults(func=cmd_report)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        configure(args.db)
+    if getattr(args, 'features', False) is None:
+        from utils.ml_models import DEFAULT_FEATURES
+        args.features = DEFAULT_FEATURES
+    if args.command == 'train' and args.model is None:
+        args.model = 'naive_bayes' if args.streaming or args.csv else 'decision_tree'
+
+    start = time.perf_counter()
+    initialize_database()
+    try:
+        args.func(args)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    print(f"Done in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+import sqlite3
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
+from .connection import connection
+from .hashing import HASHED_COLUMNS, row_hash_sql
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Materialized chart aggregates. Each entry: table DDL, the columns whose
+# updates affect it, and the SQL to add (+1) or remove (-1) one student
+# (written against the trigger row alias ``{row}``).
+AGGREGATES = {
+    'agg_category_counts': (
+        """CREATE TABLE IF NOT EXISTS agg_category_counts (
+            performance_category TEXT PRIMARY KEY,
+            n INTEGER NOT NULL
+        )""",
+        ['performance_category'],
+        """INSERT INTO agg_category_counts (performance_category, n)
+            VALUES (COALESCE({row}.performance_category, ''), {sign})
+            ON CONFLICT (performance_category) DO UPDATE SET n = n + excluded.n;""",
+    ),
+    'agg_group_scores': (
+        """CREATE TABLE IF NOT EXISTS agg_group_scores (
+            group_column TEXT NOT NULL,
+            group_value TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            score_sum INTEGER NOT NULL,
+            PRIMARY KEY (group_column, group_value)
+        )""",
+        ['gender', 'location', 'score'],
+        """INSERT INTO agg_group_scores (group_column, group_value, n, score_sum)
+            SELECT 'gender', COALESCE({row}.gender, ''), {sign}, {sign} * {row}.score
+            WHERE {row}.score IS NOT NULL
+            ON CONFLICT (group_column, group_value) DO UPDATE
+            SET n = n + excluded.n, score_sum = score_sum + excluded.score_sum;
+        INSERT INTO agg_group_scores (group_column, group_value, n, score_sum)
+            SELECT 'location', COALESCE({row}.location, ''), {sign}, {sign} * {row}.score
+            WHERE {row}.score IS NOT NULL
+            ON CONFLICT (group_column, group_value) DO UPDATE
+            SET n = n + excluded.n, score_sum = score_sum + excluded.score_sum;""",
+    ),
+    'agg_absence_score': (
+        """CREATE TABLE IF NOT EXISTS agg_absence_score (
+            absences INTEGER NOT NULL,
+            score INTEGER NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (absences, score)
+        ) WITHOUT ROWID""",
+        ['absences', 'score'],
+        """INSERT INTO agg_absence_score (absences, score, n)
+            SELECT {row}.absences, {row}.score, {sign}
+            WHERE {row}.absences IS NOT NULL AND {row}.score IS NOT NULL
+            ON CONFLICT (absences, score) DO UPDATE SET n = n + excluded.n;""",
+    ),
+}
+
+# Bulk loaders set this flag, skip the per-row triggers and call
+# rebuild_aggregates() once at the end of their transaction.
+AGGREGATE_STATE_DDL = """CREATE TABLE IF NOT EXISTS agg_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bulk_load INTEGER NOT NULL DEFAULT 0
+)"""
+
+
+BULK_LOAD_GUARD = "(SELECT bulk_load FROM agg_state WHERE id = 1) = 0"
+
+BUMP_VERSION_SQL = "UPDATE agg_state SET version = version + 1 WHERE id = 1"
+
+
+def _aggregate_triggers(table: str, columns: List[str], delta_sql: str) -> List[str]:
+    guard = BULK_LOAD_GUARD
+    add = delta_sql.format(row='NEW', sign='1')
+    remove = delta_sql.format(row='OLD', sign='-1')
+    prune = f"DELETE FROM {table} WHERE n = 0;"
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON students
+            WHEN {guard}
+            BEGIN {add} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON students
+            WHEN {guard}
+            BEGIN {remove} {prune} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_update
+            AFTER UPDATE OF {', '.join(columns)} ON students
+            WHEN {guard}
+            BEGIN {remove} {add} {prune} END""",
+    ]
+
+
+def rebuild_aggregates(conn: sqlite3.Connection):
+    """Recompute every aggregate table from the students table"""
+    conn.execute("DELETE FROM agg_category_counts")
+    conn.execute("""INSERT INTO agg_category_counts (performance_category, n)
+        SELECT COALESCE(performance_category, ''), COUNT(*)
+        FROM students GROUP BY 1""")
+    conn.execute("DELETE FROM agg_group_scores")
+    for column in ('gender', 'location'):
+        conn.execute(f"""INSERT INTO agg_group_scores (group_column, group_value, n, score_sum)
+            SELECT '{column}', COALESCE({column}, ''), COUNT(*), SUM(score)
+            FROM students WHERE score IS NOT NULL GROUP BY 2""")
+    conn.execute("DELETE FROM agg_absence_score")
+    conn.execute("""INSERT INTO agg_absence_score (absences, score, n)
+        SELECT absences, score, COUNT(*) FROM students
+        WHERE absences IS NOT NULL AND score IS NOT NULL GROUP BY 1, 2""")
+
+
+def create_aggregates(conn: sqlite3.Connection):
+    """Create the aggregate tables and triggers and fill them from students"""
+    conn.execute(AGGREGATE_STATE_DDL)
+    conn.execute("INSERT OR IGNORE INTO agg_state (id, bulk_load) VALUES (1, 0)")
+    for table, (ddl, columns, delta_sql) in AGGREGATES.items():
+        conn.execute(ddl)
+        for trigger in _aggregate_triggers(table, columns, delta_sql):
+            conn.execute(trigger)
+    rebuild_aggregates(conn)
+
+
+def create_data_version(conn: sqlite3.Connection):
+    """
+    Add a counter that changes whenever the students table does
+
+    ``epoch`` is random per database, so a copied or replaced file never
+    passes for another one with the same version number. Caches derived
+    from students (such as the columnar snapshot) are keyed on both.
+    """
+    conn.execute("ALTER TABLE agg_state ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE agg_state ADD COLUMN epoch TEXT")
+    conn.execute("UPDATE agg_state SET epoch = lower(hex(randomblob(8))) WHERE id = 1")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS students_version_{event.lower()}
+            AFTER {event} ON students
+            WHEN {BULK_LOAD_GUARD}
+            BEGIN {BUMP_VERSION_SQL}; END""")
+
+
+def create_change_log(conn: sqlite3.Connection):
+    """
+    Record which students changed at which version, and a content hash per row
+
+    See get_changes() and database.hashing.
+    """
+    conn.execute("ALTER TABLE agg_state ADD COLUMN bulk_version INTEGER NOT NULL DEFAULT 0")
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS student_changes (
+        student_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL,
+        operation TEXT NOT NULL
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_student_changes_version "
+                 "ON student_changes (version)")
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS student_hashes (
+        student_id INTEGER PRIMARY KEY,
+        hash INTEGER NOT NULL
+    )
+    ''')
+    create_change_triggers(conn)
+    rebuild_hashes(conn)
+    conn.execute("UPDATE agg_state SET bulk_version = version WHERE id = 1")
+
+
+def create_change_triggers(conn: sqlite3.Connection):
+    """
+    (Re)create the students triggers that maintain the change log
+
+    They are plain SQL, so any SQLite client can still write to students.
+    Row hashes need the row_hash() function that only pooled connections
+    have, so they are computed by the Python write paths (bulk_load(),
+    refresh_hashes()); the triggers only drop the hash of a row whose
+    hashed columns change, leaving it missing rather than stale after a
+    write from elsewhere.
+    """
+    def log(row, operation, when="1"):
+        return (f"INSERT INTO student_changes (student_id, version, operation) "
+                f"SELECT {row}.student_id, version, '{operation}' FROM agg_state "
+                f"WHERE id = 1 AND {when} "
+                f"ON CONFLICT (student_id) DO UPDATE "
+                f"SET version = excluded.version, operation = excluded.operation;")
+
+    for trigger in ('version_insert', 'version_update', 'version_delete', 'hash_update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS students_{trigger}")
+    conn.execute(f"""CREATE TRIGGER students_version_insert AFTER INSERT ON students
+        WHEN {BULK_LOAD_GUARD}
+        BEGIN {BUMP_VERSION_SQL}; {log('NEW', 'insert')} END""")
+    conn.execute(f"""CREATE TRIGGER students_version_update AFTER UPDATE ON students
+        WHEN {BULK_LOAD_GUARD}
+        BEGIN {BUMP_VERSION_SQL};
+            {log('OLD', 'delete', when='OLD.student_id IS NOT NEW.student_id')}
+            {log('NEW', 'update')}
+        END""")
+    conn.execute(f"""CREATE TRIGGER students_version_delete AFTER DELETE ON students
+        WHEN {BULK_LOAD_GUARD}
+        BEGIN {BUMP_VERSION_SQL}; {log('OLD', 'delete')}
+            DELETE FROM student_hashes WHERE student_id = OLD.student_id;
+        END""")
+    # Scoring or recategorizing only sets performance_category, which is
+    # not hashed, so those updates keep their hashes
+    conn.execute(f"""CREATE TRIGGER students_hash_update
+        AFTER UPDATE OF {', '.join(HASHED_COLUMNS)} ON students
+        WHEN {BULK_LOAD_GUARD}
+        BEGIN DELETE FROM student_hashes WHERE student_id IN (OLD.student_id, NEW.student_id); END""")
+
+
+def rebuild_hashes(conn: sqlite3.Connection):
+    """Recompute every student's content hash (on a pooled connection)"""
+    conn.execute("DELETE FROM student_hashes")
+    conn.execute(f"INSERT INTO student_hashes (student_id, hash) "
+                 f"SELECT student_id, {row_hash_sql('students')} FROM students")
+
+
+def refresh_hashes(conn: sqlite3.Connection, student_ids: Iterable[int]):
+    """Recompute the content hash of the given students after writing them"""
+    conn.executemany(
+        f"INSERT INTO student_hashes (student_id, hash) "
+        f"SELECT student_id, {row_hash_sql('students')} FROM students WHERE student_id = ? "
+        f"ON CONFLICT (student_id) DO UPDATE SET hash = excluded.hash",
+        ((int(i),) for i in student_ids),
+    )
+
+
+def get_data_version(conn: Optional[sqlite3.Connection] = None) -> Tuple[str, int]:
+    """(epoch, version) of the students data"""
+    if conn is None:
+        with connection() as conn:
+            return get_data_version(conn)
+    epoch, version = conn.execute("SELECT epoch, version FROM agg_state WHERE id = 1").fetchone()
+    return epoch, version
+
+
+def get_changes(since: Tuple[str, int],
+                conn: Optional[sqlite3.Connection] = None) -> Optional[List[Tuple[int, str]]]:
+    """
+    Students changed after the data version ``since``
+
+    Returns:
+        (student_id, operation) pairs, operation being 'insert', 'update'
+        or 'delete' (the latest one per student), in version order; or
+        None when the changes are unknown, because ``since`` is from
+        another database or predates a bulk load, and everything must be
+        treated as changed
+    """
+    if conn is None:
+        with connection() as conn:
+            return get_changes(since, conn)
+    epoch, version, bulk_version = conn.execute(
+        "SELECT epoch, version, bulk_version FROM agg_state WHERE id = 1"
+    ).fetchone()
+    if since[0] != epoch or since[1] < bulk_version or since[1] > version:
+        return None
+    return conn.execute("SELECT student_id, operation FROM student_changes WHERE version > ? "
+                        "ORDER BY version", (since[1],)).fetchall()
+
+
+@contextmanager
+def bulk_load(conn: sqlite3.Connection, rehash: bool = True) -> Iterator[sqlite3.Connection]:
+    """
+    Suspend the per-row aggregate and change-log triggers for a bulk write
+
+    Must run inside the caller's transaction: the aggregates (and, with
+    ``rehash``, the row hashes) are rebuilt and the data version bumped
+    once before it commits, so readers never see them out of step. The
+    change log is reset, as every row counts as changed at that version;
+    pass ``rehash=False`` when only performance_category was written.
+    """
+    conn.execute("UPDATE agg_state SET bulk_load = 1 WHERE id = 1")
+    try:
+        yield conn
+        rebuild_aggregates(conn)
+        if rehash:
+            rebuild_hashes(conn)
+        conn.execute(BUMP_VERSION_SQL)
+        conn.execute("UPDATE agg_state SET bulk_version = version WHERE id = 1")
+        conn.execute("DELETE FROM student_changes")
+    finally:
+        conn.execute("UPDATE agg_state SET bulk_load = 0 WHERE id = 1")
+
+
+# Readers used by the charts
+
+def get_category_counts() -> "pd.Series":
+    """Students per performance category, largest first (like value_counts)"""
+    import pandas as pd
+
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT performance_category, n FROM agg_category_counts "
+            "WHERE performance_category != '' AND n > 0 ORDER BY n DESC"
+        ).fetchall()
+    return pd.Series([n for _, n in rows], index=[c for c, _ in rows],
+                     name='count', dtype='int64')
+
+
+def get_group_score_means(column: str) -> "pd.Series":
+    """Mean score per value of ``column`` ('gender' or 'location')"""
+    import pandas as pd
+
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT group_value, CAST(score_sum AS REAL) / n FROM agg_group_scores "
+            "WHERE group_column = ? AND group_value != '' AND n > 0 ORDER BY group_value",
+            (column,)
+        ).fetchall()
+    return pd.Series([mean for _, mean in rows], index=[value for value, _ in rows],
+                     name='score', dtype='float64')
+
+
+def get_absence_score_histogram() -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Distinct (absences, score) pairs and how many students share each"""
+    import numpy as np
+
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT absences, score, n FROM agg_absence_score WHERE n > 0"
+        ).fetchall()
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    absences, scores, counts = (np.array(column, dtype=np.int64) for column in zip(*rows))
+    return absences, scores, counts
@@ -0,0 +1,141 @@
+"""
+Login checks with a user-record cache and lockout after repeated failures
+
+Verifying a password runs PBKDF2 (see database.passwords), which is slow
+on purpose, so authenticate() is meant for a worker thread. A semaphore
+bounds how many verifications run at once, which keeps a burst of login
+attempts from tying up every core.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .db_operations import get_user, set_password
+from .models import User
+from .passwords import hash_password, needs_rehash, verify_password
+
+MAX_FAILED_ATTEMPTS = 5
+LOCKOUT_SECONDS = 300
+MAX_CONCURRENT_VERIFICATIONS = 2
+
+# User records are re-read after this long, so password or role changes
+# made elsewhere are picked up
+USER_CACHE_SIZE = 64
+USER_CACHE_SECONDS = 60
+
+# Usernames with recent failures that are remembered; beyond this the
+# one that failed longest ago is forgotten
+FAILURE_CACHE_SIZE = 1024
+
+
+class LoginLocked(Exception):
+    """Raised for a username that failed too many times in a row"""
+
+    def __init__(self, username: str, seconds: float):
+        super().__init__(f"Too many failed attempts; try again in {max(1, round(seconds))}s")
+        self.username = username
+        self.seconds = seconds
+
+
+class Authenticator:
+    """
+    Checks usernames and passwords against the users table
+
+    Thread-safe. Failed attempts are counted per username, whether or not
+    it exists, and an unknown username costs as much as a wrong password,
+    so neither the lockout nor the timing tells which usernames are real.
+    """
+
+    def __init__(self, max_attempts: int = MAX_FAILED_ATTEMPTS,
+                 lockout_seconds: float = LOCKOUT_SECONDS):
+        self.max_attempts = max_attempts
+        self.lockout_seconds = lockout_seconds
+        self._lock = threading.Lock()
+        self._verifying = threading.BoundedSemaphore(MAX_CONCURRENT_VERIFICATIONS)
+        self._users: "OrderedDict[str, Tuple[float, Optional[User]]]" = OrderedDict()
+        # username -> (failures, expires), oldest failure first; a count is
+        # forgotten lockout_seconds after the last failure
+        self._failures: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        # Unknown usernames are checked against this so they take as long;
+        # built on first use, by a login job, so never on the GUI thread
+        self._dummy_hash: Optional[str] = None
+
+    def _user(self, username: str) -> Optional[User]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._users.get(username)
+            if cached is not None and now - cached[0] < USER_CACHE_SECONDS:
+                self._users.move_to_end(username)
+                return cached[1]
+        user = get_user(username)
+        with self._lock:
+            self._users[username] = (now, user)
+            self._users.move_to_end(username)
+            while len(self._users) > USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+        return user
+
+    def _dummy(self) -> str:
+        with self._lock:
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password('')
+            return self._dummy_hash
+
+    def invalidate(self, username: Optional[str] = None):
+        """Drop one cached user record, or all of them"""
+        with self._lock:
+            if username is None:
+                self._users.clear()
+            else:
+                self._users.pop(username, None)
+
+    def locked_for(self, username: str) -> float:
+        """Seconds until ``username`` may try again (0 when not locked out)"""
+        with self._lock:
+            count, expires = self._failures.get(username, (0, 0.0))
+        if count < self.max_attempts:
+            return 0.0
+        return max(0.0, expires - time.monotonic())
+
+    def _record(self, username: str, success: bool):
+        now = time.monotonic()
+        with self._lock:
+            if success:
+                self._failures.pop(username, None)
+                return
+            count, expires = self._failures.pop(username, (0, 0.0))
+            if expires <= now:
+                count = 0  # the previous failures (and any lockout) have expired
+            self._failures[username] = (count + 1, now + self.lockout_seconds)
+            # Entries expire in insertion order, so stale ones are at the front
+            while self._failures:
+                _, oldest = next(iter(self._failures.values()))
+                if oldest > now and len(self._failures) <= FAILURE_CACHE_SIZE:
+                    break
+                self._failures.popitem(last=False)
+
+    def authenticate(self, username: str, password: str) -> Optional[User]:
+        """
+        The user if the password matches, otherwise None
+
+        Raises:
+            LoginLocked: The username is locked out after too many failures
+        """
+        remaining = self.locked_for(username)
+        if remaining > 0:
+            raise LoginLocked(username, remaining)
+
+        user = self._user(username)
+        with self._verifying:
+            valid = verify_password(password, user.password if user else self._dummy())
+        valid = valid and user is not None
+        self._record(username, valid)
+        if not valid:
+            return None
+
+        if needs_rehash(user.password):
+            # Stored with an older work factor: upgrade while the password is at hand
+            set_password(username, password)
+            self.invalidate(username)
+        return user
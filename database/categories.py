@@ -0,0 +1,161 @@
+import json
+import sqlite3
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import bulk_load
+from .connection import connection, transaction
+
+
+@dataclass(frozen=True)
+class ScoreBands:
+    """
+    Score thresholds and the category each band maps to
+
+    ``thresholds`` are ascending lower bounds: a score below the first one
+    gets ``labels[0]``, a score of at least ``thresholds[i]`` (and below the
+    next threshold) gets ``labels[i + 1]``.
+    """
+    thresholds: Tuple[float, ...]
+    labels: Tuple[str, ...]
+
+    def __post_init__(self):
+        object.__setattr__(self, 'thresholds', tuple(self.thresholds))
+        object.__setattr__(self, 'labels', tuple(self.labels))
+        if len(self.labels) != len(self.thresholds) + 1:
+            raise ValueError("Score bands need exactly one more label than thresholds")
+        if list(self.thresholds) != sorted(set(self.thresholds)):
+            raise ValueError("Score band thresholds must be strictly ascending")
+
+    def category(self, score: Optional[float]) -> Optional[str]:
+        """The label for ``score``; a missing score (None or NaN) has none, as in categorize_scores"""
+        if score is None or score != score:
+            return None
+        return self.labels[bisect_right(self.thresholds, score)]
+
+    def to_json(self) -> str:
+        return json.dumps({'thresholds': list(self.thresholds), 'labels': list(self.labels)})
+
+    @classmethod
+    def from_json(cls, text: str) -> 'ScoreBands':
+        data = json.loads(text)
+        return cls(data['thresholds'], data['labels'])
+
+
+DEFAULT_BANDS = ScoreBands((25, 35, 45), ("Poor", "Average", "Good", "Excellent"))
+
+
+def categorize_scores(scores: Sequence[float], bands: ScoreBands = DEFAULT_BANDS) -> np.ndarray:
+    """
+    Map an array of scores to categories in one vectorized pass
+
+    Returns:
+        Object array of labels aligned with ``scores``; missing scores map to None
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.array(bands.labels + (None,), dtype=object)
+    codes = np.digitize(scores, bands.thresholds)
+    codes[np.isnan(scores)] = len(bands.labels)
+    return labels[codes]
+
+
+def categorize_frame(df: pd.DataFrame, school_bands: Optional[Dict[str, ScoreBands]] = None,
+                     default: ScoreBands = DEFAULT_BANDS) -> np.ndarray:
+    """
+    Categorize the ``score`` column of a students frame, using each row's
+    school (location) bands where configured and ``default`` elsewhere
+    """
+    categories = categorize_scores(df['score'], default)
+    if school_bands and 'location' in df.columns:
+        locations = df['location'].to_numpy()
+        for location, bands in school_bands.items():
+            mask = locations == location
+            if mask.any():
+                categories[mask] = categorize_scores(df['score'].to_numpy()[mask], bands)
+    return categories
+
+
+def case_expression(bands: ScoreBands, column: str = 'score') -> Tuple[str, List]:
+    """SQL CASE expression equivalent to categorize_scores, with its parameters"""
+    sql = [f"CASE WHEN {column} IS NULL THEN NULL"]
+    params: List = []
+    for threshold, label in reversed(list(zip(bands.thresholds, bands.labels[1:]))):
+        sql.append(f"WHEN {column} >= ? THEN ?")
+        params += [threshold, label]
+    sql.append("ELSE ? END")
+    params.append(bands.labels[0])
+    return " ".join(sql), params
+
+
+def get_score_bands(conn: Optional[sqlite3.Connection] = None) -> Dict[str, ScoreBands]:
+    """Configured bands by location; locations not listed use DEFAULT_BANDS"""
+    if conn is None:
+        with connection() as conn:
+            return get_score_bands(conn)
+    rows = conn.execute("SELECT location, bands FROM score_bands").fetchall()
+    return {location: ScoreBands.from_json(text) for location, text in rows}
+
+
+def recategorize_students(conn: Optional[sqlite3.Connection] = None,
+                          school_bands: Optional[Dict[str, ScoreBands]] = None) -> int:
+    """
+    Recompute every student's performance_category from their score
+
+    One UPDATE per configured school plus one for everyone else, each a
+    CASE over the score column, so no rows pass through Python. Chart
+    aggregates are rebuilt once instead of per updated row.
+
+    Args:
+        conn: Connection whose transaction to join; by default a new one
+        school_bands: Bands to apply; by default the configured ones
+
+    Returns:
+        Number of students updated
+    """
+    if conn is None:
+        with transaction() as conn:
+            return recategorize_students(conn, school_bands)
+    if school_bands is None:
+        school_bands = get_score_bands(conn)
+
+    updated = 0
+    # Categories are not part of the row hashes, so they stay valid
+    with bulk_load(conn, rehash=False):
+        for location, bands in school_bands.items():
+            case, params = case_expression(bands)
+            updated += conn.execute(
+                f"UPDATE students SET performance_category = {case} WHERE location = ?",
+                params + [location],
+            ).rowcount
+        case, params = case_expression(DEFAULT_BANDS)
+        others = ", ".join("?" * len(school_bands))
+        where = f" WHERE location IS NULL OR location NOT IN ({others})" if school_bands else ""
+        updated += conn.execute(
+            f"UPDATE students SET performance_category = {case}{where}",
+            params + list(school_bands),
+        ).rowcount
+    return updated
+
+
+def set_score_bands(location: str, bands: Optional[ScoreBands],
+                    recategorize: bool = True) -> int:
+    """
+    Configure (or with ``bands=None`` reset) one school's score bands
+
+    Returns:
+        Number of students recategorized (0 when ``recategorize`` is False)
+    """
+    with transaction() as conn:
+        if bands is None:
+            conn.execute("DELETE FROM score_bands WHERE location = ?", (location,))
+        else:
+            conn.execute(
+                "INSERT INTO score_bands (location, bands) VALUES (?, ?) "
+                "ON CONFLICT (location) DO UPDATE SET bands = excluded.bands",
+                (location, bands.to_json()),
+            )
+        return recategorize_students(conn) if recategorize else 0
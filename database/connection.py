@@ -0,0 +1,168 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from .hashing import row_hash
+
+DEFAULT_DB_PATH = os.environ.get('STUDENT_DB_PATH', 'student_performance.db')
+
+# Statements are compiled once per connection and reused from this cache,
+# so keeping connections alive is what makes prepared-statement reuse work.
+STATEMENT_CACHE_SIZE = 256
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+class ConnectionPool:
+    """
+    Thread-aware pool of SQLite connections
+
+    Each thread borrows one connection at a time; nested ``connection()``
+    blocks in the same thread reuse the connection already borrowed, so a
+    helper called inside a transaction sees that transaction.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_size: int = 4):
+        self.db_path = db_path
+        self.max_size = max_size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        # Used to compute row hashes (see database.aggregates.rebuild_hashes)
+        conn.create_function('row_hash', -1, row_hash, deterministic=True)
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                return self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection and commit on success, roll back on error"""
+        with self.connection() as conn:
+            if getattr(self._local, 'in_transaction', False):
+                # Nested inside an outer transaction; let it decide.
+                yield conn
+                return
+            self._local.in_transaction = True
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._local.in_transaction = False
+
+    @contextmanager
+    def read_transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection whose reads all see one consistent state
+
+        sqlite3 only opens a transaction before writes, so separate SELECTs
+        would otherwise each see the latest commit. Inside an outer
+        transaction this simply joins it.
+        """
+        with self.connection() as conn:
+            if conn.in_transaction or getattr(self._local, 'in_transaction', False):
+                yield conn
+                return
+            self._local.in_transaction = True
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                self._local.in_transaction = False
+                conn.commit()
+
+    def close(self):
+        """Close every connection opened by this pool"""
+        with self._lock:
+            connections, self._all = self._all, []
+        for conn in connections:
+            conn.close()
+        self._idle = queue.LifoQueue()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def configure(db_path: str, max_size: int = 4) -> ConnectionPool:
+    """Point the shared pool at a different database file"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(db_path, max_size)
+        return _pool
+
+
+def get_pool() -> ConnectionPool:
+    """Return the shared pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DEFAULT_DB_PATH)
+        return _pool
+
+
+def connection():
+    """Borrow a connection from the shared pool"""
+    return get_pool().connection()
+
+
+def transaction():
+    """Run a block in a transaction on a shared pool connection"""
+    return get_pool().transaction()
+
+
+def read_transaction():
+    """Run a block of reads against one consistent state of the database"""
+    return get_pool().read_transaction()
@@ -1,90 +1,328 @@
-import sqlite3
-from typing import List, Optional
-from .models import User, Student
-#import pandas as pd
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, List, Optional, Sequence, Tuple
+from .connection import connection, transaction
+from .migrations import migrate
+from .models import User, STUDENT_COLUMNS, STUDENT_DTYPES
+from .passwords import hash_password
+from utils.metrics import span
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from .student_table import StudentTable
+
+FETCH_BATCH_SIZE = 10_000
 
 
 def initialize_database():
     """Initialize the database with required tables"""
-     
-    conn = sqlite3.connect('student_performance.db')
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL,
-        role TEXT NOT NULL
-    )
-    ''')
-    
-    # Create students table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS students (
-        student_id INTEGER PRIMARY KEY,
-        name TEXT NOT NULL,
-        gender TEXT,
-        age INTEGER,
-        location TEXT,
-        famsize TEXT,
-        pstatus TEXT,
-        medu INTEGER,
-        fedu INTEGER,
-        traveltime INTEGER,
-        studytime INTEGER,
-        failures INTEGER,
-        schoolsup TEXT,
-        famsup TEXT,
-        paid TEXT,
- 
- activities TEXT,
-        nursery TEXT,
-        higher TEXT,
-        internet TEXT,
-        famrel INTEGER,
-        freetime INTEGER,
-        health INTEGER,
-        absences INTEGER,
-        score INTEGER,
-        performance_category TEXT
-    )
-    ''')
-    
-    # Insert default admin user if not exists
-    try:
-        cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
-                      ('admin', 'admin123', 'admin'))
-    except sqlite3.IntegrityError:
-        pass  # User already exists
-    
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        migrate(conn)
+        
+        # Insert default admin user if not exists (checked first: hashing
+        # the password takes a noticeable fraction of a second)
+        if conn.execute("SELECT 1 FROM users WHERE username = ?", ('admin',)).fetchone() is None:
+            conn.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                         ('admin', hash_password('admin123'), 'admin'))
+
 
 def get_user(username: str) -> Optional[User]:
     """Retrieve a user by username"""
-    conn = sqlite3.connect('student_performance.db')
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM users WHERE username=?", (username,))
-    user_data = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        user_data = conn.execute("SELECT * FROM users WHERE username=?",
+                                 (username,)).fetchone()
     
     if user_data:
         return User(*user_data)
     return None
 
-def get_all_students() -> List[Student]:
-    """Retrieve all students from the database"""
-    conn = sqlite3.connect('student_performance.db')
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM students")
-    students = [Student(*row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return students
+
+def set_password(username: str, password: str):
+    """Store a new salted hash of a user's password"""
+    with transaction() as conn:
+        conn.execute("UPDATE users SET password = ? WHERE username = ?",
+                     (hash_password(password), username))
+
+def get_all_students() -> "StudentTable":
+    """
+    Retrieve all students from the database
+
+    Returns a StudentTable: it indexes and iterates like a list of Student
+    records, but stores the cohort column-wise in a fraction of the memory.
+    """
+    return get_student_table()
+
+
+def get_student_table(columns: Optional[Sequence[str]] = None,
+                      where: Optional[str] = None,
+                      params: Sequence = ()) -> "StudentTable":
+    """
+    Load students into a compact column-wise StudentTable
+
+    Args:
+        columns: Columns to select (defaults to all student columns)
+        where: Optional SQL condition, using ? placeholders for values
+        params: Values bound to the placeholders in ``where``
+    """
+    from .student_table import StudentTable
+
+    columns = list(columns) if columns else STUDENT_COLUMNS
+    _check_columns(columns)
+    sql = f"SELECT {', '.join(columns)} FROM students"
+    if where:
+        sql += f" WHERE {where}"
+
+    with span('db.get_student_table') as fields, connection() as conn:
+        cursor = conn.execute(sql, tuple(params))
+        batches = iter(lambda: cursor.fetchmany(FETCH_BATCH_SIZE), [])
+        table = StudentTable.from_batches(batches, columns)
+        fields['rows'] = len(table)
+    return table
+
+
+def _check_columns(columns: Sequence[str]):
+    unknown = [c for c in columns if c not in STUDENT_DTYPES]
+    if unknown:
+        raise ValueError(f"Unknown student columns: {', '.join(unknown)}")
+
+
+def _column_array(values: tuple, dtype: str) -> "np.ndarray":
+    """Convert one fetched column to a typed array (NULL integers become NaN)"""
+    import numpy as np
+    if dtype == 'int64':
+        try:
+            return np.fromiter(values, dtype=np.int64, count=len(values))
+        except TypeError:
+            return np.array(values, dtype=np.float64)
+    return np.array(values, dtype=object)
+
+
+def get_students_frame(columns: Optional[Sequence[str]] = None,
+                       where: Optional[str] = None,
+                       params: Sequence = ()) -> "pd.DataFrame":
+    """
+    Load students column-wise straight into a DataFrame
+
+    Rows are fetched in batches and converted to typed NumPy arrays per
+    column, without building a Student object per row.
+
+    Args:
+        columns: Columns to select (defaults to all student columns)
+        where: Optional SQL condition, using ? placeholders for values
+        params: Values bound to the placeholders in ``where``
+
+    Returns:
+        DataFrame with one typed column per selected field
+    """
+    # Imported here so that light callers (login, table paging) skip pandas
+    import numpy as np
+    import pandas as pd
+
+    columns = list(columns) if columns else STUDENT_COLUMNS
+    _check_columns(columns)
+
+    sql = f"SELECT {', '.join(columns)} FROM students"
+    if where:
+        sql += f" WHERE {where}"
+
+    parts = {column: [] for column in columns}
+    with span('db.get_students_frame', columns=len(columns)) as fields, connection() as conn:
+        cursor = conn.execute(sql, tuple(params))
+        fields['rows'] = 0
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            fields['rows'] += len(rows)
+            for column, values in zip(columns, zip(*rows)):
+                parts[column].append(_column_array(values, STUDENT_DTYPES[column]))
+
+    with span('frame.build', rows=fields['rows'], columns=len(columns)):
+        data = {
+            column: (np.concatenate(arrays) if arrays
+                     else np.empty(0, dtype=STUDENT_DTYPES[column]))
+            for column, arrays in parts.items()
+        }
+        return pd.DataFrame(data, columns=columns, copy=False)
+
+
+def iter_students_frames(columns: Optional[Sequence[str]] = None,
+                         where: Optional[str] = None, params: Sequence = (),
+                         batch_size: int = FETCH_BATCH_SIZE) -> Iterator["pd.DataFrame"]:
+    """
+    Yield students as a sequence of DataFrames of at most ``batch_size`` rows
+
+    Batches are read in student_id order with keyset pagination, so only
+    one batch is in memory and no read transaction is held between batches.
+    """
+    import pandas as pd
+
+    columns = list(columns) if columns else STUDENT_COLUMNS
+    _check_columns(columns)
+    select_columns = columns if 'student_id' in columns else ['student_id'] + columns
+    key_position = select_columns.index('student_id')
+    condition = "student_id > ?" + (f" AND ({where})" if where else "")
+
+    last_id = -2**63
+    while True:
+        rows = fetch_student_rows(select_columns, condition, (last_id,) + tuple(params),
+                                  order_by='student_id', limit=batch_size)
+        if not rows:
+            return
+        last_id = rows[-1][key_position]
+        data = {column: _column_array(values, STUDENT_DTYPES[column])
+                for column, values in zip(select_columns, zip(*rows))}
+        yield pd.DataFrame({column: data[column] for column in columns}, copy=False)
+
+
+def count_students(where: Optional[str] = None, params: Sequence = ()) -> int:
+    """Count students, optionally restricted by an SQL condition"""
+    sql = "SELECT COUNT(*) FROM students"
+    if where:
+        sql += f" WHERE {where}"
+    with span('db.count_students'), connection() as conn:
+        return conn.execute(sql, tuple(params)).fetchone()[0]
+
+
+def _keyset_condition(order_by: str, descending: bool, after: tuple) -> Tuple[str, tuple]:
+    """
+    Condition for the rows sorted after ``after`` = (order_by value, student_id)
+
+    SQLite sorts NULLs first, so ascending pages move from the NULL rows to
+    the rest and descending pages end with them; a row-value comparison
+    against NULL matches nothing, so those rows are handled separately.
+    """
+    value, last_id = after
+    if order_by == 'student_id':
+        return ("student_id < ?" if descending else "student_id > ?"), (last_id,)
+    if value is None:
+        if descending:
+            return f"{order_by} IS NULL AND student_id < ?", (last_id,)
+        return f"({order_by} IS NULL AND student_id > ?) OR {order_by} IS NOT NULL", (last_id,)
+    if descending:
+        return f"({order_by}, student_id) < (?, ?) OR {order_by} IS NULL", (value, last_id)
+    return f"({order_by}, student_id) > (?, ?)", (value, last_id)
+
+
+def fetch_student_rows(columns: Sequence[str], where: Optional[str] = None,
+                       params: Sequence = (), order_by: Optional[str] = None,
+                       descending: bool = False, limit: Optional[int] = None,
+                       after: Optional[tuple] = None) -> List[tuple]:
+    """
+    Fetch one page of student rows as tuples
+
+    Args:
+        columns: Columns to select
+        where: Optional SQL condition, using ? placeholders for values
+        params: Values bound to the placeholders in ``where``
+        order_by: Column to sort by; student_id breaks ties so pages are stable
+        descending: Sort order for ``order_by``
+        limit: Maximum number of rows (all rows when None)
+        after: (order_by value, student_id) of the last row of the previous
+            page; the page starts right after it (keyset pagination, so
+            deep pages cost no more than the first)
+
+    Returns:
+        List of row tuples in ``columns`` order
+    """
+    _check_columns(columns)
+    params = tuple(params)
+    conditions = [f"({where})"] if where else []
+    if after is not None:
+        if order_by is None:
+            raise ValueError("after requires order_by")
+        keyset, keyset_params = _keyset_condition(order_by, descending, after)
+        conditions.append(f"({keyset})")
+        params += keyset_params
+    sql = f"SELECT {', '.join(columns)} FROM students"
+    if conditions:
+        sql += f" WHERE {' AND '.join(conditions)}"
+    if order_by is not None:
+        _check_columns([order_by])
+        direction = "DESC" if descending else "ASC"
+        sql += f" ORDER BY {order_by} {direction}"
+        if order_by != 'student_id':
+            sql += f", student_id {direction}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params += (limit,)
+    with span('db.fetch_student_rows') as fields, connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+        fields['rows'] = len(rows)
+    return rows
+
+@dataclass
+class StudentFilter:
+    """
+    Common dashboard filters, translated to an indexed SQL condition
+
+    Equality filters on performance_category, gender and location and the
+    score/absences ranges each match a leading index column.
+    """
+    student_id: Optional[int] = None
+    name_contains: Optional[str] = None
+    performance_category: Optional[str] = None
+    gender: Optional[str] = None
+    location: Optional[str] = None
+    min_score: Optional[int] = None
+    max_score: Optional[int] = None
+    min_absences: Optional[int] = None
+    max_absences: Optional[int] = None
+
+    def to_sql(self) -> Tuple[Optional[str], tuple]:
+        """Return (where, params) for fetch_student_rows/count_students"""
+        conditions, params = [], []
+
+        def add(condition, value):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+
+        add("student_id = ?", self.student_id)
+        add("performance_category = ?", self.performance_category)
+        add("gender = ?", self.gender)
+        add("location = ?", self.location)
+        add("score >= ?", self.min_score)
+        add("score <= ?", self.max_score)
+        add("absences >= ?", self.min_absences)
+        add("absences <= ?", self.max_absences)
+        if self.name_contains:
+            add("name LIKE ?", f"%{self.name_contains}%")
+        return (" AND ".join(conditions) or None), tuple(params)
+
+
+def query_students(filters: Optional[StudentFilter] = None,
+                   columns: Optional[Sequence[str]] = None,
+                   order_by: Optional[str] = 'student_id', descending: bool = False,
+                   limit: Optional[int] = 100,
+                   after: Optional[tuple] = None) -> Tuple[List[tuple], int]:
+    """
+    Fetch one filtered page of students
+
+    Pass the (order_by value, student_id) of the previous page's last row
+    as ``after`` to get the next page.
+
+    Returns:
+        Tuple of (rows for this page, total number of matching students)
+    """
+    where, params = (filters or StudentFilter()).to_sql()
+    rows = fetch_student_rows(columns or STUDENT_COLUMNS, where, params,
+                              order_by=order_by, descending=descending,
+                              limit=limit, after=after)
+    return rows, count_students(where, params)
+
+
+def explain_query_plan(sql: str, params: Sequence = ()) -> List[str]:
+    """Return SQLite's EXPLAIN QUERY PLAN details for a statement"""
+    with connection() as conn:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(params))]
+
+
+def explain_student_filter(filters: StudentFilter, select: str = "COUNT(*)") -> List[str]:
+    """Query plan for selecting ``select`` from students matching ``filters``"""
+    where, params = filters.to_sql()
+    sql = f"SELECT {select} FROM students" + (f" WHERE {where}" if where else "")
+    return explain_query_plan(sql, params)
 
 # Add other database operations as needed...
 
@@ -0,0 +1,46 @@
+import hashlib
+from typing import Any, List, Optional
+
+from .models import STUDENT_COLUMNS
+
+# Columns covered by a student's content hash. performance_category is
+# derived (from the score bands or a model), so recategorizing or scoring
+# students does not count as a change to the row's data.
+HASHED_COLUMNS = [c for c in STUDENT_COLUMNS if c != 'performance_category']
+
+# Types SQLite hands back (and most incoming rows hold) that need no normalizing
+_PLAIN = frozenset({str, int, type(None)})
+
+
+def _normalize(value: Any) -> Any:
+    """The value as SQLite would store and return it"""
+    if value is None or value != value:  # NULL or NaN
+        return None
+    if isinstance(value, (str, bytes)):
+        return value
+    if isinstance(value, float):
+        # SQLite stores 3.0 in an INTEGER column as 3
+        return int(value) if value.is_integer() else float(value)
+    return int(value)
+
+
+def row_hash(*values: Any) -> int:
+    """
+    64-bit content hash of one student's HASHED_COLUMNS values
+
+    Registered as the ``row_hash`` SQL function on every pooled connection
+    (rebuild_hashes() and refresh_hashes() call it), and called directly
+    from Python on incoming rows, so both sides agree: values are hashed by
+    what SQLite would store, not by their Python or NumPy type. Returned as a signed
+    integer so it fits an SQLite INTEGER.
+    """
+    if not _PLAIN.issuperset(map(type, values)):
+        values = tuple(map(_normalize, values))
+    # repr() quotes strings, so neither a separator nor a type can be confused
+    digest = hashlib.blake2b(repr(values).encode('utf-8', 'surrogatepass'), digest_size=8)
+    return int.from_bytes(digest.digest(), 'big', signed=True)
+
+
+def row_hash_sql(row: str, columns: Optional[List[str]] = None) -> str:
+    """SQL calling row_hash on the HASHED_COLUMNS (or ``columns``) of a trigger row or table alias"""
+    return f"row_hash({', '.join(f'{row}.{c}' for c in columns or HASHED_COLUMNS)})"
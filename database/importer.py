@@ -0,0 +1,292 @@
+import sys
+import time
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import bulk_load, refresh_hashes
+from .categories import ScoreBands, categorize_frame, get_score_bands
+from .connection import configure, connection, transaction
+from .hashing import HASHED_COLUMNS, row_hash, row_hash_sql
+from .models import STUDENT_COLUMNS
+
+# CSV header -> students column. Columns missing from the file fall back to
+# the defaults below (train.csv, for example, has no Name column).
+CSV_COLUMN_MAP = {
+    'S/N': 'student_id',
+    'Name': 'name',
+    'Gender': 'gender',
+    'Age': 'age',
+    'Location': 'location',
+    'famsize': 'famsize',
+    'Pstatus': 'pstatus',
+    'Medu': 'medu',
+    'Fedu': 'fedu',
+    'traveltime': 'traveltime',
+    'studytime': 'studytime',
+    'failures': 'failures',
+    'schoolsup': 'schoolsup',
+    'famsup': 'famsup',
+    'paid': 'paid',
+    'activities': 'activities',
+    'nursery': 'nursery',
+    'higher': 'higher',
+    'internet': 'internet',
+    'famrel': 'famrel',
+    'freetime': 'freetime',
+    'health': 'health',
+    'absences': 'absences',
+    'Score': 'score',
+}
+
+COLUMN_DEFAULTS = {'name': 'Unknown'}
+
+IMPORT_PRAGMAS = (
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+)
+
+# Pooled connections outlive the import, so put them back afterwards.
+RESTORE_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = DEFAULT",
+    "PRAGMA cache_size = -2000",
+)
+
+DEFAULT_CHUNKSIZE = 50_000
+
+
+@dataclass
+class ImportResult:
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+
+@dataclass
+class SyncResult:
+    inserted: int
+    updated: int
+    unchanged: int
+    deleted: int
+    seconds: float
+
+    @property
+    def rows(self) -> int:
+        """CSV rows compared against the table"""
+        return self.inserted + self.updated + self.unchanged
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+
+def _prepare_chunk(chunk: pd.DataFrame,
+                   school_bands: Optional[Dict[str, ScoreBands]] = None) -> pd.DataFrame:
+    """Map a raw CSV chunk onto the students table layout"""
+    chunk = chunk.rename(columns=CSV_COLUMN_MAP)
+    for column, default in COLUMN_DEFAULTS.items():
+        if column not in chunk.columns:
+            chunk[column] = default
+    chunk['performance_category'] = categorize_frame(chunk, school_bands)
+    chunk = chunk[STUDENT_COLUMNS]
+    # sqlite3 binds None, not NaN
+    return chunk.astype(object).where(chunk.notna(), None)
+
+
+def iter_csv_frames(file_path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Stream a CSV file as DataFrames in the students table layout"""
+    school_bands = get_score_bands()
+    for chunk in pd.read_csv(file_path, chunksize=chunksize):
+        yield _prepare_chunk(chunk, school_bands).infer_objects()
+
+
+def import_csv(file_path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+               progress: Optional[Callable[[int], None]] = None) -> ImportResult:
+    """
+    Replace the students table with the contents of a CSV file
+
+    The file is streamed in chunks and loaded with executemany inside a
+    single transaction, so a failed import leaves the table untouched.
+    Chart aggregates are rebuilt once at the end instead of per row.
+
+    Args:
+        file_path: Path to a CSV file in the train.csv layout
+        chunksize: Number of CSV rows read and inserted per batch
+        progress: Optional callback receiving the number of rows loaded so far
+
+    Returns:
+        ImportResult with the row count and elapsed time
+    """
+    placeholders = ", ".join("?" * len(STUDENT_COLUMNS))
+    insert_sql = (f"INSERT INTO students ({', '.join(STUDENT_COLUMNS)}) "
+                  f"VALUES ({placeholders})")
+
+    start = time.perf_counter()
+    rows = 0
+    with connection() as conn:
+        for pragma in IMPORT_PRAGMAS:
+            conn.execute(pragma)
+        try:
+            with transaction(), bulk_load(conn):
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM students")
+                school_bands = get_score_bands(conn)
+
+                for chunk in pd.read_csv(file_path, chunksize=chunksize):
+                    chunk = _prepare_chunk(chunk, school_bands)
+                    cursor.executemany(insert_sql, chunk.itertuples(index=False, name=None))
+                    rows += len(chunk)
+                    if progress is not None:
+                        progress(rows)
+        finally:
+            for pragma in RESTORE_PRAGMAS:
+                conn.execute(pragma)
+
+    return ImportResult(rows, time.perf_counter() - start)
+
+
+def _sorted_pairs(conn, sql: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(student_id, value) rows of ``sql``, ordered by student_id, as two int64 arrays"""
+    pairs = np.array(conn.execute(sql).fetchall(), dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _lookup(keys: np.ndarray, values: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Which ``ids`` are in the sorted ``keys``, and the value stored for each"""
+    if not len(keys):
+        return np.zeros(len(ids), dtype=bool), np.zeros(len(ids), dtype=np.int64)
+    slots = np.minimum(np.searchsorted(keys, ids), len(keys) - 1)
+    return keys[slots] == ids, values[slots]
+
+
+def _upsert_sql(columns: List[str]) -> str:
+    """Insert a student, or update ``columns`` of the one with the same student_id"""
+    placeholders = ", ".join("?" * len(STUDENT_COLUMNS))
+    updates = [f"{c} = excluded.{c}" for c in columns
+               if c not in ('student_id', 'performance_category')]
+    # A student's category may have been set by a model or by hand; only a
+    # new score invalidates it
+    updates.append("performance_category = CASE WHEN students.score IS excluded.score "
+                   "THEN students.performance_category ELSE excluded.performance_category END")
+    return (f"INSERT INTO students ({', '.join(STUDENT_COLUMNS)}) VALUES ({placeholders}) "
+            f"ON CONFLICT (student_id) DO UPDATE SET {', '.join(updates)}")
+
+
+def sync_csv(file_path: str, delete_missing: bool = False, chunksize: int = DEFAULT_CHUNKSIZE,
+             progress: Optional[Callable[[int], None]] = None) -> SyncResult:
+    """
+    Bring the students table in line with a CSV file, writing only what changed
+
+    Rows are matched on S/N (student_id). Each incoming row's content hash
+    is compared with the stored one (see database.hashing), and only new
+    or changed rows are upserted, so the per-row triggers keep the chart
+    aggregates and the change log exact and unchanged rows are not
+    rewritten at all. An updated student keeps their performance_category
+    unless their score changed, and any column the file does not have
+    (such as Name in train.csv); COLUMN_DEFAULTS only fill new students.
+    Everything runs in one transaction.
+
+    Args:
+        file_path: Path to a CSV file in the train.csv layout
+        delete_missing: Also delete students whose S/N is not in the file
+        chunksize: Number of CSV rows read and compared per batch
+        progress: Optional callback receiving the number of rows compared so far
+
+    Returns:
+        SyncResult with inserted, updated, unchanged and deleted counts
+
+    Raises:
+        ValueError: The file has no S/N column, or a row has no S/N
+    """
+    header = pd.read_csv(file_path, nrows=0).columns
+    if 'S/N' not in header:
+        raise ValueError("Syncing needs an S/N column to match students on")
+    in_file = {CSV_COLUMN_MAP.get(c, c) for c in header}
+    # Compare only what the file can change
+    compared = [c for c in HASHED_COLUMNS if c in in_file]
+    positions = [STUDENT_COLUMNS.index(c) for c in compared]
+    # itemgetter of a single index returns the value itself, not a 1-tuple
+    hashed = (itemgetter(*positions) if len(positions) > 1
+              else lambda row: (row[positions[0]],))
+    upsert_sql = _upsert_sql(compared)
+
+    start = time.perf_counter()
+    inserted = updated = unchanged = deleted = 0
+    with connection() as conn:
+        for pragma in IMPORT_PRAGMAS:
+            conn.execute(pragma)
+        try:
+            with transaction():
+                cursor = conn.cursor()
+                school_bands = get_score_bands(conn)
+                # Stored hashes as sorted arrays: 16 bytes per student,
+                # looked up a whole chunk at a time. A student without one
+                # (written by another client since) counts as changed. A
+                # file without some of the hashed columns is compared on
+                # the columns it has.
+                if compared == HASHED_COLUMNS:
+                    known_ids = np.array(conn.execute(
+                        "SELECT student_id FROM students ORDER BY student_id"
+                    ).fetchall(), dtype=np.int64).reshape(-1)
+                    hash_ids, stored_hashes = _sorted_pairs(
+                        conn, "SELECT student_id, hash FROM student_hashes ORDER BY student_id")
+                else:
+                    hash_ids, stored_hashes = _sorted_pairs(
+                        conn, f"SELECT student_id, {row_hash_sql('students', compared)} "
+                              f"FROM students ORDER BY student_id")
+                    known_ids = hash_ids
+                seen = []
+
+                for chunk in pd.read_csv(file_path, chunksize=chunksize):
+                    chunk = _prepare_chunk(chunk, school_bands)
+                    if chunk['student_id'].isna().any():
+                        raise ValueError("Every row needs an S/N to be synced")
+                    rows = list(chunk.itertuples(index=False, name=None))
+                    ids = chunk['student_id'].to_numpy(dtype=np.int64)
+                    hashes = np.fromiter((row_hash(*hashed(row)) for row in rows),
+                                         dtype=np.int64, count=len(rows))
+
+                    known, _ = _lookup(known_ids, known_ids, ids)
+                    has_hash, previous = _lookup(hash_ids, stored_hashes, ids)
+                    same = known & has_hash & (previous == hashes)
+                    changed = np.flatnonzero(~same)
+                    cursor.executemany(upsert_sql, (rows[i] for i in changed))
+                    # The triggers only drop hashes; store the new ones
+                    refresh_hashes(conn, ids[changed])
+
+                    inserted += int((~known).sum())
+                    updated += int((known & ~same).sum())
+                    unchanged += int(same.sum())
+                    seen.append(ids)
+                    if progress is not None:
+                        progress(inserted + updated + unchanged)
+
+                if delete_missing:
+                    seen = np.concatenate(seen) if seen else np.empty(0, dtype=np.int64)
+                    missing = known_ids[~np.isin(known_ids, seen)]
+                    cursor.executemany("DELETE FROM students WHERE student_id = ?",
+                                       ((int(i),) for i in missing))
+                    deleted = len(missing)
+        finally:
+            for pragma in RESTORE_PRAGMAS:
+                conn.execute(pragma)
+
+    return SyncResult(inserted, updated, unchanged, deleted, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m database.importer <file.csv> [database]")
+    if len(sys.argv) > 2:
+        configure(sys.argv[2])
+    result = import_csv(sys.argv[1])
+    print(f"Imported {result.rows} students in {result.seconds:.2f}s "
+          f"({result.rows_per_second:,.0f} rows/s)")
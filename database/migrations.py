@@ -0,0 +1,120 @@
+import sqlite3
+from typing import Callable, List, Tuple
+from .aggregates import create_aggregates, create_change_log, create_data_version
+from .passwords import hash_password, is_password_hash
+
+# Schema changes are applied in order and recorded in PRAGMA user_version,
+# so each one runs exactly once per database file. Append new migrations
+# to the end of MIGRATIONS; never edit or reorder ones that have shipped.
+
+
+def _base_schema(conn: sqlite3.Connection):
+    # Create users table
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL
+    )
+    ''')
+    
+    # Create students table
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS students (
+        student_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        gender TEXT,
+        age INTEGER,
+        location TEXT,
+        famsize TEXT,
+        pstatus TEXT,
+        medu INTEGER,
+        fedu INTEGER,
+        traveltime INTEGER,
+        studytime INTEGER,
+        failures INTEGER,
+        schoolsup TEXT,
+        famsup TEXT,
+        paid TEXT,
+        activities TEXT,
+        nursery TEXT,
+        higher TEXT,
+        internet TEXT,
+        famrel INTEGER,
+        freetime INTEGER,
+        health INTEGER,
+        absences INTEGER,
+        score INTEGER,
+        performance_category TEXT
+    )
+    ''')
+
+
+def _student_indexes(conn: sqlite3.Connection):
+    # Each index leads with a dashboard filter and carries score, so
+    # filtered counts and score aggregates are answered from the index alone.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_students_category_score "
+                 "ON students (performance_category, score)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_students_gender_score "
+                 "ON students (gender, score)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_students_location_score "
+                 "ON students (location, score)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_students_score "
+                 "ON students (score)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_students_absences_score "
+                 "ON students (absences, score)")
+    conn.execute("ANALYZE students")
+
+
+def _score_bands(conn: sqlite3.Connection):
+    # Per-school category bands (see database.categories). The students
+    # table has no school column; location is what tells schools apart.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS score_bands (
+        location TEXT PRIMARY KEY,
+        bands TEXT NOT NULL
+    )
+    ''')
+
+
+def _hash_passwords(conn: sqlite3.Connection):
+    # Users were created with plaintext passwords (the default admin among them)
+    users = conn.execute("SELECT id, password FROM users").fetchall()
+    for user_id, password in users:
+        if not is_password_hash(password):
+            conn.execute("UPDATE users SET password = ? WHERE id = ?",
+                         (hash_password(password), user_id))
+
+
+MIGRATIONS: List[Tuple[str, Callable[[sqlite3.Connection], None]]] = [
+    ("base schema", _base_schema),
+    ("students access-path indexes", _student_indexes),
+    ("incremental chart aggregates", create_aggregates),
+    ("per-school score bands", _score_bands),
+    ("students data version", create_data_version),
+    ("students change log and row hashes", create_change_log),
+    ("salted password hashes", _hash_passwords),
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Apply any migrations newer than the database's schema version
+
+    Runs inside the caller's transaction.
+
+    Returns:
+        The schema version after migrating
+    """
+    version = schema_version(conn)
+    for number, (_, apply) in enumerate(MIGRATIONS, start=1):
+        if number > version:
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            version = number
+    return version
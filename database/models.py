@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
 @dataclass
 class User:
@@ -7,7 +7,8 @@ class User:
     password: str
     role: str
 
-@dataclass
+# Slotted: no per-instance __dict__, which matters when many are alive at once
+@dataclass(slots=True)
 class Student:
     student_id: int
     name: str
@@ -34,3 +35,14 @@ class Student:
     absences: int
     score: int
     performance_category: str
+
+
+STUDENT_COLUMNS = [f.name for f in fields(Student)]
+
+# NumPy dtype used for each column when loading students column-wise
+STUDENT_DTYPES = {f.name: ('int64' if f.type is int else 'object') for f in fields(Student)}
+
+# Text columns with a handful of distinct values, stored as integer codes
+# by StudentTable
+STUDENT_CATEGORICAL_COLUMNS = [c for c, dtype in STUDENT_DTYPES.items()
+                               if dtype == 'object' and c != 'name']
@@ -0,0 +1,52 @@
+import hashlib
+import hmac
+import os
+
+# Stored as "pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>", so the work
+# factor can be raised later without invalidating existing passwords
+SCHEME = 'pbkdf2_sha256'
+PBKDF2_ITERATIONS = 600_000
+SALT_BYTES = 16
+
+
+def hash_password(password: str, iterations: int = PBKDF2_ITERATIONS) -> str:
+    """Salted PBKDF2-HMAC-SHA256 hash of a password, in the stored format"""
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f"{SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def _parse(stored: str):
+    parts = stored.split('$')
+    if len(parts) != 4 or parts[0] != SCHEME or not parts[1].isdigit():
+        return None
+    try:
+        return int(parts[1]), bytes.fromhex(parts[2]), bytes.fromhex(parts[3])
+    except ValueError:
+        return None
+
+
+def is_password_hash(stored: str) -> bool:
+    return _parse(stored) is not None
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """
+    Whether ``password`` matches a hash from hash_password()
+
+    Takes as long as hashing did (deliberately: that is what makes guessing
+    expensive), so call it off the GUI thread. Anything that is not a
+    valid hash, such as a plaintext password, never matches.
+    """
+    parsed = _parse(stored)
+    if parsed is None:
+        return False
+    iterations, salt, expected = parsed
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(stored: str) -> bool:
+    """Whether a hash uses fewer iterations than PBKDF2_ITERATIONS"""
+    parsed = _parse(stored)
+    return parsed is None or parsed[0] < PBKDF2_ITERATIONS
@@ -0,0 +1,123 @@
+"""
+Memory-mapped columnar snapshot of the students table
+
+The snapshot is a StudentTable saved as one .npy file per column under
+``cache/snapshots/<database>/<epoch>-<version>/``. It is keyed on the
+trigger-maintained data version, so it is rewritten on first use after
+any change to students and otherwise opened with np.load(mmap_mode='r'):
+repeated analysis and preprocessing read zero-copy views of the page
+cache instead of re-querying SQLite, and worker processes that open the
+same snapshot share those pages.
+"""
+import hashlib
+import os
+import shutil
+import threading
+from typing import Optional, Sequence, Tuple
+
+from .aggregates import get_data_version
+from .connection import get_pool, read_transaction
+from .db_operations import get_student_table
+from .student_table import StudentTable
+
+SNAPSHOT_DIR = os.path.join(os.environ.get('STUDENT_CACHE_DIR', 'cache'), 'snapshots')
+
+_lock = threading.Lock()
+_opened = {}  # snapshot directory -> (StudentTable, data version), current version only
+
+
+def _database_dir(db_path: Optional[str] = None) -> str:
+    db_path = os.path.abspath(db_path or get_pool().db_path)
+    return os.path.join(SNAPSHOT_DIR, hashlib.sha1(db_path.encode()).hexdigest()[:16])
+
+
+def snapshot_path(epoch: str, version: int, db_path: Optional[str] = None) -> str:
+    return os.path.join(_database_dir(db_path), f"{epoch}-{version}")
+
+
+def write_snapshot() -> str:
+    """
+    Write a snapshot of the current data and remove older ones
+
+    The version and the rows are read in one transaction, so the snapshot
+    never carries a version that does not match its contents.
+
+    Returns:
+        The snapshot directory
+    """
+    with read_transaction() as conn:
+        epoch, version = get_data_version(conn)
+        table = get_student_table()
+
+    directory = snapshot_path(epoch, version)
+    if not os.path.exists(directory):
+        tmp = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+        table.save(tmp)
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            # Another thread or process published the same version first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    # Open memory maps keep their pages after the files are unlinked
+    parent = os.path.dirname(directory)
+    for entry in os.listdir(parent):
+        path = os.path.join(parent, entry)
+        if path != directory and '.tmp-' not in entry:
+            shutil.rmtree(path, ignore_errors=True)
+    return directory
+
+
+def ensure_snapshot() -> str:
+    """
+    Directory of the snapshot of the current data, writing it if the data
+    changed since the last one; other processes can StudentTable.load() it
+    """
+    epoch, version = get_data_version()
+    directory = snapshot_path(epoch, version)
+    if not os.path.exists(os.path.join(directory, 'categories.json')):
+        directory = write_snapshot()
+    return directory
+
+
+def snapshot_with_version(columns: Optional[Sequence[str]] = None
+                          ) -> Tuple[StudentTable, Tuple[str, int]]:
+    """
+    Memory-map the snapshot of the current data, writing it first if the
+    data changed since the last one
+
+    Args:
+        columns: Columns to map (defaults to all student columns)
+
+    Returns:
+        The table and the (epoch, version) of the data it holds, which
+        identifies the data for caches built from it (e.g. trained models)
+    """
+    epoch, version = get_data_version()
+    directory = snapshot_path(epoch, version)
+    with _lock:
+        opened = _opened.get(directory)
+        if opened is None:
+            try:
+                table = StudentTable.load(directory)
+            except OSError:
+                # Not written yet, or pruned by a process that saw newer data
+                directory = write_snapshot()
+                table = StudentTable.load(directory)
+                epoch, version = os.path.basename(directory).rsplit('-', 1)
+                version = int(version)
+            opened = (table, (epoch, version))
+            _opened.clear()
+            _opened[directory] = opened
+    table, data_version = opened
+    return (table if columns is None else table.select(columns)), data_version
+
+
+def open_snapshot(columns: Optional[Sequence[str]] = None) -> StudentTable:
+    """Memory-map the snapshot of the current data (see snapshot_with_version)"""
+    return snapshot_with_version(columns)[0]
+
+
+def snapshot_frame(columns: Optional[Sequence[str]] = None):
+    """Students as a DataFrame backed by the snapshot's memory-mapped columns"""
+    return open_snapshot(columns).to_frame()
@@ -0,0 +1,212 @@
+import json
+import os
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .models import Student, STUDENT_COLUMNS, STUDENT_DTYPES, STUDENT_CATEGORICAL_COLUMNS
+
+# Rows decoded at a time when iterating, bounding the temporary Python objects
+ITER_BLOCK_SIZE = 10_000
+
+
+def _smallest_int(values: np.ndarray) -> np.ndarray:
+    """Downcast an int64 array to the narrowest integer type that holds it"""
+    if not len(values):
+        return values.astype(np.int8)
+    low, high = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values
+
+
+class StudentTable(Sequence):
+    """
+    Students stored column-wise (struct of arrays)
+
+    Integer columns are narrowed to the smallest dtype that fits (NULLs
+    force float64 with NaN), text columns with few distinct values are
+    stored as integer codes into a sorted category array (-1 for NULL), and
+    only ``name`` keeps one Python string per student. Indexing and
+    iteration still hand out Student records, decoded on demand, so code
+    written against a list of Student keeps working.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: Dict[str, np.ndarray]):
+        self._columns = columns
+        self._categories = categories
+        self._length = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_batches(cls, batches: Iterable[Sequence],
+                     columns: Sequence[str] = STUDENT_COLUMNS) -> 'StudentTable':
+        """Build a table from batches of row tuples in ``columns`` order"""
+        columns = list(columns)
+        lookups = {c: {} for c in columns if c in STUDENT_CATEGORICAL_COLUMNS}
+        parts = {c: [] for c in columns}
+
+        for rows in batches:
+            for column, values in zip(columns, zip(*rows)):
+                if column in lookups:
+                    # Factorize the batch in C, then map its few distinct
+                    # values onto the table-wide codes (NULL stays -1)
+                    batch_codes, uniques = pd.factorize(np.array(values, dtype=object))
+                    lookup = lookups[column]
+                    remap = np.array([lookup.setdefault(u, len(lookup)) for u in uniques] + [-1],
+                                     dtype=np.int32)
+                    parts[column].append(remap[batch_codes])
+                elif STUDENT_DTYPES[column] == 'int64':
+                    try:
+                        parts[column].append(np.fromiter(values, dtype=np.int64, count=len(values)))
+                    except TypeError:
+                        parts[column].append(np.array(values, dtype=np.float64))
+                else:
+                    parts[column].append(np.array(values, dtype=object))
+
+        data, categories = {}, {}
+        for column in columns:
+            arrays = parts[column]
+            if column in lookups:
+                codes = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int32)
+                # Codes were handed out in order of appearance; renumber them
+                # to sorted category order so tables built alike compare equal
+                seen = list(lookups[column])
+                order = sorted(range(len(seen)), key=lambda i: seen[i])
+                remap = np.empty(len(seen) + 1, dtype=np.int32)
+                remap[order] = np.arange(len(seen), dtype=np.int32)
+                remap[-1] = -1
+                data[column] = _smallest_int(remap[codes])
+                categories[column] = np.array([seen[i] for i in order], dtype=object)
+            elif STUDENT_DTYPES[column] == 'int64':
+                if any(a.dtype == np.float64 for a in arrays):
+                    data[column] = np.concatenate([a.astype(np.float64) for a in arrays])
+                else:
+                    data[column] = _smallest_int(np.concatenate(arrays) if arrays
+                                                 else np.empty(0, dtype=np.int64))
+            else:
+                data[column] = np.concatenate(arrays) if arrays else np.empty(0, dtype=object)
+        return cls(data, categories)
+
+    # Persistence
+
+    def save(self, directory: str):
+        """
+        Write one .npy file per column plus ``categories.json``
+
+        ``name`` is stored as fixed-width text so every file can be
+        memory-mapped by load().
+        """
+        os.makedirs(directory, exist_ok=True)
+        for column, values in self._columns.items():
+            if values.dtype == object:
+                values = values.astype(str)
+            np.save(os.path.join(directory, f"{column}.npy"), values, allow_pickle=False)
+        with open(os.path.join(directory, 'categories.json'), 'w') as f:
+            json.dump({'columns': list(self._columns),
+                       'categories': {c: v.tolist() for c, v in self._categories.items()}}, f)
+
+    @classmethod
+    def load(cls, directory: str, columns: Optional[Sequence[str]] = None,
+             mmap: bool = True) -> 'StudentTable':
+        """
+        Open a table written by save(); with ``mmap`` the columns are
+        read-only views of the files, paged in on first touch and shared
+        between every process that opens them
+        """
+        with open(os.path.join(directory, 'categories.json')) as f:
+            meta = json.load(f)
+        columns = list(columns) if columns else meta['columns']
+        data = {c: np.load(os.path.join(directory, f"{c}.npy"), mmap_mode='r' if mmap else None,
+                           allow_pickle=False) for c in columns}
+        categories = {c: np.array(v, dtype=object) for c, v in meta['categories'].items() if c in data}
+        return cls(data, categories)
+
+    # Column access
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def codes(self, column: str) -> np.ndarray:
+        """Integer codes of a categorical column (-1 for NULL)"""
+        return self._columns[column]
+
+    def categories(self, column: str) -> np.ndarray:
+        return self._categories[column]
+
+    def select(self, columns: Sequence[str]) -> 'StudentTable':
+        """A table sharing this one's arrays for a subset of columns"""
+        unknown = [c for c in columns if c not in self._columns]
+        if unknown:
+            raise ValueError(f"Unknown student columns: {', '.join(unknown)}")
+        return StudentTable({c: self._columns[c] for c in columns},
+                            {c: self._categories[c] for c in columns if c in self._categories})
+
+    def column(self, column: str) -> np.ndarray:
+        """Decoded values of one column (categoricals as an object array)"""
+        values = self._columns[column]
+        if column in self._categories:
+            labels = np.append(self._categories[column], None)
+            return labels[values]
+        return values
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """DataFrame view of the table; categoricals become pandas Categoricals"""
+        data = {}
+        for column in (columns or self._columns):
+            values = self._columns[column]
+            if column in self._categories:
+                data[column] = pd.Categorical.from_codes(values, categories=self._categories[column])
+            else:
+                data[column] = values
+        return pd.DataFrame(data, copy=False)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays (object columns count pointers only)"""
+        return sum(a.nbytes for a in self._columns.values()) + \
+            sum(c.nbytes for c in self._categories.values())
+
+    # Record access
+
+    def _decoded(self, column: str, index) -> list:
+        values = self._columns[column][index]
+        if column in self._categories:
+            labels = self._categories[column]
+            return [labels[code] if code >= 0 else None for code in values.tolist()]
+        if values.dtype == np.float64 and STUDENT_DTYPES[column] == 'int64':
+            return [None if v != v else int(v) for v in values.tolist()]
+        return values.tolist()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Student, 'StudentTable']:
+        if isinstance(index, slice):
+            return StudentTable({c: a[index] for c, a in self._columns.items()}, self._categories)
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("student index out of range")
+        return self._student({c: self._decoded(c, slice(index, index + 1))[0] for c in self._columns})
+
+    def __iter__(self) -> Iterator[Student]:
+        for start in range(0, self._length, ITER_BLOCK_SIZE):
+            block = slice(start, start + ITER_BLOCK_SIZE)
+            decoded = {c: self._decoded(c, block) for c in self._columns}
+            for values in zip(*decoded.values()):
+                yield self._student(dict(zip(decoded, values)))
+
+    @staticmethod
+    def _student(values: Dict[str, object]) -> Student:
+        # Columns that were not loaded are left as None
+        return Student(**{c: values.get(c) for c in STUDENT_COLUMNS})
+
+    def find(self, student_id: int) -> Optional[Student]:
+        """The student with ``student_id``, or None"""
+        matches = np.flatnonzero(self._columns['student_id'] == student_id)
+        return self[int(matches[0])] if len(matches) else None
@@ -0,0 +1,44 @@
+"""
+Shared fixtures: each test class gets its own freshly migrated database in
+a temporary directory, configured through database.connection.configure.
+"""
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from database.connection import configure, get_pool
+from database.db_operations import initialize_database
+
+TRAIN_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'train.csv')
+
+
+def train_rows(n: int = 20) -> pd.DataFrame:
+    """The first ``n`` rows of train.csv"""
+    return pd.read_csv(TRAIN_CSV, nrows=n)
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Points the shared connection pool at a new database for the test class"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.previous = get_pool().db_path
+        cls.db_path = os.path.join(cls.directory.name, 'students.db')
+        configure(cls.db_path)
+        initialize_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        get_pool().close()
+        configure(cls.previous)
+        cls.directory.cleanup()
+
+    @classmethod
+    def write_csv(cls, df: pd.DataFrame, name: str = 'students.csv') -> str:
+        """Write ``df`` to a CSV file in the class's temporary directory"""
+        path = os.path.join(cls.directory.name, name)
+        df.to_csv(path, index=False)
+        return path
@@ -0,0 +1,121 @@
+"""
+Password hashing (database.passwords), the lockout in database.auth, and
+the migration of plaintext and older-work-factor passwords.
+"""
+import os
+import tempfile
+import time
+import unittest
+
+from database.auth import Authenticator, LoginLocked
+from database.connection import configure, get_pool, transaction
+from database.db_operations import get_user, initialize_database
+from database.migrations import MIGRATIONS, schema_version
+from database.passwords import (PBKDF2_ITERATIONS, hash_password, is_password_hash,
+                                needs_rehash, verify_password)
+from tests.support import DatabaseTestCase
+
+# Enough to exercise the format without paying for the real work factor
+FAST = 1000
+
+
+class PasswordTest(unittest.TestCase):
+    def test_round_trip(self):
+        stored = hash_password('s3cret', FAST)
+        self.assertTrue(is_password_hash(stored))
+        self.assertTrue(verify_password('s3cret', stored))
+        self.assertFalse(verify_password('S3cret', stored))
+
+    def test_salted(self):
+        self.assertNotEqual(hash_password('s3cret', FAST), hash_password('s3cret', FAST))
+
+    def test_plaintext_never_matches(self):
+        self.assertFalse(is_password_hash('admin123'))
+        self.assertFalse(verify_password('admin123', 'admin123'))
+        self.assertTrue(needs_rehash('admin123'))
+
+    def test_needs_rehash_below_the_work_factor(self):
+        self.assertTrue(needs_rehash(hash_password('x', FAST)))
+        self.assertFalse(needs_rehash(f"pbkdf2_sha256${PBKDF2_ITERATIONS}$00$00"))
+
+
+class AuthenticatorTest(DatabaseTestCase):
+    def setUp(self):
+        with transaction() as conn:
+            conn.execute("DELETE FROM users WHERE username != 'admin'")
+            conn.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                         ('teacher', hash_password('chalk', FAST), 'teacher'))
+
+    def test_authenticates(self):
+        auth = Authenticator()
+        self.assertEqual(auth.authenticate('admin', 'admin123').username, 'admin')
+        self.assertIsNone(auth.authenticate('admin', 'wrong'))
+        self.assertIsNone(auth.authenticate('nobody', 'admin123'))
+
+    def test_upgrades_an_older_work_factor(self):
+        auth = Authenticator()
+        self.assertEqual(auth.authenticate('teacher', 'chalk').username, 'teacher')
+        stored = get_user('teacher').password
+        self.assertFalse(needs_rehash(stored))
+        self.assertTrue(verify_password('chalk', stored))
+
+    def test_locks_out_after_repeated_failures(self):
+        auth = Authenticator(max_attempts=2, lockout_seconds=60)
+        for _ in range(2):
+            self.assertIsNone(auth.authenticate('teacher', 'wrong'))
+        with self.assertRaises(LoginLocked):
+            auth.authenticate('teacher', 'chalk')
+        self.assertGreater(auth.locked_for('teacher'), 0)
+        # Other usernames are unaffected
+        self.assertIsNotNone(auth.authenticate('admin', 'admin123'))
+
+    def test_unknown_usernames_lock_out_too(self):
+        auth = Authenticator(max_attempts=2, lockout_seconds=60)
+        for _ in range(2):
+            self.assertIsNone(auth.authenticate('nobody', 'x'))
+        self.assertGreater(auth.locked_for('nobody'), 0)
+
+    def test_success_and_expiry_reset_the_count(self):
+        auth = Authenticator(max_attempts=2, lockout_seconds=0.2)
+        auth.authenticate('teacher', 'wrong')
+        auth.authenticate('teacher', 'chalk')
+        auth.authenticate('teacher', 'wrong')
+        self.assertEqual(auth.locked_for('teacher'), 0)
+        auth.authenticate('teacher', 'wrong')
+        self.assertGreater(auth.locked_for('teacher'), 0)
+        time.sleep(0.25)
+        self.assertEqual(auth.locked_for('teacher'), 0)
+        self.assertIsNotNone(auth.authenticate('teacher', 'chalk'))
+
+
+class PlaintextMigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.previous = get_pool().db_path
+        configure(os.path.join(self.directory.name, 'legacy.db'))
+
+    def tearDown(self):
+        get_pool().close()
+        configure(self.previous)
+        self.directory.cleanup()
+
+    def test_hashes_plaintext_passwords(self):
+        # A database from before the password migration, with plaintext users
+        with transaction() as conn:
+            for number, (name, apply) in enumerate(MIGRATIONS, start=1):
+                if name == "salted password hashes":
+                    break
+                apply(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+            conn.execute("INSERT INTO users (username, password, role) "
+                         "VALUES ('admin', 'admin123', 'admin')")
+        initialize_database()
+        with transaction() as conn:
+            self.assertEqual(schema_version(conn), len(MIGRATIONS))
+        stored = get_user('admin').password
+        self.assertTrue(is_password_hash(stored))
+        self.assertTrue(verify_password('admin123', stored))
+
+
+if __name__ == '__main__':
+    unittest.main()
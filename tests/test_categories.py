@@ -0,0 +1,78 @@
+"""
+Score bands (database.categories): the scalar, vectorized and SQL
+categorizations must agree, missing scores have no category, and
+per-school bands apply only to their own location.
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from database.categories import (DEFAULT_BANDS, ScoreBands, categorize_frame, categorize_scores,
+                                 get_score_bands, set_score_bands)
+from database.connection import connection
+from database.importer import import_csv
+from tests.support import DatabaseTestCase, train_rows
+
+SCORES = [0, 24, 24.5, 25, 34, 35, 44.9, 45, 100, None, float('nan')]
+EXPECTED = ["Poor", "Poor", "Poor", "Average", "Average", "Good", "Good", "Excellent",
+            "Excellent", None, None]
+STRICT = ScoreBands((30, 40, 50), ("Poor", "Average", "Good", "Excellent"))
+
+
+class ScoreBandsTest(unittest.TestCase):
+    def test_category(self):
+        self.assertEqual([DEFAULT_BANDS.category(s) for s in SCORES], EXPECTED)
+
+    def test_categorize_scores_matches_category(self):
+        self.assertEqual(categorize_scores(SCORES).tolist(), EXPECTED)
+        self.assertEqual(categorize_scores(np.array([], dtype=float)).tolist(), [])
+
+    def test_categorize_frame_uses_school_bands(self):
+        df = pd.DataFrame({'score': [35, 35, None], 'location': ['U', 'R', 'R']})
+        categories = categorize_frame(df, {'R': STRICT})
+        self.assertEqual(categories.tolist(), ["Good", "Average", None])
+
+    def test_invalid_bands(self):
+        with self.assertRaises(ValueError):
+            ScoreBands((10, 20), ("a", "b"))
+        with self.assertRaises(ValueError):
+            ScoreBands((20, 10), ("a", "b", "c"))
+
+    def test_json_round_trip(self):
+        self.assertEqual(ScoreBands.from_json(STRICT.to_json()), STRICT)
+
+
+class SchoolBandsTest(DatabaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import_csv(cls.write_csv(train_rows(60)))
+
+    def tearDown(self):
+        set_score_bands('R', None)
+
+    def _categories(self):
+        with connection() as conn:
+            return conn.execute("SELECT location, score, performance_category FROM students "
+                                "ORDER BY student_id").fetchall()
+
+    def test_set_score_bands_recategorizes_in_sql(self):
+        updated = set_score_bands('R', STRICT)
+        self.assertEqual(updated, 60)
+        self.assertEqual(get_score_bands(), {'R': STRICT})
+        self.assertIn(('R', 35, "Average"), self._categories())  # "Good" by default
+        for location, score, category in self._categories():
+            bands = STRICT if location == 'R' else DEFAULT_BANDS
+            self.assertEqual(category, bands.category(score))
+
+    def test_reset_restores_the_defaults(self):
+        set_score_bands('R', STRICT)
+        set_score_bands('R', None)
+        self.assertEqual(get_score_bands(), {})
+        for _, score, category in self._categories():
+            self.assertEqual(category, DEFAULT_BANDS.category(score))
+
+
+if __name__ == '__main__':
+    unittest.main()
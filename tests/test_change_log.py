@@ -0,0 +1,91 @@
+"""
+The trigger-maintained data version and change log (get_changes), and the
+per-row content hashes, including writes from a plain sqlite3 connection
+that has no row_hash() function.
+"""
+import sqlite3
+import unittest
+
+from database.aggregates import bulk_load, get_changes, get_data_version
+from database.connection import connection, transaction
+from database.hashing import row_hash_sql
+from database.importer import import_csv, sync_csv
+from tests.support import DatabaseTestCase, train_rows
+
+ROWS = 20
+
+
+def _stale_hashes():
+    """Students whose stored hash is missing or does not match their row"""
+    with connection() as conn:
+        return [r[0] for r in conn.execute(
+            f"SELECT s.student_id FROM students s LEFT JOIN student_hashes h USING (student_id) "
+            f"WHERE h.hash IS NOT {row_hash_sql('s')} ORDER BY 1")]
+
+
+class ChangeLogTest(DatabaseTestCase):
+    def setUp(self):
+        self.rows = train_rows(ROWS)
+        self.csv = self.write_csv(self.rows)
+        import_csv(self.csv)
+        self.version = get_data_version()
+
+    def test_nothing_changed_after_import(self):
+        self.assertEqual(get_changes(self.version), [])
+        self.assertEqual(_stale_hashes(), [])
+
+    def test_logs_the_latest_operation_per_student(self):
+        with transaction() as conn:
+            conn.execute("UPDATE students SET absences = absences + 1 WHERE student_id = 1")
+            conn.execute("DELETE FROM students WHERE student_id = 2")
+            conn.execute("INSERT INTO students (student_id, name) VALUES (500, 'New')")
+            conn.execute("UPDATE students SET score = 40 WHERE student_id = 500")
+        self.assertEqual(get_changes(self.version), [(1, 'update'), (2, 'delete'), (500, 'update')])
+        self.assertEqual(get_data_version()[1], self.version[1] + 4)
+
+    def test_changing_a_student_id_logs_a_delete(self):
+        with transaction() as conn:
+            conn.execute("UPDATE students SET student_id = 600 WHERE student_id = 3")
+        self.assertEqual(sorted(get_changes(self.version)), [(3, 'delete'), (600, 'update')])
+
+    def test_unknown_versions(self):
+        epoch, version = self.version
+        self.assertIsNone(get_changes(('another database', version)))
+        self.assertIsNone(get_changes((epoch, version + 1)))  # from the future
+        with transaction() as conn, bulk_load(conn):
+            conn.execute("UPDATE students SET absences = 0")
+        self.assertIsNone(get_changes(self.version))  # predates the bulk load
+        self.assertEqual(get_changes(get_data_version()), [])
+
+    def test_sync_keeps_hashes_current(self):
+        rows = self.rows.copy()
+        rows.loc[0, 'absences'] += 1
+        sync_csv(self.write_csv(rows, 'changed.csv'))
+        self.assertEqual(get_changes(self.version), [(1, 'update')])
+        self.assertEqual(_stale_hashes(), [])
+
+    def test_category_updates_keep_the_hash(self):
+        with transaction() as conn:
+            conn.execute("UPDATE students SET performance_category = 'Good' WHERE student_id = 4")
+        self.assertEqual(get_changes(self.version), [(4, 'update')])
+        self.assertEqual(_stale_hashes(), [])
+
+    def test_plain_sqlite_writers(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.execute("UPDATE students SET absences = absences + 1 WHERE student_id = 5")
+                conn.execute("INSERT INTO students (student_id, name) VALUES (700, 'Other client')")
+                conn.execute("DELETE FROM students WHERE student_id = 6")
+        finally:
+            conn.close()
+        self.assertEqual(get_changes(self.version), [(5, 'update'), (700, 'insert'), (6, 'delete')])
+        # The edited and inserted rows have no hash, so a sync treats them as changed
+        self.assertEqual(_stale_hashes(), [5, 700])
+        result = sync_csv(self.csv)
+        self.assertEqual((result.inserted, result.updated), (1, 1))  # 6 back, 5 reverted
+        self.assertEqual(_stale_hashes(), [700])  # not in the file, so not rehashed
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+CSV import and incremental sync (database.importer): import_csv replaces
+the table; sync_csv writes only new and changed rows and reports how
+many were inserted, updated, unchanged and deleted.
+"""
+import sqlite3
+import unittest
+
+import pandas as pd
+
+from database.aggregates import get_category_counts, get_data_version
+from database.categories import DEFAULT_BANDS
+from database.connection import connection, transaction
+from database.db_operations import count_students
+from database.importer import import_csv, sync_csv
+from tests.support import DatabaseTestCase, train_rows
+
+ROWS = 30
+
+
+def _student(student_id, columns="name, absences, score, performance_category"):
+    with connection() as conn:
+        return conn.execute(f"SELECT {columns} FROM students WHERE student_id = ?",
+                            (student_id,)).fetchone()
+
+
+class ImportTest(DatabaseTestCase):
+    def setUp(self):
+        self.rows = train_rows(ROWS)
+        import_csv(self.write_csv(self.rows))
+
+    def test_import_replaces_the_table(self):
+        self.assertEqual(count_students(), ROWS)
+        import_csv(self.write_csv(self.rows.head(5)))
+        self.assertEqual(count_students(), 5)
+
+    def test_import_fills_defaults_and_categories(self):
+        name, absences, score, category = _student(1)
+        self.assertEqual(name, 'Unknown')  # train.csv has no Name column
+        self.assertEqual((absences, score), (self.rows.absences[0], self.rows.Score[0]))
+        self.assertEqual(category, DEFAULT_BANDS.category(score))
+        self.assertEqual(get_category_counts().sum(), ROWS)
+
+    def test_failed_import_leaves_the_table_alone(self):
+        broken = self.rows.copy()
+        broken.loc[5, 'S/N'] = broken.loc[4, 'S/N']  # duplicate primary key
+        with self.assertRaises(sqlite3.IntegrityError):
+            import_csv(self.write_csv(broken, 'broken.csv'))
+        self.assertEqual(count_students(), ROWS)
+
+
+class SyncTest(DatabaseTestCase):
+    def setUp(self):
+        self.rows = train_rows(ROWS)
+        import_csv(self.write_csv(self.rows))
+
+    def test_unchanged_file_writes_nothing(self):
+        version = get_data_version()
+        result = sync_csv(self.write_csv(self.rows))
+        self.assertEqual((result.inserted, result.updated, result.unchanged, result.deleted),
+                         (0, 0, ROWS, 0))
+        self.assertEqual(get_data_version(), version)
+
+    def test_counts_inserted_updated_and_unchanged(self):
+        rows = self.rows.drop(index=2)  # student 3 is missing from the file
+        rows.loc[0, 'absences'] += 1
+        rows.loc[1, 'Score'] += 1
+        new = rows.iloc[[0]].assign(**{'S/N': 1000})
+        rows = pd.concat([rows, new], ignore_index=True)
+        result = sync_csv(self.write_csv(rows))
+        self.assertEqual((result.inserted, result.updated, result.unchanged, result.deleted),
+                         (1, 2, ROWS - 3, 0))
+        self.assertEqual(count_students(), ROWS + 1)
+        self.assertIsNotNone(_student(3))
+        self.assertEqual(_student(1)[1], self.rows.absences[0] + 1)
+
+    def test_delete_missing(self):
+        rows = self.rows.drop(index=[2, 3])
+        result = sync_csv(self.write_csv(rows), delete_missing=True)
+        self.assertEqual((result.unchanged, result.deleted), (ROWS - 2, 2))
+        self.assertEqual(count_students(), ROWS - 2)
+        self.assertIsNone(_student(3))
+        self.assertEqual(get_category_counts().sum(), ROWS - 2)
+
+    def test_category_kept_unless_the_score_changes(self):
+        with transaction() as conn:
+            conn.execute("UPDATE students SET performance_category = 'Set by hand' "
+                         "WHERE student_id IN (1, 2)")
+        rows = self.rows.copy()
+        rows.loc[0, 'absences'] += 1  # student 1: score unchanged
+        rows.loc[1, 'Score'] = 44     # student 2: new score
+        result = sync_csv(self.write_csv(rows))
+        self.assertEqual(result.updated, 2)
+        self.assertEqual(_student(1)[3], 'Set by hand')
+        self.assertEqual(_student(2)[3], DEFAULT_BANDS.category(44))
+
+    def test_keeps_columns_the_file_lacks(self):
+        with transaction() as conn:
+            conn.execute("UPDATE students SET name = 'Ada' WHERE student_id = 1")
+        rows = self.rows.copy()
+        rows.loc[0, 'absences'] += 1
+        self.assertEqual(sync_csv(self.write_csv(rows)).updated, 1)
+        self.assertEqual(_student(1)[0], 'Ada')
+
+    def test_needs_student_numbers(self):
+        with self.assertRaises(ValueError):
+            sync_csv(self.write_csv(self.rows.drop(columns=['S/N'])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Keyset pagination of fetch_student_rows and query_students: walking the
+pages with ``after`` must yield exactly the rows of one unpaged query, in
+the same order, for every sort column and direction, NULLs included.
+"""
+import unittest
+
+from database.connection import transaction
+from database.db_operations import StudentFilter, fetch_student_rows, query_students
+from database.importer import import_csv
+from tests.support import DatabaseTestCase, train_rows
+
+COLUMNS = ['student_id', 'name', 'score', 'performance_category', 'studytime', 'absences']
+PAGE_SIZE = 7
+
+
+def _pages(where=None, params=(), order_by='student_id', descending=False):
+    rows, after = [], None
+    key = COLUMNS.index(order_by)
+    while True:
+        page = fetch_student_rows(COLUMNS, where, params, order_by=order_by,
+                                  descending=descending, limit=PAGE_SIZE, after=after)
+        if not page:
+            return rows
+        rows.extend(page)
+        after = (page[-1][key], page[-1][0])
+
+
+class KeysetPaginationTest(DatabaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import_csv(cls.write_csv(train_rows(60)))
+        # Some NULL sort keys, which row-value comparisons never match
+        with transaction() as conn:
+            conn.execute("UPDATE students SET score = NULL, studytime = NULL, "
+                         "performance_category = NULL WHERE student_id % 6 = 0")
+
+    def test_pages_match_one_query(self):
+        for order_by in COLUMNS:
+            for descending in (False, True):
+                with self.subTest(order_by=order_by, descending=descending):
+                    expected = fetch_student_rows(COLUMNS, order_by=order_by, descending=descending)
+                    self.assertEqual(_pages(order_by=order_by, descending=descending), expected)
+
+    def test_pages_with_a_filter(self):
+        where, params = StudentFilter(gender='F').to_sql()
+        for descending in (False, True):
+            with self.subTest(descending=descending):
+                expected = fetch_student_rows(COLUMNS, where, params, order_by='score',
+                                              descending=descending)
+                self.assertEqual(_pages(where, params, 'score', descending), expected)
+
+    def test_query_students_continues_after_the_last_row(self):
+        first, total = query_students(columns=COLUMNS, order_by='absences', limit=10)
+        last = first[-1]
+        second, _ = query_students(columns=COLUMNS, order_by='absences', limit=10,
+                                   after=(last[COLUMNS.index('absences')], last[0]))
+        everything = fetch_student_rows(COLUMNS, order_by='absences')
+        self.assertEqual(total, 60)
+        self.assertEqual(first + second, everything[:20])
+
+    def test_after_needs_an_order(self):
+        with self.assertRaises(ValueError):
+            fetch_student_rows(COLUMNS, limit=5, after=(None, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
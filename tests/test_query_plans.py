@@ -0,0 +1,43 @@
+"""
+Access paths of the StudentFilter conditions (see _student_indexes in
+database.migrations), checked with EXPLAIN QUERY PLAN against a freshly
+migrated database so that changing an index cannot silently turn a
+dashboard filter into a full table scan.
+
+Run with ``python -m unittest`` or ``pytest``.
+"""
+import unittest
+
+from database.db_operations import StudentFilter, explain_student_filter
+from tests.support import DatabaseTestCase
+
+# Filter -> expected plan fragment
+INDEXED = [
+    (StudentFilter(student_id=3), 'SEARCH students USING INTEGER PRIMARY KEY'),
+    (StudentFilter(performance_category='Good'), 'idx_students_category_score (performance_category=?)'),
+    (StudentFilter(gender='F'), 'idx_students_gender_score (gender=?)'),
+    (StudentFilter(location='U'), 'idx_students_location_score (location=?)'),
+    (StudentFilter(min_score=50), 'idx_students_score (score>?)'),
+    (StudentFilter(min_score=40, max_score=60), 'idx_students_score (score>? AND score<?)'),
+    (StudentFilter(min_absences=3), 'idx_students_absences_score (absences>?)'),
+    (StudentFilter(gender='F', min_score=40), 'idx_students_gender_score (gender=? AND score>?)'),
+]
+
+
+class QueryPlanTest(DatabaseTestCase):
+    def test_filters_search_their_index(self):
+        for filters, expected in INDEXED:
+            for select in ("COUNT(*)", "AVG(score)"):
+                with self.subTest(where=filters.to_sql()[0], select=select):
+                    plan = " | ".join(explain_student_filter(filters, select))
+                    self.assertIn('SEARCH', plan)
+                    self.assertIn(expected, plan)
+
+    def test_name_search_scans(self):
+        # A substring LIKE cannot use an index; this records that it scans
+        plan = explain_student_filter(StudentFilter(name_contains='ab'))
+        self.assertEqual(plan, ['SCAN students'])
+
+
+if __name__ == '__main__':
+    unittest.main()
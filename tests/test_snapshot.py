@@ -0,0 +1,90 @@
+"""
+Columnar snapshots (database.snapshot, database.student_table): a saved
+and memory-mapped StudentTable must hold exactly what the students table
+does, NULLs included, and be rewritten once the data version moves on.
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from database import snapshot
+from database.aggregates import get_data_version
+from database.connection import connection, transaction
+from database.db_operations import get_student_table, get_students_frame
+from database.importer import import_csv
+from database.models import STUDENT_COLUMNS
+from database.student_table import StudentTable
+from tests.support import DatabaseTestCase, train_rows
+
+
+def _same_frames(test, actual: pd.DataFrame, expected: pd.DataFrame):
+    # get_students_frame() has no ORDER BY; a covering index may decide it
+    actual = actual.sort_values('student_id', ignore_index=True)
+    expected = expected.sort_values('student_id', ignore_index=True)
+    test.assertEqual(list(actual.columns), list(expected.columns))
+    for column in expected.columns:
+        with test.subTest(column=column):
+            left = actual[column].astype(object).where(actual[column].notna(), None)
+            right = expected[column].astype(object).where(expected[column].notna(), None)
+            test.assertEqual(left.tolist(), right.tolist())
+
+
+class SnapshotTest(DatabaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Keep snapshots out of the working tree's cache/
+        cls.snapshot_dir = snapshot.SNAPSHOT_DIR
+        snapshot.SNAPSHOT_DIR = os.path.join(cls.directory.name, 'snapshots')
+        import_csv(cls.write_csv(train_rows(40)))
+        with transaction() as conn:
+            conn.execute("UPDATE students SET score = NULL, gender = NULL, name = 'Zoë' "
+                         "WHERE student_id = 7")
+
+    @classmethod
+    def tearDownClass(cls):
+        snapshot.SNAPSHOT_DIR = cls.snapshot_dir
+        super().tearDownClass()
+
+    def test_save_and_load_round_trip(self):
+        table = get_student_table()
+        with tempfile.TemporaryDirectory() as directory:
+            table.save(directory)
+            loaded = StudentTable.load(directory)
+            self.assertEqual(list(loaded), list(table))
+            self.assertIsInstance(loaded.column('score'), np.memmap)
+            self.assertEqual(loaded.find(7).name, 'Zoë')
+            self.assertIsNone(loaded.find(7).gender)
+            self.assertIsNone(loaded.find(7).score)
+            del loaded  # release the memory maps before the directory goes
+
+    def test_snapshot_matches_the_table(self):
+        table, version = snapshot.snapshot_with_version()
+        self.assertEqual(version, get_data_version())
+        self.assertEqual(len(table), 40)
+        _same_frames(self, table.to_frame(), get_students_frame())
+        columns = ['student_id', 'score', 'location']
+        _same_frames(self, snapshot.snapshot_frame(columns), get_students_frame(columns))
+
+    def test_rewritten_after_a_change(self):
+        first = snapshot.ensure_snapshot()
+        self.assertEqual(snapshot.ensure_snapshot(), first)
+        with transaction() as conn:
+            conn.execute("UPDATE students SET absences = absences + 1 WHERE student_id = 1")
+        table, version = snapshot.snapshot_with_version(['student_id', 'absences'])
+        self.assertEqual(version, get_data_version())
+        second = snapshot.snapshot_path(*version)
+        self.assertNotEqual(second, first)
+        self.assertFalse(os.path.exists(first))  # older snapshots are pruned
+        with connection() as conn:
+            absences = conn.execute("SELECT absences FROM students WHERE student_id = 1").fetchone()[0]
+        self.assertEqual(table.find(1).absences, absences)
+        self.assertEqual(table.columns, ['student_id', 'absences'])
+        self.assertEqual(StudentTable.load(second).columns, STUDENT_COLUMNS)
+
+
+if __name__ == '__main__':
+    unittest.main()
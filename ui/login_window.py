@@ -1,8 +1,13 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QLabel, 
                             QLineEdit, QPushButton, QMessageBox)
-from PyQt5.QtCore import Qt
-import hashlib
-from database.db_operations import get_user
+from database.auth import Authenticator
+from ui.workers import JobScheduler
+
+
+def _authenticate_job(job, authenticator, username, password):
+    # Password verification is deliberately slow; keep it off the GUI thread
+    return authenticator.authenticate(username, password)
+
 
 class LoginWindow(QMainWindow):
     def __init__(self):
@@ -10,6 +15,8 @@ class LoginWindow(QMainWindow):
         self.setWindowTitle("Student Performance Prediction - Login")
         self.setFixedSize(500, 300)
         
+        self.authenticator = Authenticator()
+        self.jobs = JobScheduler(self, max_threads=1)
         self._setup_ui()
     
     def _setup_ui(self):
@@ -29,6 +36,7 @@ class LoginWindow(QMainWindow):
         self.password_label = QLabel("Password:")
         self.password_input = QLineEdit()
         self.password_input.setEchoMode(QLineEdit.Password)
+        self.password_input.returnPressed.connect(self._authenticate)
         layout.addWidget(self.password_label)
         layout.addWidget(self.password_input)
         
@@ -64,14 +72,27 @@ class LoginWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "Please enter both username and password")
             return
         
-        # In production, use proper password hashing
-        # hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        
-        user = get_user(username)
-        if user and user.password == password:  # Simple comparison for demo
-            from ui.main_window import MainWindow
-            self.main_window = MainWindow(user.id, user.role)
-            self.main_window.show()
-            self.close()
-        else:
+        if not self.login_button.isEnabled():
+            return  # a check is already running
+        self.login_button.setEnabled(False)
+        self.login_button.setText("Checking...")
+        job = self.jobs.submit(
+            "Login", _authenticate_job, self.authenticator, username, password,
+            on_result=self._on_authenticated,
+            on_error=lambda e: QMessageBox.warning(self, "Error", e),
+        )
+        job.signals.finished.connect(self._reset_login_button)
+    
+    def _reset_login_button(self):
+        self.login_button.setEnabled(True)
+        self.login_button.setText("Login")
+    
+    def _on_authenticated(self, user):
+        if user is None:
+            self.password_input.clear()
             QMessageBox.warning(self, "Error", "Invalid username or password")
+            return
+        from ui.main_window import MainWindow
+        self.main_window = MainWindow(user.id, user.role)
+        self.main_window.show()
+        self.close()
@@ -1,15 +1,136 @@
 from PyQt5.QtWidgets import (QMainWindow, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout,
-                            QLabel, QPushButton, QTableWidget, QTableWidgetItem, 
-                            QComboBox, QMessageBox, QFileDialog, QSizePolicy)
-from PyQt5.QtCore import Qt, QSize
+                            QLabel, QPushButton, QTableView, QLineEdit, QHeaderView,
+                            QComboBox, QMessageBox, QFileDialog, QSizePolicy, QProgressBar,
+                            QCheckBox, QPlainTextEdit)
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
 from PyQt5.QtGui import QFont
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import pandas as pd
-import sqlite3
-from database.db_operations import get_all_students
-from utils.data_processor import preprocess_data, calculate_performance
-from utils.ml_models import train_model
+from database.aggregates import get_data_version
+from database.db_operations import StudentFilter
+from database.models import STUDENT_COLUMNS
+from utils.charts import CHART_TYPES
+from utils.metrics import get_recorder, increment, profile_path, profiled, span
+from utils.model_registry import ModelRegistry
+from utils.reports import EXPORT_FORMATS, REPORT_TYPES, report_filename
+from ui.workers import JobScheduler
+from ui.student_table_model import StudentTableModel
+
+
+# Background job bodies. These run on the worker pool and must not touch widgets.
+# pandas, scikit-learn and matplotlib are imported inside them (and inside
+# the tabs that need them) so that opening the window stays fast.
+
+def _import_job(job, file_path):
+    from database.importer import import_csv
+    return import_csv(file_path, progress=lambda rows: job.report(-1, f"Imported {rows:,} rows"))
+
+
+def _sync_job(job, file_path):
+    from database.importer import sync_csv
+    return sync_csv(file_path, progress=lambda rows: job.report(-1, f"Compared {rows:,} rows"))
+
+
+# Preprocessing combo box entries -> PreprocessingPipeline settings
+MISSING_STRATEGIES = {"Drop rows": 'drop', "Fill with mean": 'mean', "Fill with median": 'median'}
+SCALING_METHODS = {"None": None, "Min-Max Scaling": 'minmax', "Standard Scaling": 'standard'}
+
+
+def _preprocess_job(job, missing_strategy, scaling):
+    from database.snapshot import snapshot_with_version
+    from utils.data_processor import build_preprocessed, save_preprocessed
+    job.report(10, "Loading students")
+    table, version = snapshot_with_version()
+    job.report(50, "Preprocessing")
+    data = build_preprocessed(table.to_frame(), missing_strategy, scaling, data_version=version)
+    job.report(80, "Saving preprocessed data")
+    save_preprocessed(data)
+    return data
+
+
+def _analysis_job(job, registry, algorithm, preprocessed=None):
+    from utils.model_registry import get_or_train
+    if preprocessed is not None and not preprocessed.is_current():
+        # Students changed since preprocessing; refit with the same settings
+        preprocessed = _preprocess_job(job, preprocessed.pipeline.missing_strategy,
+                                       preprocessed.pipeline.scaling)
+    if preprocessed is not None:
+        features, target = preprocessed.features, preprocessed.target
+        version = preprocessed.data_version
+    else:
+        from database.snapshot import snapshot_with_version
+        from utils.ml_models import DEFAULT_FEATURES
+        job.report(10, "Loading students")
+        table, version = snapshot_with_version(DEFAULT_FEATURES + ['performance_category'])
+        df = table.to_frame()
+        features = df[DEFAULT_FEATURES]
+        target = df['performance_category']
+    job.report(40, "Training model")
+    model, accuracy, cached = get_or_train(
+        registry, features, target, algorithm,
+        preprocessor=preprocessed.pipeline if preprocessed is not None else None,
+        data_version=version,
+    )
+    return model, accuracy, len(features), cached, preprocessed
+
+
+# Columns the Analysis tab can train separate models for ("location" tells schools apart)
+SEGMENT_COLUMNS = [c for c in STUDENT_COLUMNS
+                   if c not in ('student_id', 'name', 'score', 'performance_category')]
+
+
+def _segmented_job(job, algorithm, column, preprocessed=None):
+    from utils.segmented import train_segments
+    job.report(-1, f"Training one model per {column}")
+    return train_segments(
+        column, model_type=algorithm,
+        preprocessor=preprocessed.pipeline if preprocessed is not None else None,
+        progress=lambda done, total: job.report(100 * done // total, f"Trained {done} of {total} segments"),
+    )
+
+
+def _load_preprocessed_job(job):
+    from utils.data_processor import load_preprocessed
+    return load_preprocessed()
+
+
+def _restore_model_job(job, registry):
+    return registry.latest()
+
+
+def _predict_job(job, model):
+    from utils.predictor import score_students
+    return score_students(model, progress=lambda rows: job.report(-1, f"Scored {rows:,} students"))
+
+
+def _report_job(job, report_type, path, fmt, model, accuracy):
+    from utils.reports import build_report, export_report
+    report = build_report(report_type, model=model, accuracy=accuracy)
+    return export_report(report, path, fmt, progress=lambda rows: job.report(-1, f"Wrote {rows:,} rows"))
+
+
+def _school_reports_job(job, report_type, directory, fmt, model, accuracy):
+    from utils.reports import generate_school_reports
+    return generate_school_reports(
+        report_type, directory, fmt, model, accuracy,
+        progress=lambda done, total: job.report(100 * done // total, f"Wrote {done} of {total} school reports"),
+    )
+
+
+def _chart_data_job(job, chart_type):
+    """Load the data a chart needs and its data version; drawing stays on the GUI thread"""
+    from database.connection import read_transaction
+    from utils.charts import load_chart_data
+    with read_transaction() as conn:
+        return get_data_version(conn), load_chart_data(chart_type)
+
+
+# Operations listed in the status bar's latency tooltip
+METRICS_READOUT_SIZE = 10
+
+
+class _MetricsRelay(QObject):
+    """Carries metrics events from whichever thread recorded them to the GUI thread"""
+    event = pyqtSignal(object)
+
 
 class MainWindow(QMainWindow):
     def __init__(self, user_id, role):
@@ -17,6 +138,11 @@ class MainWindow(QMainWindow):
         self.user_id = user_id
         self.role = role
         self.current_model = None
+        self.model_accuracy = None
+        self.model_summary = None
+        self.preprocessed = None
+        self.model_registry = ModelRegistry()
+        self.jobs = JobScheduler(self)
         self.setWindowTitle("Student Performance Prediction System")
         self.setMinimumSize(1000, 700)  # Set a reasonable minimum size
         
@@ -41,30 +167,117 @@ class MainWindow(QMainWindow):
         self.tabs.setStyleSheet("QTabBar::tab { height: 30px; width: 120px; }")
         main_layout.addWidget(self.tabs)
         
-        # Initialize all tabs
-        self._init_student_tab()
-        self._init_preprocessing_tab()
-        self._init_analysis_tab()
-        self._init_visualization_tab()
-        self._init_reports_tab()
+        self._init_status_bar()
+        
+        # Initialize all tabs; only the visible one is built now, the
+        # others the first time they are activated
+        self._tab_builders = {}
+        self._add_tab("Student Data", self._init_student_tab)
+        self._add_tab("Preprocessing", self._init_preprocessing_tab)
+        self._add_tab("Analysis", self._init_analysis_tab)
+        self._add_tab("Visualization", self._init_visualization_tab)
+        self._add_tab("Reports", self._init_reports_tab)
+        self.tabs.currentChanged.connect(self._build_tab)
+        self._build_tab(self.tabs.currentIndex())
         
         # Status bar
         self.statusBar().showMessage("Ready")
+        self._restore_saved_model()
     
-    def _init_student_tab(self):
-        """Student Data Management Tab"""
+    def _add_tab(self, title, builder):
         tab = QWidget()
-        self.tabs.addTab(tab, "Student Data")
-        layout = QVBoxLayout()
-        tab.setLayout(layout)
-        
-        # Student table
-        self.student_table = QTableWidget()
+        tab.setLayout(QVBoxLayout())
+        index = self.tabs.addTab(tab, title)
+        self._tab_builders[index] = builder
+    
+    def _build_tab(self, index):
+        """Populate a tab the first time it is shown"""
+        builder = self._tab_builders.pop(index, None)
+        if builder is not None:
+            builder(self.tabs.widget(index).layout())
+    
+    def _restore_saved_model(self):
+        """Pick up the most recently used model from the registry in the background"""
+        self.jobs.submit(
+            "Load saved model", _restore_model_job, self.model_registry,
+            on_result=self._on_model_restored,
+            on_error=lambda e: self.statusBar().showMessage(f"Could not load saved models: {e}", 5000),
+        )
+        self.jobs.submit(
+            "Load preprocessed data", _load_preprocessed_job,
+            on_result=lambda data: self.preprocessed is None and self._set_preprocessed(data),
+        )
+    
+    def _on_model_restored(self, entry):
+        if entry is None or self.current_model is not None:
+            return
+        self.current_model = entry.model
+        self.model_accuracy = entry.accuracy
+        name = entry.model_type.replace('_', ' ').title()
+        self._show_model_summary(f"Loaded saved {name} model", entry.accuracy)
+    
+    def _show_model_summary(self, text, accuracy):
+        """Update the Analysis tab now, or once it is built"""
+        self.model_summary = (text, accuracy)
+        if hasattr(self, 'results_label'):
+            self.results_label.setText(text)
+            self.accuracy_label.setText(f"Model Accuracy: {accuracy:.2%}")
+    
+    def _init_status_bar(self):
+        """Progress indicator and cancel button for background jobs"""
+        self.job_progress = QProgressBar()
+        self.job_progress.setFixedWidth(200)
+        self.job_progress.setTextVisible(False)
+        self.statusBar().addPermanentWidget(self.job_progress)
+        
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.jobs.cancel_all)
+        self.statusBar().addPermanentWidget(self.cancel_btn)
+        
+        self.jobs.active_changed.connect(self._on_jobs_changed)
+        self._on_jobs_changed(0)
+        
+        # Latency readout: the last operation, the last few in the tooltip
+        self.metrics_label = QLabel()
+        self.statusBar().addPermanentWidget(self.metrics_label)
+        self._metrics_relay = _MetricsRelay(self)
+        self._metrics_relay.event.connect(self._on_metric)
+        self._metrics_listener = self._metrics_relay.event.emit
+        get_recorder().add_listener(self._metrics_listener)
+        
+        # Opt-in cProfile capture of the next background action
+        self.profile_btn = QPushButton("Profile next action")
+        self.profile_btn.setCheckable(True)
+        self.profile_btn.setToolTip("Write a cProfile capture of the next action's work")
+        self.statusBar().addPermanentWidget(self.profile_btn)
+    
+    def _init_student_tab(self, layout):
+        """Student Data Management Tab"""
+        # Filter row
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Search:"))
+        
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Student ID or name")
+        self.search_input.editingFinished.connect(self._apply_student_filter)
+        filter_layout.addWidget(self.search_input)
+        
+        filter_layout.addWidget(QLabel("Performance:"))
+        self.category_filter = QComboBox()
+        self.category_filter.addItems(["All", "Excellent", "Good", "Average", "Poor"])
+        self.category_filter.setFixedWidth(150)
+        self.category_filter.currentIndexChanged.connect(self._apply_student_filter)
+        filter_layout.addWidget(self.category_filter)
+        layout.addLayout(filter_layout)
+        
+        # Student table, paged in from the database as it scrolls
+        self.student_model = StudentTableModel(self)
+        self.student_table = QTableView()
+        self.student_table.setModel(self.student_model)
         self.student_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.student_table.setColumnCount(6)  # Simplified for example
-        self.student_table.setHorizontalHeaderLabels([
-            "ID", "Name", "Score", "Performance", "Study Time", "Absences"
-        ])
+        self.student_table.setSortingEnabled(True)
+        self.student_table.sortByColumn(0, Qt.AscendingOrder)
+        self.student_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.student_table)
         
         # Button row
@@ -75,6 +288,12 @@ class MainWindow(QMainWindow):
         self.import_btn.clicked.connect(self._import_csv)
         button_layout.addWidget(self.import_btn)
         
+        # Sync matches rows on S/N and writes only new and changed students
+        self.sync_check = QCheckBox("Update existing students")
+        self.sync_check.setToolTip("Keep the current students and write only new or changed rows, "
+                                   "matched on S/N, instead of replacing the table")
+        button_layout.addWidget(self.sync_check)
+        
         self.add_btn = QPushButton("Add Student")
         self.add_btn.setFixedSize(120, 30)
         self.add_btn.clicked.connect(self._add_student)
@@ -90,13 +309,8 @@ class MainWindow(QMainWindow):
         # Load initial data
         self._load_student_data()
     
-    def _init_preprocessing_tab(self):
+    def _init_preprocessing_tab(self, layout):
         """Data Preprocessing Tab"""
-        tab = QWidget()
-        self.tabs.addTab(tab, "Preprocessing")
-        layout = QVBoxLayout()
-        tab.setLayout(layout)
-        
         # Missing values handling
         missing_layout = QHBoxLayout()
         missing_layout.addWidget(QLabel("Handle Missing Values:"))
@@ -129,13 +343,8 @@ class MainWindow(QMainWindow):
         
         layout.addStretch()
     
-    def _init_analysis_tab(self):
+    def _init_analysis_tab(self, layout):
         """Data Analysis Tab"""
-        tab = QWidget()
-        self.tabs.addTab(tab, "Analysis")
-        layout = QVBoxLayout()
-        tab.setLayout(layout)
-        
         # Algorithm selection
         algo_layout = QHBoxLayout()
         algo_layout.addWidget(QLabel("Algorithm:"))
@@ -146,12 +355,34 @@ class MainWindow(QMainWindow):
         algo_layout.addWidget(self.algo_combo)
         layout.addLayout(algo_layout)
         
+        # Train on every preprocessed feature instead of the default four
+        self.use_preprocessed_check = QCheckBox("Use all preprocessed features")
+        self.use_preprocessed_check.setEnabled(self.preprocessed is not None)
+        layout.addWidget(self.use_preprocessed_check)
+        
+        # Optionally train one model per school or other segment
+        segment_layout = QHBoxLayout()
+        segment_layout.addWidget(QLabel("Train separately by:"))
+        self.segment_combo = QComboBox()
+        self.segment_combo.addItem("All students (one model)", None)
+        for column in SEGMENT_COLUMNS:
+            self.segment_combo.addItem(column, column)
+        self.segment_combo.setFixedWidth(200)
+        segment_layout.addWidget(self.segment_combo)
+        layout.addLayout(segment_layout)
+        
         # Run analysis button
         self.analyze_btn = QPushButton("Run Analysis")
         self.analyze_btn.setFixedSize(200, 40)
         self.analyze_btn.clicked.connect(self._run_analysis)
         layout.addWidget(self.analyze_btn, alignment=Qt.AlignCenter)
         
+        # Score every student with the current model
+        self.predict_btn = QPushButton("Predict Categories")
+        self.predict_btn.setFixedSize(200, 40)
+        self.predict_btn.clicked.connect(self._predict_categories)
+        layout.addWidget(self.predict_btn, alignment=Qt.AlignCenter)
+        
         # Results display
         self.results_label = QLabel("Results will appear here")
         self.results_label.setWordWrap(True)
@@ -163,25 +394,19 @@ class MainWindow(QMainWindow):
         self.accuracy_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #2E8B57;")
         layout.addWidget(self.accuracy_label, alignment=Qt.AlignCenter)
         
+        if self.model_summary is not None:
+            self._show_model_summary(*self.model_summary)
+        
         layout.addStretch()
     
-    def _init_visualization_tab(self):
+    def _init_visualization_tab(self, layout):
         """Data Visualization Tab"""
-        tab = QWidget()
-        self.tabs.addTab(tab, "Visualization")
-        layout = QVBoxLayout()
-        tab.setLayout(layout)
-        
         # Chart selection
         chart_layout = QHBoxLayout()
         chart_layout.addWidget(QLabel("Chart Type:"))
         
         self.chart_combo = QComboBox()
-        self.chart_combo.addItems([
-            "Performance Distribution", 
-            "Score by Gender", 
-            "Absences vs Score"
-        ])
+        self.chart_combo.addItems(CHART_TYPES)
         self.chart_combo.setFixedWidth(200)
         chart_layout.addWidget(self.chart_combo)
         layout.addLayout(chart_layout)
@@ -192,32 +417,28 @@ class MainWindow(QMainWindow):
         self.chart_btn.clicked.connect(self._generate_chart)
         layout.addWidget(self.chart_btn, alignment=Qt.AlignCenter)
         
-        # Matplotlib figure
+        # Matplotlib figure (matplotlib is only loaded once this tab is opened)
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
         self.figure = Figure(figsize=(8, 5), dpi=100)
         self.canvas = FigureCanvas(self.figure)
         self.canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         layout.addWidget(self.canvas)
         
+        # chart type -> (data version, figure, canvas size, rendered pixels)
+        self._chart_renders = {}
+        
         # Initial empty chart
         self._generate_chart()
     
-    def _init_reports_tab(self):
+    def _init_reports_tab(self, layout):
         """Reports Tab"""
-        tab = QWidget()
-        self.tabs.addTab(tab, "Reports")
-        layout = QVBoxLayout()
-        tab.setLayout(layout)
-        
         # Report type selection
         report_layout = QHBoxLayout()
         report_layout.addWidget(QLabel("Report Type:"))
         
         self.report_combo = QComboBox()
-        self.report_combo.addItems([
-            "Performance Summary", 
-            "Student Statistics", 
-            "Model Analysis"
-        ])
+        self.report_combo.addItems(REPORT_TYPES)
         self.report_combo.setFixedWidth(200)
         report_layout.addWidget(self.report_combo)
         layout.addLayout(report_layout)
@@ -227,94 +448,152 @@ class MainWindow(QMainWindow):
         export_layout.addWidget(QLabel("Export Format:"))
         
         self.export_combo = QComboBox()
-        self.export_combo.addItems(["PDF", "Excel", "CSV"])
+        self.export_combo.addItems(list(EXPORT_FORMATS))
         self.export_combo.setFixedWidth(200)
         export_layout.addWidget(self.export_combo)
         layout.addLayout(export_layout)
         
+        self.per_school_check = QCheckBox("One report per school (generated in parallel)")
+        layout.addWidget(self.per_school_check)
+        
         # Generate button
         self.report_btn = QPushButton("Generate Report")
         self.report_btn.setFixedSize(200, 40)
         self.report_btn.clicked.connect(self._generate_report)
         layout.addWidget(self.report_btn, alignment=Qt.AlignCenter)
         
-        # Preview area
-        self.report_preview = QLabel("Report preview will appear here")
-        self.report_preview.setWordWrap(True)
-        self.report_preview.setStyleSheet("border: 1px solid #ccc; padding: 10px;")
+        # Preview area: the first rows of each section of the last export
+        self.report_preview = QPlainTextEdit()
+        self.report_preview.setReadOnly(True)
+        self.report_preview.setPlaceholderText("Report preview will appear here")
+        preview_font = QFont("Monospace")
+        preview_font.setStyleHint(QFont.TypeWriter)
+        self.report_preview.setFont(preview_font)
         layout.addWidget(self.report_preview)
-        
-        layout.addStretch()
     
     def _load_student_data(self):
         """Load student data into the table"""
         try:
-            students = get_all_students()
-            self.student_table.setRowCount(len(students))
-            
-            for row, student in enumerate(students):
-                self.student_table.setItem(row, 0, QTableWidgetItem(str(student.student_id)))
-                self.student_table.setItem(row, 1, QTableWidgetItem(student.name))
-                self.student_table.setItem(row, 2, QTableWidgetItem(str(student.score)))
-                self.student_table.setItem(row, 3, QTableWidgetItem(student.performance_category))
-                self.student_table.setItem(row, 4, QTableWidgetItem(str(student.studytime)))
-                self.student_table.setItem(row, 5, QTableWidgetItem(str(student.absences)))
-            
-            self.statusBar().showMessage(f"Loaded {len(students)} students", 3000)
+            self.student_model.refresh()
+            self.statusBar().showMessage(f"Loaded {self.student_model.total_count} students", 3000)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load student data: {str(e)}")
     
+    def _apply_student_filter(self):
+        """Translate the filter widgets into an SQL condition for the table model"""
+        filters = StudentFilter()
+        
+        search = self.search_input.text().strip()
+        if search.isdigit():
+            filters.student_id = int(search)
+        elif search:
+            filters.name_contains = search
+        
+        category = self.category_filter.currentText()
+        if category != "All":
+            filters.performance_category = category
+        
+        try:
+            self.student_model.set_filter(*filters.to_sql())
+            self.statusBar().showMessage(f"{self.student_model.total_count} matching students", 3000)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to filter student data: {str(e)}")
+    
+    def _on_jobs_changed(self, active):
+        self.job_progress.setVisible(active > 0)
+        self.cancel_btn.setVisible(active > 0)
+        if active:
+            self.job_progress.setRange(0, 0)  # Busy until a job reports a percentage
+    
+    @staticmethod
+    def _describe_metric(event):
+        label = " ".join(filter(None, [event['name'], event.get('job') or event.get('chart')]))
+        rows = f", {event['rows']:,} rows" if isinstance(event.get('rows'), int) else ""
+        return f"{label}: {event['ms']:.1f} ms{rows}"
+    
+    def _on_metric(self, event):
+        self.metrics_label.setText(self._describe_metric(event))
+        recent = get_recorder().recent(METRICS_READOUT_SIZE)
+        self.metrics_label.setToolTip("\n".join(self._describe_metric(e) for e in reversed(recent)))
+    
+    def _on_job_progress(self, percent, message):
+        if percent >= 0:
+            self.job_progress.setRange(0, 100)
+            self.job_progress.setValue(percent)
+        else:
+            self.job_progress.setRange(0, 0)
+        if message:
+            self.statusBar().showMessage(message)
+    
+    def _submit_job(self, name, fn, *args, button=None, on_result=None, on_error=None):
+        """Run fn off the GUI thread, disabling its trigger button until it finishes"""
+        if button is not None:
+            button.setEnabled(False)
+        path = None
+        if self.profile_btn.isChecked():
+            # The job body is profiled on its worker thread and the result
+            # handler on the GUI thread, each into its own file
+            self.profile_btn.setChecked(False)
+            path = profile_path(name)
+            if on_result is not None:
+                on_result = self._profiled_handler(on_result, path.replace('.prof', '-gui.prof'))
+        job = self.jobs.submit(
+            name, fn, *args,
+            on_result=on_result,
+            on_error=on_error,
+            on_progress=self._on_job_progress,
+            on_cancelled=lambda: self.statusBar().showMessage(f"{name} cancelled", 3000),
+            profile_path=path,
+        )
+        if button is not None:
+            job.signals.finished.connect(lambda: button.setEnabled(True))
+        if path is not None:
+            job.signals.finished.connect(
+                lambda: self.statusBar().showMessage(f"Profile of {name} saved to {path}", 10000)
+            )
+        return job
+    
+    @staticmethod
+    def _profiled_handler(handler, path):
+        def run(result):
+            with profiled(path):
+                handler(result)
+        return run
+    
+    def closeEvent(self, event):
+        get_recorder().remove_listener(self._metrics_listener)
+        self.jobs.cancel_all()
+        self.jobs.wait()
+        super().closeEvent(event)
+    
     def _import_csv(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open CSV File", "", "CSV Files (*.csv)")
         
         if file_path:
-            try:
-                df = pd.read_csv(file_path)
-                
-                # Connect to database
-                conn = sqlite3.connect('student_performance.db')
-                cursor = conn.cursor()
-                
-                # Clear existing data
-                cursor.execute("DELETE FROM students")
-                
-                # Insert new data
-                for _, row in df.iterrows():
-                    # Calculate performance category based on score
-                    score = row['Score']
-                    if score >= 45:
-                        performance = "Excellent"
-                    elif score >= 35:
-                        performance = "Good"
-                    elif score >= 25:
-                        performance = "Average"
-                    else:
-                        performance = "Poor"
-                    
-                    cursor.execute('''
-                    INSERT INTO students VALUES (
-                        ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
-                    )
-                    ''', (
-                        row['S/N'], row['Name'] if 'Name' in row else 'Unknown', 
-                        row['Gender'], row['Age'], row['Location'], row['famsize'], 
-                        row['Pstatus'], row['Medu'], row['Fedu'], row['traveltime'], 
-                        row['studytime'], row['failures'], row['schoolsup'], 
-                        row['famsup'], row['paid'], row['activities'], 
-                        row['nursery'], row['higher'], row['internet'], 
-                        row['famrel'], row['freetime'], row['health'], 
-                        row['absences'], row['Score'], performance
-                    ))
-                
-                conn.commit()
-                QMessageBox.information(self, "Success", "Data imported successfully")
-                self.load_student_data()
-                
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to import data: {str(e)}")
-            finally:
-                conn.close() 
+            sync = self.sync_check.isChecked()
+            self._submit_job(
+                "Import", _sync_job if sync else _import_job, file_path,
+                button=self.import_btn,
+                on_result=self._on_sync_done if sync else self._on_import_done,
+                on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to import data: {e}"),
+            )
+    
+    def _on_import_done(self, result):
+        QMessageBox.information(
+            self, "Success",
+            f"Imported {result.rows} students in {result.seconds:.2f}s "
+            f"({result.rows_per_second:,.0f} rows/s)"
+        )
+        self._load_student_data()
 
+    def _on_sync_done(self, result):
+        QMessageBox.information(
+            self, "Success",
+            f"Synced {result.rows} rows in {result.seconds:.2f}s "
+            f"({result.rows_per_second:,.0f} rows/s): {result.inserted} new, "
+            f"{result.updated} updated, {result.unchanged} unchanged"
+        )
+        self._load_student_data()
 
     def _add_student(self):
         """Add a new student (placeholder implementation)"""
@@ -322,104 +601,223 @@ class MainWindow(QMainWindow):
     
     def _preprocess_data(self):
         """Handle data preprocessing"""
-        missing_method = self.missing_combo.currentText().lower().replace(" ", "_")
-        norm_method = self.norm_combo.currentText().lower().replace(" ", "_")
-        
-        try:
-            # Get data and preprocess
-            students = get_all_students()
-            df = pd.DataFrame([s.__dict__ for s in students])
-            
-            # Preprocess
-            df = preprocess_data(df, missing_method, norm_method != "none")
-            
-            # Update UI
-            self.preprocess_status.setText("Data preprocessing completed successfully")
-            QMessageBox.information(self, "Success", "Data preprocessing completed")
-            
-        except Exception as e:
-            self.preprocess_status.setText(f"Error: {str(e)}")
-            QMessageBox.critical(self, "Error", f"Preprocessing failed: {str(e)}")
+        missing_strategy = MISSING_STRATEGIES[self.missing_combo.currentText()]
+        scaling = SCALING_METHODS[self.norm_combo.currentText()]
+        
+        self.preprocess_status.setText("Preprocessing...")
+        self._submit_job(
+            "Preprocessing", _preprocess_job, missing_strategy, scaling,
+            button=self.preprocess_btn,
+            on_result=self._on_preprocess_done,
+            on_error=self._on_preprocess_failed,
+        )
+    
+    def _on_preprocess_done(self, data):
+        self._set_preprocessed(data, use=True)
+        self.preprocess_status.setText(
+            f"Preprocessed {len(data.features)} students into {data.features.shape[1]} features"
+        )
+        QMessageBox.information(self, "Success", "Data preprocessing completed")
+    
+    def _set_preprocessed(self, data, use=False):
+        """Keep fitted preprocessing output for the Analysis tab"""
+        self.preprocessed = data
+        if hasattr(self, 'use_preprocessed_check'):
+            self.use_preprocessed_check.setEnabled(data is not None)
+            self.use_preprocessed_check.setChecked(use and data is not None)
+    
+    def _on_preprocess_failed(self, error):
+        self.preprocess_status.setText(f"Error: {error}")
+        QMessageBox.critical(self, "Error", f"Preprocessing failed: {error}")
     
     def _run_analysis(self):
         """Run selected analysis algorithm"""
         algorithm = self.algo_combo.currentText().lower().replace(" ", "_")
-        
-        try:
-            # Get data
-            students = get_all_students()
-            df = pd.DataFrame([s.__dict__ for s in students])
-            
-            # Prepare features and target
-            features = df[['studytime', 'absences', 'failures', 'famrel']]
-            target = df['performance_category']
-            
-            # Train model
-            model, accuracy = train_model(features, target, algorithm)
-            self.current_model = model
-            
-            # Update UI
-            self.results_label.setText(
-                f"Analysis completed using {self.algo_combo.currentText()}\n\n"
-                f"Model trained on {len(features)} samples\n"
-                f"Key features: Study Time, Absences, Failures, Family Relationship"
+        preprocessed = self.preprocessed if self.use_preprocessed_check.isChecked() else None
+        column = self.segment_combo.currentData()
+        
+        if column is not None:
+            self._submit_job(
+                "Segmented analysis", _segmented_job, algorithm, column, preprocessed,
+                button=self.analyze_btn,
+                on_result=lambda result: self._on_segmented_done(algorithm, result),
+                on_error=lambda e: QMessageBox.critical(self, "Error", f"Analysis failed: {e}"),
             )
-            
-            self.accuracy_label.setText(f"Model Accuracy: {accuracy:.2%}")
-            self.statusBar().showMessage("Analysis completed successfully", 3000)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Analysis failed: {str(e)}")
+            return
+        
+        self._submit_job(
+            "Analysis", _analysis_job, self.model_registry, algorithm, preprocessed,
+            button=self.analyze_btn,
+            on_result=lambda result: self._on_analysis_done(algorithm, *result),
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Analysis failed: {e}"),
+        )
+    
+    def _on_analysis_done(self, algorithm, model, accuracy, n_samples, cached, preprocessed):
+        self.current_model = model
+        self.model_accuracy = accuracy
+        if preprocessed is not None and preprocessed is not self.preprocessed:
+            self._set_preprocessed(preprocessed, use=True)  # it was rebuilt
+        
+        # Update UI
+        source = "Reused saved model for" if cached else "Model trained on"
+        if getattr(model, 'preprocessor_', None) is not None:
+            features = f"All {len(model.preprocessor_.feature_names_out_)} preprocessed features"
+        else:
+            features = "Key features: Study Time, Absences, Failures, Family Relationship"
+        self.results_label.setText(
+            f"Analysis completed using {algorithm.replace('_', ' ').title()}\n\n"
+            f"{source} {n_samples} samples\n"
+            f"{features}"
+        )
+        
+        self.accuracy_label.setText(f"Model Accuracy: {accuracy:.2%}")
+        self.statusBar().showMessage("Analysis completed successfully", 3000)
+    
+    def _on_segmented_done(self, algorithm, result):
+        """Show the per-segment accuracy table; the current model is left as it was"""
+        lines = []
+        for row in result.results.itertuples(index=False):
+            accuracy = f"{row.accuracy:.2%}" if row.accuracy == row.accuracy else "too few students"
+            lines.append(f"{row.segment}: {accuracy} ({row.students} students)")
+        self.results_label.setText(
+            f"{algorithm.replace('_', ' ').title()} trained per {result.column} "
+            f"({len(result.models)} models in {result.seconds:.2f}s)\n\n" + "\n".join(lines)
+        )
+        self.accuracy_label.setText(f"Weighted Accuracy: {result.accuracy:.2%}")
+        self.statusBar().showMessage("Segmented analysis completed successfully", 3000)
+    
+    def _predict_categories(self):
+        """Write the current model's predictions back to the students table"""
+        if self.current_model is None:
+            QMessageBox.warning(self, "Error", "Run an analysis first to train a model")
+            return
+        
+        self._submit_job(
+            "Prediction", _predict_job, self.current_model,
+            button=self.predict_btn,
+            on_result=self._on_predict_done,
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Prediction failed: {e}"),
+        )
+    
+    def _on_predict_done(self, result):
+        self.statusBar().showMessage(
+            f"Predicted categories for {result.rows} students in {result.seconds:.2f}s "
+            f"({result.rows_per_second:,.0f} rows/s)", 5000
+        )
+        self._load_student_data()
     
     def _generate_chart(self):
         """Generate the selected chart type"""
         chart_type = self.chart_combo.currentText()
         
-        try:
-            # Get data
-            students = get_all_students()
-            df = pd.DataFrame([s.__dict__ for s in students])
-            
-            # Clear previous figure
-            self.figure.clear()
-            ax = self.figure.add_subplot(111)
-            
-            if chart_type == "Performance Distribution":
-                # Pie chart
-                counts = df['performance_category'].value_counts()
-                ax.pie(counts, labels=counts.index, autopct='%1.1f%%')
-                ax.set_title("Performance Category Distribution")
-            
-            elif chart_type == "Score by Gender":
-                # Bar chart
-                avg_scores = df.groupby('gender')['score'].mean()
-                ax.bar(avg_scores.index, avg_scores)
-                ax.set_title("Average Score by Gender")
-                ax.set_ylabel("Average Score")
-            
-            elif chart_type == "Absences vs Score":
-                # Scatter plot
-                ax.scatter(df['absences'], df['score'])
-                ax.set_title("Absences vs Score")
-                ax.set_xlabel("Absences")
-                ax.set_ylabel("Score")
-            
-            # Refresh canvas
+        # Renders are keyed on the data version, so an unchanged chart is
+        # shown again without reading its data at all
+        cached = self._chart_renders.get(chart_type)
+        if cached is not None and cached[0] == get_data_version():
+            self._show_cached_chart(chart_type)
+            return
+        
+        self._submit_job(
+            "Chart", _chart_data_job, chart_type,
+            button=self.chart_btn,
+            on_result=lambda result: self._draw_chart(chart_type, *result),
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to generate chart: {e}"),
+        )
+    
+    def _draw_chart(self, chart_type, version, data):
+        """Draw a chart of the data at ``version``, reusing the last render when it matches"""
+        from matplotlib.figure import Figure
+        from utils.charts import draw_chart
+        
+        cached = self._chart_renders.get(chart_type)
+        if cached is not None and cached[0] == version:
+            self._show_cached_chart(chart_type)
+            return
+        
+        figure = cached[1] if cached is not None else Figure(figsize=(8, 5), dpi=100)
+        self._show_figure(figure)
+        draw_chart(figure, chart_type, data)
+        self._render_chart(chart_type, version, figure)
+        self.statusBar().showMessage(f"Generated {chart_type} chart", 3000)
+    
+    def _show_cached_chart(self, chart_type):
+        """Put the last render of a chart back on the canvas"""
+        version, figure, rendered_size, pixels = self._chart_renders[chart_type]
+        if figure is not self.figure:
+            self._show_figure(figure)
+            if rendered_size == self.canvas.get_width_height():
+                # Paint the stored pixels instead of re-rendering every artist
+                self.canvas.restore_region(pixels)
+                self.canvas.blit(figure.bbox)
+            else:
+                self._render_chart(chart_type, version, figure)
+        increment('chart.cache_hits')
+        self.statusBar().showMessage(f"{chart_type} chart is up to date", 3000)
+    
+    def _show_figure(self, figure):
+        """Attach one of the per-chart figures to the canvas"""
+        if figure is self.figure:
+            return
+        figure.set_size_inches(self.figure.get_size_inches(), forward=False)
+        figure.dpi = self.figure.dpi
+        self.figure = figure
+        self.canvas.figure = figure
+        figure.set_canvas(self.canvas)
+    
+    def _render_chart(self, chart_type, version, figure):
+        # Refresh canvas
+        with span('chart.render', chart=chart_type):
             self.canvas.draw()
-            self.statusBar().showMessage(f"Generated {chart_type} chart", 3000)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to generate chart: {str(e)}")
+        self._chart_renders[chart_type] = (
+            version, figure, self.canvas.get_width_height(), self.canvas.copy_from_bbox(figure.bbox)
+        )
     
     def _generate_report(self):
-        """Generate the selected report (placeholder implementation)"""
+        """Export the selected report to a file, or one file per school"""
         report_type = self.report_combo.currentText()
         export_format = self.export_combo.currentText()
-        
-        self.report_preview.setText(
-            f"Report Type: {report_type}\n"
-            f"Export Format: {export_format}\n\n"
-            "This is a preview of what the report would look like. "
-            "In a full implementation, this would show actual report content."
+        fmt = EXPORT_FORMATS[export_format]
+        
+        if report_type == "Model Analysis" and self.current_model is None:
+            QMessageBox.warning(self, "Error", "Run an analysis first to train a model")
+            return
+        model = self.current_model if report_type == "Model Analysis" else None
+        on_error = lambda e: QMessageBox.critical(self, "Error", f"Report generation failed: {e}")
+        
+        if self.per_school_check.isChecked():
+            directory = QFileDialog.getExistingDirectory(self, "Choose a Folder for the School Reports")
+            if directory:
+                self._submit_job(
+                    "Report", _school_reports_job, report_type, directory, fmt,
+                    model, self.model_accuracy,
+                    button=self.report_btn,
+                    on_result=self._on_school_reports_done,
+                    on_error=on_error,
+                )
+            return
+        
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save Report", report_filename(report_type, fmt),
+            f"{export_format} Files (*.{fmt})"
         )
-        self.statusBar().showMessage(f"Prepared {report_type} report", 3000)
+        if path:
+            if not path.lower().endswith(f".{fmt}"):
+                path += f".{fmt}"
+            self._submit_job(
+                "Report", _report_job, report_type, path, fmt, model, self.model_accuracy,
+                button=self.report_btn,
+                on_result=self._on_report_done,
+                on_error=on_error,
+            )
+    
+    def _on_report_done(self, result):
+        self.report_preview.setPlainText(result.preview)
+        self.statusBar().showMessage(
+            f"Wrote {result.rows:,} rows to {result.path} in {result.seconds:.2f}s", 5000
+        )
+    
+    def _on_school_reports_done(self, results):
+        self.report_preview.setPlainText("\n".join(
+            f"{result.path}: {result.rows:,} rows in {result.seconds:.2f}s" for result in results
+        ))
+        self.statusBar().showMessage(f"Wrote {len(results)} school reports", 5000)
@@ -0,0 +1,110 @@
+from typing import Optional, Sequence
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from database.db_operations import count_students, fetch_student_rows
+
+# (students column, header label) shown in the Student Data table
+TABLE_COLUMNS = [
+    ('student_id', "ID"),
+    ('name', "Name"),
+    ('score', "Score"),
+    ('performance_category', "Performance"),
+    ('studytime', "Study Time"),
+    ('absences', "Absences"),
+]
+
+
+class StudentTableModel(QAbstractTableModel):
+    """
+    Read-only students model that pages rows in from SQLite on demand
+
+    Only the rows scrolled into view are fetched (``canFetchMore`` /
+    ``fetchMore``). Sorting and filtering are pushed down to SQL, so the
+    view never holds the full table.
+    """
+
+    def __init__(self, parent=None, batch_size: int = 500):
+        super().__init__(parent)
+        self.batch_size = batch_size
+        self._columns = [column for column, _ in TABLE_COLUMNS]
+        self._headers = [header for _, header in TABLE_COLUMNS]
+        self._rows = []
+        self._total = 0
+        self._where: Optional[str] = None
+        self._params: Sequence = ()
+        self._order_by = 'student_id'
+        self._descending = False
+        # (sort value, student_id) of the last fetched row; the next page
+        # starts after it instead of skipping len(self._rows) rows
+        self._last_key: Optional[tuple] = None
+
+    @property
+    def total_count(self) -> int:
+        """Number of students matching the current filter"""
+        return self._total
+
+    def refresh(self):
+        """Drop cached rows and re-read the first page"""
+        self.beginResetModel()
+        self._rows = []
+        self._last_key = None
+        self._total = count_students(self._where, self._params)
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def set_filter(self, where: Optional[str] = None, params: Sequence = ()):
+        """Restrict the rows with an SQL condition (``?`` placeholders)"""
+        self._where = where
+        self._params = tuple(params)
+        self.refresh()
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        if role == Qt.DisplayRole:
+            return "" if value is None else str(value)
+        if role == Qt.TextAlignmentRole and isinstance(value, (int, float)):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._headers[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and len(self._rows) < self._total
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        rows = fetch_student_rows(
+            self._columns, self._where, self._params,
+            order_by=self._order_by, descending=self._descending,
+            limit=self.batch_size, after=self._last_key,
+        )
+        if not rows:
+            # The table shrank underneath us; stop asking for more.
+            self._total = len(self._rows)
+            return
+        last = rows[-1]
+        self._last_key = (last[self._columns.index(self._order_by)],
+                          last[self._columns.index('student_id')])
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._order_by = self._columns[column]
+        self._descending = order == Qt.DescendingOrder
+        self.refresh()
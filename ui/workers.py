@@ -0,0 +1,138 @@
+from typing import Any, Callable, Optional
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from utils.metrics import profiled, span
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation has been requested"""
+
+
+class JobSignals(QObject):
+    # percent (-1 when the total is unknown), message
+    progress = pyqtSignal(int, str)
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+
+class Job(QRunnable):
+    """
+    A unit of work run on the scheduler's thread pool
+
+    The wrapped function is called as ``fn(job, *args, **kwargs)`` so it can
+    call ``job.report()`` to publish progress; ``report()`` and
+    ``check_cancelled()`` raise JobCancelled after ``cancel()``. Each run is
+    recorded as a ``job`` metrics span, and is profiled with cProfile when
+    ``profile_path`` is set.
+    """
+
+    def __init__(self, name: str, fn: Callable, *args, **kwargs):
+        super().__init__()
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        # Created on the submitting (GUI) thread, so connected slots run there
+        self.signals = JobSignals()
+        self.profile_path: Optional[str] = None
+        self._cancel_requested = False
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel_requested
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def check_cancelled(self):
+        if self._cancel_requested:
+            raise JobCancelled(self.name)
+
+    def report(self, percent: int, message: str = ""):
+        self.check_cancelled()
+        self.signals.progress.emit(percent, message)
+
+    def _call(self):
+        if self.profile_path is None:
+            return self.fn(self, *self.args, **self.kwargs)
+        with profiled(self.profile_path):
+            return self.fn(self, *self.args, **self.kwargs)
+
+    def run(self):
+        with span('job', job=self.name) as fields:
+            try:
+                self.check_cancelled()
+                result = self._call()
+                self.check_cancelled()
+            except JobCancelled:
+                fields['status'] = 'cancelled'
+                self.signals.cancelled.emit()
+            except Exception as e:
+                fields['status'] = 'error'
+                self.signals.error.emit(str(e))
+            else:
+                fields['status'] = 'ok'
+                self.signals.result.emit(result)
+            finally:
+                self.signals.finished.emit()
+
+
+class JobScheduler(QObject):
+    """Runs jobs on a QThreadPool and tracks the ones still in flight"""
+
+    active_changed = pyqtSignal(int)
+
+    def __init__(self, parent: Optional[QObject] = None, max_threads: Optional[int] = None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self._active = []
+
+    @property
+    def active_jobs(self):
+        return list(self._active)
+
+    def submit(self, name: str, fn: Callable, *args,
+               on_result: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[str], None]] = None,
+               on_progress: Optional[Callable[[int, str], None]] = None,
+               on_cancelled: Optional[Callable[[], None]] = None,
+               profile_path: Optional[str] = None,
+               **kwargs) -> Job:
+        """
+        Queue ``fn(job, *args, **kwargs)`` and wire the callbacks to its signals
+
+        With ``profile_path`` the job body is profiled and the stats written there.
+        """
+        job = Job(name, fn, *args, **kwargs)
+        job.profile_path = profile_path
+        job.setAutoDelete(False)
+        if on_result is not None:
+            job.signals.result.connect(on_result)
+        if on_error is not None:
+            job.signals.error.connect(on_error)
+        if on_progress is not None:
+            job.signals.progress.connect(on_progress)
+        if on_cancelled is not None:
+            job.signals.cancelled.connect(on_cancelled)
+        job.signals.finished.connect(lambda: self._finished(job))
+
+        self._active.append(job)
+        self.active_changed.emit(len(self._active))
+        self.pool.start(job)
+        return job
+
+    def _finished(self, job: Job):
+        if job in self._active:
+            self._active.remove(job)
+        self.active_changed.emit(len(self._active))
+
+    def cancel_all(self):
+        for job in self._active:
+            job.cancel()
+
+    def wait(self, msecs: int = -1) -> bool:
+        """Block until every queued job has run (used on shutdown and in scripts)"""
+        return self.pool.waitForDone(msecs)
@@ -0,0 +1,86 @@
+from typing import Any, Optional
+from database.aggregates import (get_category_counts, get_group_score_means,
+                                 get_absence_score_histogram)
+from utils.metrics import span
+
+CHART_TYPES = [
+    "Performance Distribution",
+    "Score by Gender",
+    "Absences vs Score",
+]
+
+# Above this many students "Absences vs Score" is drawn as a 2D histogram
+# image instead of a scatter plot
+DENSITY_THRESHOLD = 10_000
+
+
+def load_chart_data(chart_type: str) -> Any:
+    """
+    Read the aggregates a chart needs (safe to run off the GUI thread)
+
+    Charts read the trigger-maintained aggregate tables, so the cost does
+    not grow with the number of students.
+    """
+    with span('chart.load', chart=chart_type):
+        if chart_type == "Performance Distribution":
+            return get_category_counts()
+        if chart_type == "Score by Gender":
+            return get_group_score_means('gender')
+        if chart_type == "Absences vs Score":
+            return get_absence_score_histogram()
+    raise ValueError(f"Unknown chart type: {chart_type}")
+
+
+def _draw_density(figure, ax, absences, scores, counts):
+    """Render the absences/score histogram as one image, weighted by student count"""
+    import numpy as np
+
+    x_edges = np.arange(absences.min(), absences.max() + 2) - 0.5
+    y_edges = np.arange(scores.min(), scores.max() + 2) - 0.5
+    grid, _, _ = np.histogram2d(absences, scores, bins=(x_edges, y_edges), weights=counts)
+    image = ax.imshow(
+        np.ma.masked_equal(grid.T, 0), origin='lower', aspect='auto', interpolation='nearest',
+        extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]),
+    )
+    figure.colorbar(image, ax=ax, label="Students")
+
+
+def draw_chart(figure, chart_type: str, data: Any, density: Optional[bool] = None):
+    """
+    Draw a chart on a matplotlib Figure from load_chart_data() output
+
+    ``density`` forces the histogram (True) or scatter (False) rendering of
+    "Absences vs Score"; by default it switches at DENSITY_THRESHOLD.
+    """
+    with span('chart.draw', chart=chart_type):
+        _draw(figure, chart_type, data, density)
+
+
+def _draw(figure, chart_type: str, data: Any, density: Optional[bool]):
+    # Clear previous figure
+    figure.clear()
+    ax = figure.add_subplot(111)
+
+    if chart_type == "Performance Distribution":
+        # Pie chart
+        ax.pie(data, labels=data.index, autopct='%1.1f%%')
+        ax.set_title("Performance Category Distribution")
+
+    elif chart_type == "Score by Gender":
+        # Bar chart
+        ax.bar(data.index, data)
+        ax.set_title("Average Score by Gender")
+        ax.set_ylabel("Average Score")
+
+    elif chart_type == "Absences vs Score":
+        absences, scores, counts = data
+        if density is None:
+            density = counts.sum() > DENSITY_THRESHOLD
+        if density and len(counts):
+            _draw_density(figure, ax, absences, scores, counts)
+        else:
+            # Scatter plot; students sharing a point draw as one marker
+            ax.scatter(absences, scores)
+        ax.set_title("Absences vs Score")
+        ax.set_xlabel("Absences")
+        ax.set_ylabel("Score")
@@ -1,16 +1,36 @@
+import json
+import os
+import pickle
+import time
+from dataclasses import dataclass, field
+import numpy as np
 import pandas as pd
-from typing import Tuple
-from database.models import Student
+from typing import List, Optional, Tuple, Union
+from database.aggregates import get_data_version
+from database.categories import DEFAULT_BANDS
+
+PERFORMANCE_CATEGORIES = ["Excellent", "Good", "Average", "Poor"]
+
+# Model inputs. student_id and name identify a student, and score is what
+# performance_category is derived from, so none of them are features.
+NUMERIC_FEATURES = ['age', 'medu', 'fedu', 'traveltime', 'studytime', 'failures',
+                    'famrel', 'freetime', 'health', 'absences']
+CATEGORICAL_FEATURES = ['gender', 'location', 'famsize', 'pstatus', 'schoolsup', 'famsup',
+                        'paid', 'activities', 'nursery', 'higher', 'internet']
+FEATURE_COLUMNS = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+
+PREPROCESSED_DIR = os.path.join(os.environ.get('STUDENT_CACHE_DIR', 'cache'), 'preprocessed')
 
 def preprocess_data(df: pd.DataFrame, missing_strategy: str = 'drop', 
-                   normalize: bool = False) -> pd.DataFrame:
+                   normalize: Union[bool, str] = False) -> pd.DataFrame:
     """
     Preprocess student data
     
     Args:
         df: Raw student data
         missing_strategy: How to handle missing values ('drop', 'mean', 'median')
-        normalize: Whether to normalize numeric features
+        normalize: Scaling for numeric features: 'minmax', 'standard'
+            (True is treated as 'standard'), or False for none
     
     Returns:
         Preprocessed DataFrame
@@ -25,18 +45,201 @@ def preprocess_data(df: pd.DataFrame, missing_strategy: str = 'drop',
     
     # Normalization
     if normalize:
+        df = df.copy()
         numeric_cols = df.select_dtypes(include=['number']).columns
-        df[numeric_cols] = (df[numeric_cols] - df[numeric_cols].mean()) / df[numeric_cols].std()
+        if normalize == 'minmax':
+            spread = (df[numeric_cols].max() - df[numeric_cols].min()).replace(0, 1)
+            df[numeric_cols] = (df[numeric_cols] - df[numeric_cols].min()) / spread
+        else:
+            df[numeric_cols] = (df[numeric_cols] - df[numeric_cols].mean()) / df[numeric_cols].std()
     
     return df
 
-def calculate_performance(score: int) -> str:
-    """Categorize student performance based on score"""
-    if score >= 45:
-        return "Excellent"
-    elif score >= 35:
-        return "Good"
-    elif score >= 25:
-        return "Average"
-    else:
-        return "Poor"
+
+class PreprocessingPipeline:
+    """
+    Fitted imputation, scaling and encoding for the student features
+
+    ``fit`` learns per-column fill values, scaling parameters and category
+    lists; ``transform`` applies them with whole-array NumPy operations, so
+    the same fitted pipeline can be reused unchanged at prediction time.
+    Yes/no style columns become one 0/1 column, other categoricals are
+    one-hot encoded.
+    """
+
+    def __init__(self, missing_strategy: str = 'mean', scaling: Optional[str] = None,
+                 numeric: Optional[List[str]] = None, categorical: Optional[List[str]] = None):
+        if missing_strategy not in ('drop', 'mean', 'median'):
+            raise ValueError(f"Unknown missing value strategy: {missing_strategy}")
+        if scaling not in (None, 'minmax', 'standard'):
+            raise ValueError(f"Unknown scaling: {scaling}")
+        self.missing_strategy = missing_strategy
+        self.scaling = scaling
+        self.numeric = list(numeric if numeric is not None else NUMERIC_FEATURES)
+        self.categorical = list(categorical if categorical is not None else CATEGORICAL_FEATURES)
+
+    @property
+    def input_columns(self) -> List[str]:
+        return self.numeric + self.categorical
+
+    def fit(self, df: pd.DataFrame) -> 'PreprocessingPipeline':
+        values = df[self.numeric].to_numpy(dtype=np.float64)
+        if self.missing_strategy == 'median':
+            self.fill_values_ = np.nanmedian(values, axis=0)
+        else:
+            self.fill_values_ = np.nanmean(values, axis=0)
+        self.fill_values_ = np.nan_to_num(self.fill_values_)
+        filled = np.where(np.isnan(values), self.fill_values_, values)
+
+        if self.scaling == 'minmax':
+            self.offset_ = filled.min(axis=0) if len(filled) else np.zeros(len(self.numeric))
+            self.scale_ = (filled.max(axis=0) - self.offset_) if len(filled) else np.ones(len(self.numeric))
+        elif self.scaling == 'standard':
+            self.offset_ = filled.mean(axis=0) if len(filled) else np.zeros(len(self.numeric))
+            self.scale_ = filled.std(axis=0) if len(filled) else np.ones(len(self.numeric))
+        else:
+            self.offset_ = np.zeros(len(self.numeric))
+            self.scale_ = np.ones(len(self.numeric))
+        self.scale_ = np.where(self.scale_ == 0, 1.0, self.scale_)
+
+        self.categories_ = {}
+        self.category_fill_ = {}
+        for column in self.categorical:
+            counts = df[column].dropna().astype(str).value_counts()
+            self.categories_[column] = sorted(counts.index)
+            # Missing categoricals take the most common value
+            self.category_fill_[column] = counts.index[0] if len(counts) else None
+
+        names = list(self.numeric)
+        for column in self.categorical:
+            categories = self.categories_[column]
+            if len(categories) == 2:
+                names.append(f"{column}_{categories[1]}")
+            else:
+                names += [f"{column}_{c}" for c in categories]
+        self.feature_names_out_ = names
+        return self
+
+    def _missing_rows(self, df: pd.DataFrame) -> np.ndarray:
+        return df[self.input_columns].isna().to_numpy().any(axis=1)
+
+    def transform(self, df: pd.DataFrame, drop_missing: Optional[bool] = None) -> pd.DataFrame:
+        """
+        Encode, impute and scale ``df`` into a float feature frame
+
+        Rows with missing values are dropped when the strategy is 'drop'
+        (pass ``drop_missing=False`` to fill them instead, e.g. to score every
+        student); the result keeps the input index.
+        """
+        if drop_missing is None:
+            drop_missing = self.missing_strategy == 'drop'
+        if drop_missing:
+            df = df[~self._missing_rows(df)]
+
+        values = df[self.numeric].to_numpy(dtype=np.float64)
+        values = np.where(np.isnan(values), self.fill_values_, values)
+        blocks = [(values - self.offset_) / self.scale_]
+
+        for column in self.categorical:
+            categories = self.categories_[column]
+            codes = pd.Categorical(df[column].astype('string'), categories=categories).codes
+            if self.category_fill_[column] is not None:
+                codes = np.where(codes < 0, categories.index(self.category_fill_[column]), codes)
+            if len(categories) == 2:
+                blocks.append((codes == 1).astype(np.float64)[:, None])
+            else:
+                one_hot = np.zeros((len(codes), len(categories)))
+                known = codes >= 0
+                one_hot[np.flatnonzero(known), codes[known]] = 1.0
+                blocks.append(one_hot)
+
+        matrix = np.hstack(blocks) if blocks else np.empty((len(df), 0))
+        return pd.DataFrame(matrix, index=df.index, columns=self.feature_names_out_)
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self.missing_strategy == 'drop':
+            df = df[~self._missing_rows(df)]
+        return self.fit(df).transform(df)
+
+
+@dataclass
+class PreprocessedData:
+    pipeline: PreprocessingPipeline
+    features: pd.DataFrame
+    target: pd.Series
+    student_ids: np.ndarray
+    created_at: float = field(default_factory=time.time)
+    # (epoch, version) of the students data it was built from, if known
+    data_version: Optional[Tuple[str, int]] = None
+
+    def is_current(self) -> bool:
+        """Whether students are unchanged since this was built (False when unknown)"""
+        return self.data_version is not None and tuple(self.data_version) == get_data_version()
+
+
+def build_preprocessed(df: pd.DataFrame, missing_strategy: str = 'mean',
+                       scaling: Optional[str] = None,
+                       target: str = 'performance_category',
+                       data_version: Optional[Tuple[str, int]] = None) -> PreprocessedData:
+    """
+    Fit a pipeline on all student features and transform them in one go
+
+    ``data_version`` is the students data version ``df`` was read at;
+    it is saved along with the result so staleness can be detected later.
+    """
+    pipeline = PreprocessingPipeline(missing_strategy, scaling)
+    features = pipeline.fit_transform(df)
+    rows = df.loc[features.index]
+    return PreprocessedData(pipeline, features.reset_index(drop=True),
+                            rows[target].reset_index(drop=True),
+                            rows['student_id'].to_numpy(), data_version=data_version)
+
+
+def save_preprocessed(data: PreprocessedData, directory: str = PREPROCESSED_DIR):
+    """Persist the fitted pipeline and its feature matrix for later runs"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'pipeline.pkl'), 'wb') as f:
+        pickle.dump(data.pipeline, f, protocol=pickle.HIGHEST_PROTOCOL)
+    np.save(os.path.join(directory, 'features.npy'), data.features.to_numpy())
+    np.save(os.path.join(directory, 'student_ids.npy'), data.student_ids)
+    np.save(os.path.join(directory, 'target.npy'), data.target.to_numpy(dtype=object), allow_pickle=True)
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump({'columns': list(data.features.columns), 'created_at': data.created_at,
+                   'missing_strategy': data.pipeline.missing_strategy,
+                   'scaling': data.pipeline.scaling,
+                   'data_version': data.data_version}, f, indent=2)
+
+
+def load_preprocessed(directory: str = PREPROCESSED_DIR) -> Optional[PreprocessedData]:
+    """
+    Load data saved by save_preprocessed
+
+    Returns None if there is none, or if students have changed since it
+    was built (an import, sync or scoring run), so stale features are
+    never trained on; run the preprocessing again to refresh it.
+    """
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if not meta.get('data_version') or tuple(meta['data_version']) != get_data_version():
+            return None
+        with open(os.path.join(directory, 'pipeline.pkl'), 'rb') as f:
+            pipeline = pickle.load(f)
+        features = np.load(os.path.join(directory, 'features.npy'), mmap_mode='r')
+        student_ids = np.load(os.path.join(directory, 'student_ids.npy'))
+        target = np.load(os.path.join(directory, 'target.npy'), allow_pickle=True)
+    except (OSError, ValueError, pickle.UnpicklingError):
+        return None
+    return PreprocessedData(pipeline, pd.DataFrame(features, columns=meta['columns'], copy=False),
+                            pd.Series(target, name='performance_category'), student_ids,
+                            meta['created_at'],
+                            tuple(meta['data_version']) if meta.get('data_version') else None)
+
+def calculate_performance(score: Optional[int]) -> Optional[str]:
+    """
+    Categorize one student's performance based on score (None if it is missing)
+
+    For whole columns use database.categories.categorize_scores, which
+    applies the same bands to an array at once.
+    """
+    return DEFAULT_BANDS.category(score)
@@ -0,0 +1,183 @@
+"""
+Lightweight timing spans, counters and profiling hooks
+
+Hot paths wrap their work in ``span()``::
+
+    with span('db.get_students_frame') as fields:
+        ...
+        fields['rows'] = len(df)
+
+Every finished span is kept in an in-memory ring buffer (for the status
+bar readout), appended as a JSON line to a size-rotated metrics file and
+passed to any registered listeners. This module only uses the standard
+library so the database layer can import it without pulling in anything.
+"""
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Callable, Dict, Iterator, List, Optional
+
+# An empty STUDENT_METRICS_FILE turns the file output off
+DEFAULT_METRICS_FILE = os.environ.get(
+    'STUDENT_METRICS_FILE', os.path.join(os.environ.get('STUDENT_CACHE_DIR', 'cache'), 'metrics.jsonl')
+)
+PROFILE_DIR = os.path.join(os.environ.get('STUDENT_CACHE_DIR', 'cache'), 'profiles')
+MAX_FILE_BYTES = 1_000_000
+BACKUP_COUNT = 3
+RECENT_SIZE = 200
+
+
+class MetricsRecorder:
+    """
+    Collects spans and counters from any thread
+
+    Listeners are called on the thread that finished the span; GUI code must
+    hand events over to the GUI thread (e.g. through a queued signal).
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_METRICS_FILE, recent_size: int = RECENT_SIZE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=recent_size)
+        self._counters = Counter()
+        self._listeners: List[Callable[[dict], None]] = []
+        self._logger = None
+
+    def _file_logger(self) -> Optional[logging.Logger]:
+        # Opened on first use, so importing this module creates no files
+        if self._logger is None and self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                handler = RotatingFileHandler(self.path, maxBytes=MAX_FILE_BYTES,
+                                              backupCount=BACKUP_COUNT, encoding='utf-8')
+            except OSError:
+                self.path = None
+                return None
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger = logging.getLogger(f"{__name__}.{id(self)}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def record(self, name: str, ms: float, **fields) -> dict:
+        """Store one finished operation that took ``ms`` milliseconds"""
+        event = {'ts': round(time.time(), 3), 'name': name, 'ms': round(ms, 3),
+                 'thread': threading.current_thread().name, **fields}
+        with self._lock:
+            self._recent.append(event)
+            self._counters[f"{name}.count"] += 1
+            if isinstance(fields.get('rows'), int):
+                self._counters[f"{name}.rows"] += fields['rows']
+            logger = self._file_logger()
+            listeners = list(self._listeners)
+        if logger is not None:
+            logger.info(json.dumps(event, default=str))
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                # Instrumentation must never break the operation it measures
+                pass
+        return event
+
+    @contextmanager
+    def span(self, name: str, **fields) -> Iterator[dict]:
+        """Time the enclosed block; fields added to the yielded dict are recorded too"""
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000, **fields)
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def recent(self, n: Optional[int] = None, name: Optional[str] = None) -> List[dict]:
+        """The last ``n`` events (optionally of one name), oldest first"""
+        with self._lock:
+            events = [e for e in self._recent if name is None or e['name'] == name]
+        return events[-n:] if n else events
+
+    def add_listener(self, listener: Callable[[dict], None]):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[dict], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+
+_recorder: Optional[MetricsRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def configure(path: Optional[str] = DEFAULT_METRICS_FILE,
+              recent_size: int = RECENT_SIZE) -> MetricsRecorder:
+    """Replace the shared recorder, e.g. to write metrics elsewhere (None: no file)"""
+    global _recorder
+    with _recorder_lock:
+        _recorder = MetricsRecorder(path, recent_size)
+        return _recorder
+
+
+def get_recorder() -> MetricsRecorder:
+    """Return the shared recorder, creating it on first use"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = MetricsRecorder()
+        return _recorder
+
+
+def span(name: str, **fields):
+    """Time a block with the shared recorder"""
+    return get_recorder().span(name, **fields)
+
+
+def record(name: str, ms: float, **fields) -> dict:
+    """Record an operation timed by the caller with the shared recorder"""
+    return get_recorder().record(name, ms, **fields)
+
+
+def increment(name: str, value: int = 1):
+    get_recorder().increment(name, value)
+
+
+def recent(n: Optional[int] = None, name: Optional[str] = None) -> List[dict]:
+    return get_recorder().recent(n, name)
+
+
+def profile_path(label: str) -> str:
+    """A fresh .prof path under PROFILE_DIR for ``label``"""
+    safe = ''.join(c if c.isalnum() else '_' for c in label).strip('_').lower() or 'action'
+    return os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe}.prof")
+
+
+@contextmanager
+def profiled(path: str) -> Iterator[cProfile.Profile]:
+    """
+    cProfile the enclosed block (current thread only) and dump the stats to
+    ``path``, for viewing with ``python -m pstats`` or snakeviz
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        profiler.dump_stats(path)
@@ -3,7 +3,15 @@ from sklearn.tree import DecisionTreeClassifier
 from sklearn.naive_bayes import GaussianNB
 from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import LabelEncoder
-from typing import Tuple, Any
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple
+import time
+import numpy as np
+import pandas as pd
+from utils.data_processor import PERFORMANCE_CATEGORIES
+from utils.metrics import record, span
+
+# Features used by the Analysis tab and the command-line trainer
+DEFAULT_FEATURES = ['studytime', 'absences', 'failures', 'famrel']
 
 def train_model(X, y, model_type: str = 'decision_tree') -> Tuple[Any, float]:
     """
@@ -32,10 +40,141 @@ def train_model(X, y, model_type: str = 'decision_tree') -> Tuple[Any, float]:
     else:  # naive_bayes
         model = GaussianNB()
     
-    model.fit(X_train, y_train)
+    with span('model.fit', model_type=model_type, rows=len(y_train)):
+        model.fit(X_train, y_train)
+    # Keep the encoder with the estimator so predictions can be decoded later
+    model.label_encoder_ = le
     
     # Evaluate
-    y_pred = model.predict(X_test)
+    with span('model.predict', model_type=model_type, rows=len(y_test)):
+        y_pred = model.predict(X_test)
     accuracy = accuracy_score(y_test, y_pred)
     
     return model, accuracy
+
+
+# Estimators that can learn one batch at a time with partial_fit
+STREAMING_MODELS = {
+    'naive_bayes': GaussianNB,
+}
+
+
+def train_model_streaming(batches: Iterable[Tuple[Any, Any]], model_type: str = 'naive_bayes',
+                          classes: Optional[Sequence[str]] = None, test_size: float = 0.2,
+                          max_test_rows: int = 100_000, random_state: int = 42,
+                          progress: Optional[Callable[[int, float], None]] = None) -> Tuple[Any, float]:
+    """
+    Train a model incrementally from a stream of (X, y) batches
+
+    Each batch is split at random: training rows go straight to
+    ``partial_fit`` and are dropped, held-out rows feed a fixed-size
+    reservoir sample used for the final accuracy. Memory is bounded by
+    one batch plus ``max_test_rows``.
+
+    Args:
+        batches: Iterable of (features, target) pairs, e.g. student_batches()
+        model_type: Type of model; must support partial_fit ('naive_bayes')
+        classes: Every label the stream can contain (defaults to the
+            performance categories); rows with other labels are skipped
+        test_size: Fraction of each batch held out for evaluation
+        max_test_rows: Size of the held-out reservoir
+        random_state: Seed for the train/test split and the reservoir
+        progress: Optional callback receiving (rows seen, rows per second)
+
+    Returns:
+        Tuple of (trained_model, accuracy_score), like train_model
+    """
+    if model_type not in STREAMING_MODELS:
+        raise ValueError(f"{model_type} cannot be trained incrementally; "
+                         f"use one of: {', '.join(STREAMING_MODELS)}")
+
+    le = LabelEncoder()
+    le.fit(list(classes) if classes is not None else PERFORMANCE_CATEGORIES)
+    all_codes = np.arange(len(le.classes_))
+    model = STREAMING_MODELS[model_type]()
+    rng = np.random.default_rng(random_state)
+
+    X_test = y_test = None
+    test_seen = 0
+    rows = 0
+    start = time.perf_counter()
+
+    feature_names = None
+    for X, y in batches:
+        if feature_names is None and hasattr(X, 'columns'):
+            feature_names = [str(c) for c in X.columns]
+        y = np.asarray(y, dtype=object)
+        known = np.isin(y, le.classes_)
+        X = np.asarray(X, dtype=np.float64)[known]
+        y = le.transform(y[known])
+        if not len(y):
+            continue
+
+        held_out = rng.random(len(y)) < test_size
+        if (~held_out).any():
+            model.partial_fit(X[~held_out], y[~held_out], classes=all_codes)
+
+        # Reservoir sampling keeps a uniform sample of every held-out row
+        X_new, y_new = X[held_out], y[held_out]
+        if X_test is None:
+            X_test = np.empty((0, X.shape[1]))
+            y_test = np.empty(0, dtype=y.dtype)
+        room = max_test_rows - len(y_test)
+        if room > 0:
+            X_test = np.vstack([X_test, X_new[:room]])
+            y_test = np.concatenate([y_test, y_new[:room]])
+            test_seen += len(y_new[:room])
+            X_new, y_new = X_new[room:], y_new[room:]
+        if len(y_new):
+            slots = rng.integers(0, test_seen + np.arange(1, len(y_new) + 1))
+            keep = slots < max_test_rows
+            X_test[slots[keep]] = X_new[keep]
+            y_test[slots[keep]] = y_new[keep]
+            test_seen += len(y_new)
+
+        rows += len(y)
+        if progress is not None:
+            elapsed = time.perf_counter() - start
+            progress(rows, rows / elapsed if elapsed > 0 else float('inf'))
+
+    if not hasattr(model, 'classes_'):
+        raise ValueError("No training rows in the stream")
+
+    if feature_names is not None:
+        # Same attribute a DataFrame fit sets, so predictors can find the columns
+        model.feature_names_in_ = np.array(feature_names, dtype=object)
+        if X_test is not None:
+            X_test = pd.DataFrame(X_test, columns=feature_names)
+
+    if y_test is not None and len(y_test):
+        accuracy = accuracy_score(y_test, model.predict(X_test))
+    else:
+        accuracy = float('nan')
+    model.label_encoder_ = le
+    elapsed = time.perf_counter() - start
+    record('model.fit', elapsed * 1000, model_type=model_type, rows=rows, streaming=True)
+    model.training_stats_ = {
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else float('inf'),
+        'test_rows': 0 if y_test is None else len(y_test),
+    }
+    return model, accuracy
+
+
+def student_batches(features: Sequence[str], batch_size: int = 50_000,
+                    target: str = 'performance_category') -> Iterator[Tuple[Any, Any]]:
+    """Stream (X, y) batches from the students table"""
+    from database.db_operations import iter_students_frames
+
+    for df in iter_students_frames(list(features) + [target], batch_size=batch_size):
+        yield df[list(features)], df[target]
+
+
+def csv_batches(file_path: str, features: Sequence[str], batch_size: int = 50_000,
+                target: str = 'performance_category') -> Iterator[Tuple[Any, Any]]:
+    """Stream (X, y) batches from a CSV file in the train.csv layout"""
+    from database.importer import iter_csv_frames
+
+    for df in iter_csv_frames(file_path, chunksize=batch_size):
+        yield df[list(features)], df[target]
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_REGISTRY_DIR = os.environ.get('STUDENT_MODEL_DIR', 'model_registry')
+INDEX_FILE = 'index.json'
+
+
+@dataclass
+class ModelEntry:
+    model: Any
+    label_encoder: Any
+    features: List[str]
+    fingerprint: str
+    model_type: str
+    accuracy: float
+    created_at: float = field(default_factory=time.time)
+
+
+def data_fingerprint(X: "pd.DataFrame", y: "pd.Series") -> str:
+    """Content hash of the training data, including column names and order"""
+    import pandas as pd
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in X.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def version_fingerprint(data_version: Tuple[str, int], columns: List[str],
+                        preprocessor: Any = None) -> str:
+    """
+    Fingerprint of training data identified by the students data version
+
+    Equivalent to data_fingerprint() for data read at ``data_version``
+    (see database.aggregates.get_data_version), without hashing the data.
+    """
+    settings = None
+    if preprocessor is not None:
+        settings = [preprocessor.missing_strategy, preprocessor.scaling]
+    key = json.dumps([list(data_version), [str(c) for c in columns], settings])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ModelRegistry:
+    """
+    On-disk store of fitted models keyed by model type and data fingerprint
+
+    Each entry is pickled together with its LabelEncoder and feature list;
+    ``index.json`` records metadata and last use, and the least recently
+    used entries are evicted once more than ``max_entries`` are stored.
+    """
+
+    def __init__(self, directory: str = DEFAULT_REGISTRY_DIR, max_entries: int = 10):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    # Index bookkeeping
+
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _read_index(self) -> List[dict]:
+        try:
+            with open(self._index_path()) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def _write_index(self, index: List[dict]):
+        tmp_path = self._index_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self._index_path())
+
+    @staticmethod
+    def _key(model_type: str, fingerprint: str) -> str:
+        return f"{model_type}-{fingerprint[:16]}"
+
+    def _load(self, record: dict) -> Optional[ModelEntry]:
+        try:
+            with open(os.path.join(self.directory, record['file']), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+    # Public API
+
+    def entries(self) -> List[dict]:
+        """Metadata for every stored model, most recently used first"""
+        with self._lock:
+            return sorted(self._read_index(), key=lambda r: r['last_used'], reverse=True)
+
+    def get(self, model_type: str, fingerprint: str) -> Optional[ModelEntry]:
+        """Return the model trained on exactly this data, if one is stored"""
+        key = self._key(model_type, fingerprint)
+        with self._lock:
+            index = self._read_index()
+            record = next((r for r in index if r['key'] == key and r['fingerprint'] == fingerprint), None)
+            if record is None:
+                return None
+            entry = self._load(record)
+            if entry is None:
+                index.remove(record)
+            else:
+                record['last_used'] = time.time()
+            self._write_index(index)
+            return entry
+
+    def latest(self, model_type: Optional[str] = None) -> Optional[ModelEntry]:
+        """Return the most recently used model, optionally of one type"""
+        for record in self.entries():
+            if model_type is None or record['model_type'] == model_type:
+                entry = self.get(record['model_type'], record['fingerprint'])
+                if entry is not None:
+                    return entry
+        return None
+
+    def put(self, model: Any, model_type: str, features: List[str],
+            fingerprint: str, accuracy: float) -> ModelEntry:
+        """Persist a fitted model and evict the least recently used overflow"""
+        entry = ModelEntry(
+            model=model,
+            label_encoder=getattr(model, 'label_encoder_', None),
+            features=list(features),
+            fingerprint=fingerprint,
+            model_type=model_type,
+            accuracy=accuracy,
+        )
+        key = self._key(model_type, fingerprint)
+        file_name = f"{key}.pkl"
+
+        with self._lock:
+            tmp_path = os.path.join(self.directory, file_name + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, os.path.join(self.directory, file_name))
+
+            index = [r for r in self._read_index() if r['key'] != key]
+            index.append({
+                'key': key,
+                'file': file_name,
+                'model_type': model_type,
+                'fingerprint': fingerprint,
+                'features': entry.features,
+                'accuracy': accuracy,
+                'created_at': entry.created_at,
+                'last_used': entry.created_at,
+            })
+            index.sort(key=lambda r: r['last_used'], reverse=True)
+            for evicted in index[self.max_entries:]:
+                try:
+                    os.remove(os.path.join(self.directory, evicted['file']))
+                except FileNotFoundError:
+                    pass
+            self._write_index(index[:self.max_entries])
+        return entry
+
+
+def get_or_train(registry: ModelRegistry, X: "pd.DataFrame", y: "pd.Series",
+                 model_type: str = 'decision_tree',
+                 preprocessor: Any = None,
+                 data_version: Optional[Tuple[str, int]] = None) -> Tuple[Any, float, bool]:
+    """
+    Reuse a stored model for unchanged data, otherwise train and store one
+
+    When ``X`` is the output of a fitted PreprocessingPipeline, pass it as
+    ``preprocessor``; it is stored on the model as ``preprocessor_`` so
+    prediction can apply the same transformation to raw student rows.
+    Pass the students ``data_version`` that ``X`` and ``y`` were read at to
+    skip hashing them; data from elsewhere is fingerprinted by content.
+
+    Returns:
+        Tuple of (trained_model, accuracy_score, loaded_from_cache)
+    """
+    if data_version is not None:
+        fingerprint = version_fingerprint(data_version, list(X.columns), preprocessor)
+    else:
+        fingerprint = data_fingerprint(X, y)
+    entry = registry.get(model_type, fingerprint)
+    if entry is not None:
+        return entry.model, entry.accuracy, True
+
+    from .ml_models import train_model
+    model, accuracy = train_model(X, y, model_type)
+    model.preprocessor_ = preprocessor
+    features = preprocessor.input_columns if preprocessor is not None else list(X.columns)
+    registry.put(model, model_type, features, fingerprint, accuracy)
+    return model, accuracy, False
@@ -0,0 +1,176 @@
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler, StratifiedKFold
+from sklearn.naive_bayes import GaussianNB
+from sklearn.preprocessing import LabelEncoder
+from sklearn.tree import DecisionTreeClassifier
+
+ESTIMATORS = {
+    'decision_tree': DecisionTreeClassifier(random_state=42),
+    'naive_bayes': GaussianNB(),
+}
+
+PARAM_GRIDS = {
+    'decision_tree': {
+        'criterion': ['gini', 'entropy'],
+        'max_depth': [None, 3, 5, 8, 12],
+        'min_samples_leaf': [1, 5, 20],
+    },
+    'naive_bayes': {
+        'var_smoothing': [1e-9, 1e-8, 1e-7, 1e-6, 1e-5, 1e-4],
+    },
+}
+
+
+@dataclass
+class SearchResult:
+    best_model: Any
+    model_type: str
+    best_params: Dict[str, Any]
+    best_score: float
+    results: pd.DataFrame
+
+    def save(self, path: str):
+        """Persist the results table (CSV, or JSON when the path ends in .json)"""
+        if os.path.splitext(path)[1].lower() == '.json':
+            self.results.to_json(path, orient='records', indent=2)
+        else:
+            self.results.to_csv(path, index=False)
+
+
+def _fit_and_score(model_type: str, params: Dict[str, Any], X: np.ndarray,
+                   y: np.ndarray, train: np.ndarray, test: np.ndarray):
+    model = clone(ESTIMATORS[model_type]).set_params(**params)
+    start = time.perf_counter()
+    model.fit(X[train], y[train])
+    score = float((model.predict(X[test]) == y[test]).mean())
+    return score, time.perf_counter() - start
+
+
+def _candidates(model_types: Sequence[str], search: str, n_iter: int,
+                random_state: int) -> List[Dict[str, Any]]:
+    candidates = []
+    for model_type in model_types:
+        grid = PARAM_GRIDS[model_type]
+        if search == 'grid':
+            settings = list(ParameterGrid(grid))
+        else:
+            size = len(ParameterGrid(grid))
+            settings = list(ParameterSampler(grid, min(n_iter, size), random_state=random_state))
+        candidates += [{'model_type': model_type, 'params': p, 'scores': [], 'fit_seconds': 0.0,
+                        'status': 'running'} for p in settings]
+    return candidates
+
+
+def _prune_dominated(alive: List[dict], z: float = 2.0) -> None:
+    """Stop candidates whose optimistic score is below the best pessimistic one"""
+    bounds = []
+    for c in alive:
+        scores = np.array(c['scores'])
+        sem = scores.std(ddof=1) / np.sqrt(len(scores)) if len(scores) > 1 else 0.0
+        bounds.append((scores.mean() - z * sem, scores.mean() + z * sem))
+    best_lower = max(lower for lower, _ in bounds)
+    for c, (_, upper) in zip(alive, bounds):
+        if upper < best_lower:
+            c['status'] = 'pruned'
+
+
+def search_models(X: pd.DataFrame, y: pd.Series,
+                  model_types: Sequence[str] = ('decision_tree', 'naive_bayes'),
+                  search: str = 'grid', n_iter: int = 20, cv: int = 5,
+                  n_jobs: int = -1, time_budget: Optional[float] = None,
+                  early_stopping: bool = True, min_folds: int = 2,
+                  random_state: int = 42) -> SearchResult:
+    """
+    Cross-validated hyperparameter search over the supported classifiers
+
+    Folds are evaluated one round at a time, every surviving configuration
+    in parallel across all cores. After ``min_folds`` rounds, configurations
+    that are clearly dominated by the current leader are dropped, and no new
+    round starts once ``time_budget`` seconds have passed.
+
+    Args:
+        X: Features
+        y: Target
+        model_types: Estimators to search ('decision_tree', 'naive_bayes')
+        search: 'grid' for every combination, 'random' to sample ``n_iter``
+        n_iter: Samples per model type for random search
+        cv: Number of folds
+        n_jobs: Parallel workers (-1 for all cores)
+        time_budget: Optional wall-clock limit in seconds
+        early_stopping: Whether to prune dominated configurations
+        min_folds: Folds every configuration gets before it can be pruned
+        random_state: Seed for fold assignment and random search
+
+    Returns:
+        SearchResult with the best configuration refit on all data
+    """
+    if search not in ('grid', 'random'):
+        raise ValueError(f"Unknown search strategy: {search}")
+
+    le = LabelEncoder()
+    y_encoded = le.fit_transform(y)
+    X_values = np.asarray(X, dtype=np.float64)
+
+    _, class_counts = np.unique(y_encoded, return_counts=True)
+    splitter = (StratifiedKFold if class_counts.min() >= cv else KFold)(
+        n_splits=cv, shuffle=True, random_state=random_state
+    )
+    folds = list(splitter.split(X_values, y_encoded))
+
+    candidates = _candidates(model_types, search, n_iter, random_state)
+    deadline = time.monotonic() + time_budget if time_budget else None
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for fold_number, (train, test) in enumerate(folds, start=1):
+            alive = [c for c in candidates if c['status'] == 'running']
+            if not alive:
+                break
+            if deadline is not None and time.monotonic() > deadline and fold_number > 1:
+                for c in alive:
+                    c['status'] = 'timeout'
+                break
+
+            outcomes = parallel(
+                delayed(_fit_and_score)(c['model_type'], c['params'], X_values, y_encoded, train, test)
+                for c in alive
+            )
+            for c, (score, seconds) in zip(alive, outcomes):
+                c['scores'].append(score)
+                c['fit_seconds'] += seconds
+
+            if early_stopping and fold_number >= min_folds and fold_number < cv:
+                _prune_dominated(alive)
+
+    for c in candidates:
+        if c['status'] == 'running':
+            c['status'] = 'complete'
+
+    results = pd.DataFrame([{
+        'model_type': c['model_type'],
+        'params': json.dumps(c['params'], sort_keys=True),
+        'mean_score': float(np.mean(c['scores'])),
+        'std_score': float(np.std(c['scores'])),
+        'folds': len(c['scores']),
+        'status': c['status'],
+        'fit_seconds': c['fit_seconds'],
+    } for c in candidates])
+    # Rank fully evaluated configurations ahead of pruned or cut-off ones
+    results = results.sort_values(['folds', 'mean_score'], ascending=False, ignore_index=True)
+    results.insert(0, 'rank', range(1, len(results) + 1))
+
+    best = results.iloc[0]
+    best_params = json.loads(best['params'])
+    model = clone(ESTIMATORS[best['model_type']]).set_params(**best_params)
+    model.fit(X, y_encoded)
+    model.label_encoder_ = le
+
+    return SearchResult(model, best['model_type'], best_params, float(best['mean_score']), results)
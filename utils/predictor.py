@@ -0,0 +1,136 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from database.aggregates import bulk_load
+from database.connection import transaction
+from database.db_operations import fetch_student_rows
+from database.importer import CSV_COLUMN_MAP
+from utils.metrics import span
+
+DEFAULT_BATCH_SIZE = 50_000
+
+
+@dataclass
+class PredictionResult:
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+
+def model_features(model: Any, features: Optional[Sequence[str]] = None) -> List[str]:
+    """Feature columns a fitted model expects"""
+    if features is not None:
+        return list(features)
+    preprocessor = getattr(model, 'preprocessor_', None)
+    if preprocessor is not None:
+        return preprocessor.input_columns
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        raise ValueError("Model was fitted without column names; pass features explicitly")
+    return [str(name) for name in names]
+
+
+def predict_categories(model: Any, df: pd.DataFrame,
+                       features: Optional[Sequence[str]] = None) -> np.ndarray:
+    """
+    Predict performance categories for every row of a DataFrame
+
+    Args:
+        model: Estimator returned by train_model (carries its label_encoder_)
+        df: Student data containing at least the model's feature columns
+        features: Feature columns, when the model does not record them
+
+    Returns:
+        Array of category labels aligned with ``df``
+    """
+    columns = model_features(model, features)
+    X = df[columns]
+    preprocessor = getattr(model, 'preprocessor_', None)
+    if preprocessor is not None:
+        # Every row gets a prediction, so missing values are filled, never dropped
+        X = preprocessor.transform(X, drop_missing=False)
+    with span('model.predict', model_type=type(model).__name__, rows=len(X)):
+        codes = model.predict(X)
+    encoder = getattr(model, 'label_encoder_', None)
+    return encoder.inverse_transform(codes) if encoder is not None else codes
+
+
+def predict_csv(model: Any, file_path: str, output_path: str,
+                chunksize: int = DEFAULT_BATCH_SIZE,
+                features: Optional[Sequence[str]] = None,
+                progress: Optional[Callable[[int], None]] = None) -> PredictionResult:
+    """
+    Score a CSV file chunk by chunk, writing it back out with a
+    ``predicted_category`` column. Memory use is bounded by ``chunksize``.
+    """
+    start = time.perf_counter()
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(file_path, chunksize=chunksize)):
+        frame = chunk.rename(columns=CSV_COLUMN_MAP)
+        chunk['predicted_category'] = predict_categories(model, frame, features)
+        chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows)
+    return PredictionResult(rows, time.perf_counter() - start)
+
+
+def score_students(model: Any, where: Optional[str] = None, params: Sequence = (),
+                   batch_size: int = DEFAULT_BATCH_SIZE,
+                   features: Optional[Sequence[str]] = None,
+                   progress: Optional[Callable[[int], None]] = None) -> PredictionResult:
+    """
+    Predict categories for students in the database and store them
+
+    Students are read in student_id order one batch at a time (keyset
+    pagination, so memory stays constant) and their performance_category
+    is rewritten by a single executemany inside one transaction. The
+    per-row triggers are suspended (see database.aggregates.bulk_load), so
+    the chart aggregates are rebuilt and the data version bumped once.
+
+    Args:
+        model: Estimator returned by train_model
+        where: Optional SQL condition selecting the students to score
+        params: Values bound to the placeholders in ``where``
+        batch_size: Number of students predicted per batch
+        features: Feature columns, when the model does not record them
+        progress: Optional callback receiving the number of students scored
+
+    Returns:
+        PredictionResult with the number of students updated
+    """
+    columns = model_features(model, features)
+    select_columns = ['student_id'] + [c for c in columns if c != 'student_id']
+    condition = "student_id > ?" + (f" AND ({where})" if where else "")
+
+    start = time.perf_counter()
+    rows = 0
+
+    def updates():
+        nonlocal rows
+        last_id = -2**63
+        while True:
+            page = fetch_student_rows(select_columns, condition, (last_id,) + tuple(params),
+                                      order_by='student_id', limit=batch_size)
+            if not page:
+                return
+            df = pd.DataFrame.from_records(page, columns=select_columns)
+            predicted = predict_categories(model, df, columns)
+            yield from zip(predicted.tolist(), df['student_id'].tolist())
+            rows += len(df)
+            last_id = page[-1][0]
+            if progress is not None:
+                progress(rows)
+
+    # Categories are not part of the row hashes, so they stay valid
+    with transaction() as conn, bulk_load(conn, rehash=False):
+        conn.executemany("UPDATE students SET performance_category = ? WHERE student_id = ?",
+                         updates())
+    return PredictionResult(rows, time.perf_counter() - start)
@@ -0,0 +1,598 @@
+"""
+Report generation and streaming export
+
+A report is a list of sections, each a table whose rows come from SQL
+aggregates (GROUP BY queries answered from the students indexes) or, for
+the student listing, from a keyset-paginated scan. Section rows are
+produced lazily and written straight to the output file, so exporting a
+district-wide report holds one page of students, and for PDF one rendered
+page, in memory at a time:
+
+* CSV: csv.writer, written in chunks of CSV_CHUNK_ROWS rows
+* Excel: openpyxl's write-only workbook, one sheet per section
+* PDF: matplotlib's PdfPages, one page of monospaced text at a time
+
+generate_school_reports() writes one report per school (location) in a
+pool of worker processes.
+"""
+import csv
+import math
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from database.connection import configure, connection, get_pool
+from database.db_operations import fetch_student_rows
+from database.models import STUDENT_CATEGORICAL_COLUMNS, STUDENT_DTYPES
+from utils import metrics
+from utils.metrics import span
+
+# Command-line name -> report type
+REPORT_NAMES = {'summary': "Performance Summary", 'statistics': "Student Statistics",
+                'model': "Model Analysis"}
+REPORT_TYPES = list(REPORT_NAMES.values())
+
+# Export combo box entries -> file extension
+EXPORT_FORMATS = {"PDF": 'pdf', "Excel": 'xlsx', "CSV": 'csv'}
+
+NUMERIC_COLUMNS = [c for c, dtype in STUDENT_DTYPES.items() if dtype == 'int64' and c != 'student_id']
+LISTING_COLUMNS = ['student_id', 'name', 'gender', 'age', 'location', 'studytime',
+                   'failures', 'absences', 'score', 'performance_category']
+
+LISTING_PAGE_SIZE = 5_000
+CSV_CHUNK_ROWS = 5_000
+EXCEL_MAX_ROWS = 1_048_576
+PDF_PAGE_SIZE = (8.27, 11.69)  # A4 portrait, inches
+PDF_LINES_PER_PAGE = 70
+PDF_MAX_COLUMN_WIDTH = 24
+PREVIEW_ROWS = 8
+PDF_FONT = {'pdf.use14corefonts': True, 'font.family': 'monospace', 'font.monospace': ['Courier', 'DejaVu Sans Mono']}
+
+
+@dataclass
+class ReportSection:
+    """One table of a report; ``rows`` is called once per export and may stream"""
+    title: str
+    columns: List[str]
+    rows: Callable[[], Iterable[tuple]]
+
+
+@dataclass
+class Report:
+    title: str
+    scope: str
+    sections: List[ReportSection]
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def heading(self) -> List[str]:
+        return [self.title, self.scope,
+                f"Generated {time.strftime('%Y-%m-%d %H:%M', time.localtime(self.created_at))}"]
+
+    def preview(self, max_rows: int = PREVIEW_ROWS) -> str:
+        """Text rendering of the first ``max_rows`` rows of every section"""
+        parts = ["\n".join(self.heading)]
+        for section in self.sections:
+            rows = iter(section.rows())
+            try:
+                head = list(islice(rows, max_rows + 1))
+            finally:
+                getattr(rows, 'close', lambda: None)()
+            parts.append(_text_table(section, head[:max_rows], more=len(head) > max_rows))
+        return "\n\n".join(parts)
+
+
+@dataclass
+class ReportResult:
+    path: str
+    rows: int
+    seconds: float
+    preview: str = ""
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+
+# Sections
+
+def _query(sql: str, params: Sequence = ()) -> List[tuple]:
+    with connection() as conn:
+        return conn.execute(sql, tuple(params)).fetchall()
+
+
+def _from(location: Optional[str]) -> Tuple[str, tuple]:
+    """FROM clause, restricted to one school when ``location`` is given, and its parameters"""
+    if location:
+        return "FROM students WHERE location = ?", (location,)
+    return "FROM students", ()
+
+
+def _stdev(mean: Optional[float], mean_of_squares: Optional[float]) -> Optional[float]:
+    if mean is None:
+        return None
+    return math.sqrt(max(mean_of_squares - mean * mean, 0.0))
+
+
+def _share(count: int, total: int) -> float:
+    return round(100 * count / total, 2) if total else 0.0
+
+
+def _overview_section(location):
+    def rows():
+        source, params = _from(location)
+        n, mean, low, high, squares, absences, failures = _query(
+            "SELECT COUNT(*), AVG(score), MIN(score), MAX(score), AVG(score * score), "
+            f"AVG(absences), AVG(failures) {source}", params
+        )[0]
+        return [("Students", n), ("Mean score", mean), ("Score std dev", _stdev(mean, squares)),
+                ("Lowest score", low), ("Highest score", high),
+                ("Mean absences", absences), ("Mean failures", failures)]
+    return ReportSection("Overview", ["Measure", "Value"], rows)
+
+
+def _category_section(location):
+    def rows():
+        source, params = _from(location)
+        groups = _query(
+            "SELECT performance_category, COUNT(*), AVG(score), MIN(score), MAX(score) "
+            f"{source} GROUP BY performance_category ORDER BY MIN(score)", params
+        )
+        total = sum(g[1] for g in groups)
+        return [(category, n, _share(n, total), mean, low, high)
+                for category, n, mean, low, high in groups]
+    return ReportSection("Performance categories",
+                         ["Category", "Students", "Share (%)", "Mean score", "Lowest", "Highest"], rows)
+
+
+def _group_section(title, column, location):
+    def rows():
+        source, params = _from(location)
+        return _query(
+            f"SELECT {column}, COUNT(*), AVG(score), MIN(score), MAX(score), AVG(absences) "
+            f"{source} GROUP BY {column} ORDER BY {column}", params
+        )
+    return ReportSection(title, [column.title(), "Students", "Mean score", "Lowest", "Highest",
+                                 "Mean absences"], rows)
+
+
+def _numeric_section(location):
+    def rows():
+        source, params = _from(location)
+        # One pass over the table for every column's statistics
+        stats = ", ".join(f"COUNT({c}), AVG({c}), MIN({c}), MAX({c}), AVG({c} * {c})"
+                          for c in NUMERIC_COLUMNS)
+        values = _query(f"SELECT {stats} {source}", params)[0]
+        result = []
+        for i, column in enumerate(NUMERIC_COLUMNS):
+            n, mean, low, high, squares = values[5 * i:5 * i + 5]
+            result.append((column, n, mean, _stdev(mean, squares), low, high))
+        return result
+    return ReportSection("Numeric attributes",
+                         ["Attribute", "Count", "Mean", "Std dev", "Min", "Max"], rows)
+
+
+def _categorical_section(location):
+    def rows():
+        source, params = _from(location)
+        for column in STUDENT_CATEGORICAL_COLUMNS:
+            groups = _query(f"SELECT {column}, COUNT(*), AVG(score) {source} "
+                            f"GROUP BY {column} ORDER BY {column}", params)
+            total = sum(g[1] for g in groups)
+            for value, n, mean in groups:
+                yield column, value, n, _share(n, total), mean
+    return ReportSection("Categorical attributes",
+                         ["Attribute", "Value", "Students", "Share (%)", "Mean score"], rows)
+
+
+def _listing_section(location):
+    def rows():
+        # Keyset pages: one page in memory and no read transaction held
+        # while the exporter writes
+        condition = "student_id > ?" + (" AND location = ?" if location else "")
+        last_id = -2**63
+        while True:
+            page = fetch_student_rows(LISTING_COLUMNS, condition,
+                                      (last_id,) + ((location,) if location else ()),
+                                      order_by='student_id', limit=LISTING_PAGE_SIZE)
+            if not page:
+                return
+            yield from page
+            last_id = page[-1][0]
+    return ReportSection("Students", LISTING_COLUMNS, rows)
+
+
+def _model_section(model, accuracy):
+    from utils.predictor import model_features
+
+    def rows():
+        result = [("Model type", type(model).__name__),
+                  ("Input features", ", ".join(model_features(model)))]
+        if accuracy is not None:
+            result.append(("Test accuracy (%)", round(100 * accuracy, 2)))
+        encoder = getattr(model, 'label_encoder_', None)
+        if encoder is not None:
+            result.append(("Categories", ", ".join(str(c) for c in encoder.classes_)))
+        return result
+    return ReportSection("Model", ["Property", "Value"], rows)
+
+
+def _importance_section(model):
+    def rows():
+        preprocessor = getattr(model, 'preprocessor_', None)
+        if preprocessor is not None:
+            names = preprocessor.feature_names_out_
+        else:
+            from utils.predictor import model_features
+            names = model_features(model)
+        ranked = sorted(zip(names, model.feature_importances_), key=lambda p: p[1], reverse=True)
+        return [(name, float(importance)) for name, importance in ranked]
+    return ReportSection("Feature importance", ["Feature", "Importance"], rows)
+
+
+def _feature_means_section(model, location):
+    from utils.predictor import model_features
+
+    features = [f for f in model_features(model) if f in NUMERIC_COLUMNS]
+
+    def rows():
+        source, params = _from(location)
+        means = "".join(f", AVG({f})" for f in features)
+        return _query(f"SELECT performance_category, COUNT(*){means} {source} "
+                      "GROUP BY performance_category ORDER BY MIN(score)", params)
+    return ReportSection("Feature means by category", ["Category", "Students"] + features, rows)
+
+
+def _agreement_section(model, location):
+    def rows():
+        # Predicted batch by batch, so only the counts outlive a batch
+        from database.db_operations import iter_students_frames
+        from utils.predictor import model_features, predict_categories
+
+        counts = Counter()
+        columns = model_features(model) + ['performance_category']
+        where, params = ("location = ?", (location,)) if location else (None, ())
+        for frame in iter_students_frames(columns, where, params):
+            predicted = predict_categories(model, frame)
+            counts.update(zip(frame['performance_category'].tolist(), predicted.tolist()))
+        totals = Counter()
+        for (stored, _), n in counts.items():
+            totals[stored] += n
+        result = [(stored, predicted, n, _share(n, totals[stored]))
+                  for (stored, predicted), n in sorted(counts.items(), key=lambda p: str(p[0]))]
+        matches = sum(n for (stored, predicted), n in counts.items() if stored == predicted)
+        result.append(("All", "(agreement)", matches, _share(matches, sum(totals.values()))))
+        return result
+    return ReportSection("Stored vs predicted categories",
+                         ["Stored", "Predicted", "Students", "Share of stored (%)"], rows)
+
+
+def build_report(report_type: str, location: Optional[str] = None,
+                 model: Any = None, accuracy: Optional[float] = None) -> Report:
+    """
+    Describe a report; no data is read until it is exported or previewed
+
+    Args:
+        report_type: One of REPORT_TYPES
+        location: Restrict the report to one school (location)
+        model: Fitted model, required for "Model Analysis"
+        accuracy: The model's held-out accuracy, shown when given
+
+    Raises:
+        ValueError: Unknown report type, or "Model Analysis" without a model
+    """
+    if report_type == "Performance Summary":
+        sections = [_overview_section(location), _category_section(location),
+                    _group_section("By gender", 'gender', location)]
+        if location is None:
+            sections.append(_group_section("By school", 'location', location))
+    elif report_type == "Student Statistics":
+        sections = [_numeric_section(location), _categorical_section(location),
+                    _listing_section(location)]
+    elif report_type == "Model Analysis":
+        if model is None:
+            raise ValueError("Model Analysis needs a trained model; run an analysis first")
+        sections = [_model_section(model, accuracy)]
+        if hasattr(model, 'feature_importances_'):
+            sections.append(_importance_section(model))
+        sections += [_feature_means_section(model, location), _agreement_section(model, location)]
+    else:
+        raise ValueError(f"Unknown report type: {report_type}")
+    scope = f"School: {location}" if location else "All schools"
+    return Report(report_type, scope, sections)
+
+
+# Export
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def _cells(row: Sequence) -> list:
+    """Spreadsheet values: numbers stay numbers, floats are rounded"""
+    return [round(v, 4) if type(v) is float else v for v in row]
+
+
+def _column_widths(columns: Sequence[str], rows: Sequence[tuple]) -> List[int]:
+    widths = [len(c) for c in columns]
+    for row in rows:
+        widths = [max(w, len(_text(v))) for w, v in zip(widths, row)]
+    # The last column is never padded, so it may run to the end of the line
+    return [min(w, PDF_MAX_COLUMN_WIDTH) for w in widths[:-1]] + widths[-1:]
+
+
+def _text_line(values: Sequence[str], widths: Sequence[int]) -> str:
+    return "  ".join(v[:w].ljust(w) for v, w in zip(values, widths)).rstrip()
+
+
+def _text_table(section: ReportSection, rows: Sequence[tuple], more: bool = False) -> str:
+    widths = _column_widths(section.columns, rows)
+    lines = [section.title, _text_line(section.columns, widths)]
+    lines += [_text_line([_text(v) for v in row], widths) for row in rows]
+    if not rows:
+        lines.append("(no rows)")
+    elif more:
+        lines.append("...")
+    return "\n".join(lines)
+
+
+class _Tracker:
+    """Counts exported rows and keeps each section's first rows for the preview"""
+
+    def __init__(self, report: Report, preview_rows: int,
+                 progress: Optional[Callable[[int], None]] = None):
+        self.report = report
+        self.preview_rows = preview_rows
+        self.progress = progress
+        self.rows = 0
+        self.heads: List[Tuple[ReportSection, List[tuple], bool]] = []
+
+    def sections(self) -> Iterator[Tuple[ReportSection, Iterator[tuple]]]:
+        for section in self.report.sections:
+            yield section, self._rows(section)
+
+    def _rows(self, section: ReportSection) -> Iterator[tuple]:
+        head, more = [], False
+        try:
+            for i, row in enumerate(section.rows()):
+                if i < self.preview_rows:
+                    head.append(row)
+                else:
+                    more = True
+                self.rows += 1
+                if self.progress is not None and self.rows % LISTING_PAGE_SIZE == 0:
+                    self.progress(self.rows)
+                yield row
+        finally:
+            self.heads.append((section, head, more))
+
+    def preview(self) -> str:
+        parts = ["\n".join(self.report.heading)]
+        parts += [_text_table(section, head, more) for section, head, more in self.heads]
+        return "\n\n".join(parts)
+
+
+def _write_csv(report: Report, path: str, tracker: _Tracker):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerows([line] for line in report.heading)
+        for section, rows in tracker.sections():
+            writer.writerows([[], [section.title], section.columns])
+            while True:
+                chunk = [_cells(row) for row in islice(rows, CSV_CHUNK_ROWS)]
+                if not chunk:
+                    break
+                writer.writerows(chunk)
+
+
+def _write_excel(report: Report, path: str, tracker: _Tracker):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ValueError("Excel export needs openpyxl (pip install openpyxl)") from None
+
+    # Write-only mode streams rows to the file instead of keeping cell objects
+    workbook = Workbook(write_only=True)
+    cover = workbook.create_sheet("Report")
+    for line in report.heading:
+        cover.append([line])
+    for section, rows in tracker.sections():
+        cover.append([])
+        cover.append([section.title])
+        sheet, part, used = None, 1, EXCEL_MAX_ROWS
+        for row in rows:
+            if used == EXCEL_MAX_ROWS:
+                # Sections longer than a worksheet continue on another sheet
+                name = section.title if part == 1 else f"{section.title} ({part})"
+                sheet = workbook.create_sheet(name[:31])
+                sheet.append(section.columns)
+                part, used = part + 1, 1
+            sheet.append(_cells(row))
+            used += 1
+        if sheet is None:
+            workbook.create_sheet(section.title[:31]).append(section.columns)
+    workbook.save(path)
+
+
+def _write_pdf(report: Report, path: str, tracker: _Tracker):
+    # A bare Figure renders without pyplot, so no GUI backend is involved
+    from matplotlib import rc_context
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    page_lines: List[Tuple[str, bool]] = []
+
+    def flush(pdf):
+        if not page_lines:
+            return
+        figure = Figure(figsize=PDF_PAGE_SIZE)
+        width = max(len(text) for text, _ in page_lines)
+        # Shrink the type for wide tables so every column fits the page
+        size = min(8.0, 0.88 * PDF_PAGE_SIZE[0] * 72 / (0.6 * max(width, 1)))
+        step = 0.92 / PDF_LINES_PER_PAGE
+        # Runs of lines with the same weight are drawn as one text block;
+        # one artist per line makes rendering several times slower
+        start = 0
+        for end in range(1, len(page_lines) + 1):
+            if end == len(page_lines) or page_lines[end][1] != page_lines[start][1]:
+                figure.text(0.06, 0.96 - start * step,
+                            "\n".join(text for text, _ in page_lines[start:end]),
+                            fontsize=size, va='top',
+                            linespacing=step * PDF_PAGE_SIZE[1] * 72 / size,
+                            # Courier's regular face is registered as 'medium'
+                            fontweight='bold' if page_lines[start][1] else 'medium')
+                start = end
+        pdf.savefig(figure)
+        page_lines.clear()
+
+    def add(pdf, text, bold=False, header=None):
+        if len(page_lines) == PDF_LINES_PER_PAGE:
+            flush(pdf)
+            if header is not None:
+                page_lines.extend(header)
+        page_lines.append((text, bold))
+
+    # The built-in PDF Courier font is referenced, not embedded, which skips
+    # per-glyph subsetting and keeps long listings fast to render
+    with rc_context(PDF_FONT), PdfPages(path) as pdf:
+        page_lines.extend((line, i == 0) for i, line in enumerate(report.heading))
+        for section, rows in tracker.sections():
+            # Column widths come from the first page of rows
+            head = list(islice(rows, PDF_LINES_PER_PAGE))
+            widths = _column_widths(section.columns, head)
+            header = [(f"{section.title} (continued)", True),
+                      (_text_line(section.columns, widths), True)]
+            if len(page_lines) > PDF_LINES_PER_PAGE - 4:
+                flush(pdf)
+            add(pdf, "")
+            add(pdf, section.title, bold=True)
+            add(pdf, header[1][0], bold=True)
+            for row in _chain(head, rows):
+                add(pdf, _text_line([_text(v) for v in row], widths), header=header)
+        flush(pdf)
+        info = pdf.infodict()
+        info['Title'] = f"{report.title} - {report.scope}"
+
+
+def _chain(head: List[tuple], rest: Iterator[tuple]) -> Iterator[tuple]:
+    yield from head
+    yield from rest
+
+
+WRITERS = {'csv': _write_csv, 'xlsx': _write_excel, 'pdf': _write_pdf}
+
+
+def export_report(report: Report, path: str, fmt: Optional[str] = None,
+                  preview_rows: int = PREVIEW_ROWS,
+                  progress: Optional[Callable[[int], None]] = None) -> ReportResult:
+    """
+    Stream a report to a CSV, Excel (.xlsx) or PDF file
+
+    Args:
+        report: Report from build_report()
+        path: Output file
+        fmt: 'csv', 'xlsx' or 'pdf' (defaults to the file extension)
+        preview_rows: Rows per section kept for ReportResult.preview
+        progress: Optional callback receiving the number of rows written so far
+
+    Raises:
+        ValueError: Unknown format, or Excel export without openpyxl
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown report format: {fmt or path} (expected csv, xlsx or pdf)")
+    tracker = _Tracker(report, preview_rows, progress)
+    start = time.perf_counter()
+    with span('report.export', report=report.title, format=fmt) as fields:
+        try:
+            WRITERS[fmt](report, path, tracker)
+        except BaseException:
+            # Never leave a truncated report behind (e.g. after a cancelled job)
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        fields['rows'] = tracker.rows
+    return ReportResult(path, tracker.rows, time.perf_counter() - start, tracker.preview())
+
+
+# Per-school reports
+
+def school_locations() -> List[str]:
+    """Distinct school locations, read from the location index"""
+    return [row[0] for row in _query(
+        "SELECT DISTINCT location FROM students WHERE location IS NOT NULL ORDER BY location"
+    )]
+
+
+def report_filename(report_type: str, fmt: str, location: Optional[str] = None) -> str:
+    parts = [report_type] + ([location] if location else [])
+    safe = ['_'.join(''.join(c if c.isalnum() else ' ' for c in p).lower().split()) for p in parts]
+    return f"{'-'.join(safe)}.{fmt}"
+
+
+def _school_report(db_path: str, report_type: str, location: str, path: str,
+                   model: Any, accuracy: Optional[float]) -> ReportResult:
+    # Worker processes start with the default pool and must not share the
+    # parent's size-rotated metrics file
+    configure(db_path)
+    metrics.configure(None)
+    return export_report(build_report(report_type, location, model, accuracy), path, preview_rows=0)
+
+
+def generate_school_reports(report_type: str, directory: str, fmt: str = 'pdf',
+                            model: Any = None, accuracy: Optional[float] = None,
+                            max_workers: Optional[int] = None,
+                            progress: Optional[Callable[[int, int], None]] = None) -> List[ReportResult]:
+    """
+    Write one report per school into ``directory`` using worker processes
+
+    Each worker opens its own connections to the database file (SQLite in
+    WAL mode serves concurrent readers) and streams its report, so the
+    schools are read, formatted and rendered in parallel.
+
+    Args:
+        progress: Optional callback receiving (reports done, total reports);
+            an exception raised from it cancels the remaining reports
+
+    Returns:
+        One ReportResult per school, ordered by location
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown report format: {fmt} (expected csv, xlsx or pdf)")
+    if report_type == "Model Analysis" and model is None:
+        raise ValueError("Model Analysis needs a trained model; run an analysis first")
+    locations = school_locations()
+    if not locations:
+        raise ValueError("No schools to report on; import students first")
+    os.makedirs(directory, exist_ok=True)
+
+    db_path = os.path.abspath(get_pool().db_path)
+    workers = min(len(locations), max_workers or os.cpu_count() or 1)
+    results = {}
+    with span('report.schools', report=report_type, format=fmt, schools=len(locations)) as fields:
+        # spawn, not fork: the parent may be running Qt and pool threads
+        executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            futures = {
+                executor.submit(_school_report, db_path, report_type, location,
+                                os.path.join(directory, report_filename(report_type, fmt, location)),
+                                model, accuracy): location
+                for location in locations
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if progress is not None:
+                    progress(len(results), len(locations))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        fields['rows'] = sum(r.rows for r in results.values())
+    return [results[location] for location in locations]
@@ -0,0 +1,179 @@
+"""
+Segmented training: one model per school (location) or per value of any
+student column
+
+Segments are trained concurrently in a pool of worker processes. The
+parent makes sure the memory-mapped snapshot of the current data exists
+and each worker maps the same files read-only, so the students are neither
+copied nor pickled per process: a worker only touches the pages of the
+columns it needs, and those pages are shared through the OS page cache.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from database.models import STUDENT_COLUMNS
+from database.snapshot import ensure_snapshot
+from database.student_table import StudentTable
+from utils import metrics
+from utils.metrics import span
+from utils.ml_models import DEFAULT_FEATURES, train_model
+
+TARGET = 'performance_category'
+
+# Columns that identify or describe a single student, not a group of them
+NOT_SEGMENT_COLUMNS = ('student_id', 'name', 'score', TARGET)
+
+# Segments with fewer students are reported but not trained: a 20% test
+# split of a handful of rows says nothing about accuracy
+MIN_SEGMENT_ROWS = 20
+
+# More distinct values than this almost certainly means a wrong column
+MAX_SEGMENTS = 500
+
+
+@dataclass
+class SegmentedModels:
+    column: str
+    model_type: str
+    features: List[str]
+    models: Dict[Any, Any]
+    results: pd.DataFrame
+    seconds: float
+
+    @property
+    def accuracy(self) -> float:
+        """Accuracy over all trained segments, weighted by their size"""
+        trained = self.results.dropna(subset=['accuracy'])
+        if trained.empty:
+            return float('nan')
+        return float(np.average(trained['accuracy'], weights=trained['students']))
+
+    def save(self, path: str):
+        """Persist the per-segment table (CSV, or JSON when the path ends in .json)"""
+        if os.path.splitext(path)[1].lower() == '.json':
+            self.results.to_json(path, orient='records', indent=2)
+        else:
+            self.results.to_csv(path, index=False)
+
+
+def _segments(table: StudentTable, column: str) -> List[tuple]:
+    """(label, key, students) per distinct value; keys are compared with table.codes(column)"""
+    values = table.codes(column)
+    if values.dtype == np.float64:
+        # Integer column with NULLs (stored as NaN)
+        missing = np.isnan(values)
+        keys, counts = np.unique(values[~missing], return_counts=True)
+        segments = [(int(k), float(k), int(n)) for k, n in zip(keys, counts)]
+        return segments + ([(None, None, int(missing.sum()))] if missing.any() else [])
+    keys, counts = np.unique(values, return_counts=True)
+    try:
+        labels = table.categories(column)
+    except KeyError:
+        return [(k.item(), k.item(), int(n)) for k, n in zip(keys, counts)]
+    return [(labels[k] if k >= 0 else None, int(k), int(n)) for k, n in zip(keys, counts)]
+
+
+def _train_segment(directory: str, column: str, key: Any, features: List[str],
+                   model_type: str, preprocessor: Any) -> tuple:
+    # Runs in a worker process: map the shared snapshot, train on one segment
+    table = StudentTable.load(directory, [column] + features + [TARGET])
+    values = table.codes(column)
+    rows = np.flatnonzero(np.isnan(values) if key is None else values == key)
+    frame = table.to_frame(features + [TARGET]).iloc[rows]
+
+    start = time.perf_counter()
+    X, y = frame[features], frame[TARGET]
+    if preprocessor is not None:
+        X = preprocessor.transform(X)
+        y = y.loc[X.index]
+    model, accuracy = train_model(X, y, model_type)
+    if preprocessor is not None:
+        model.preprocessor_ = preprocessor
+    return model, float(accuracy), time.perf_counter() - start
+
+
+def train_segments(column: str = 'location', features: Optional[Sequence[str]] = None,
+                   model_type: str = 'decision_tree', preprocessor: Any = None,
+                   max_workers: Optional[int] = None, min_rows: int = MIN_SEGMENT_ROWS,
+                   progress: Optional[Callable[[int, int], None]] = None) -> SegmentedModels:
+    """
+    Train one model per distinct value of ``column``, segments in parallel
+
+    Args:
+        column: Student column to partition by ('location' tells schools apart)
+        features: Feature columns (defaults to DEFAULT_FEATURES, or the
+            preprocessor's input columns); ``column`` itself is left out
+        model_type: 'decision_tree' or 'naive_bayes'
+        preprocessor: Optional fitted PreprocessingPipeline applied to every segment
+        max_workers: Worker processes (defaults to one per core)
+        min_rows: Segments with fewer students are listed but not trained
+        progress: Optional callback receiving (segments done, segments to train);
+            an exception raised from it cancels the remaining segments
+
+    Returns:
+        SegmentedModels with a model and a results row per segment
+        (segment, students, accuracy, seconds); untrained segments have
+        no model and a NaN accuracy
+
+    Raises:
+        ValueError: Unknown or unsuitable column
+    """
+    if column not in STUDENT_COLUMNS or column in NOT_SEGMENT_COLUMNS:
+        raise ValueError(f"Cannot segment students by {column!r}")
+    if preprocessor is not None:
+        # The pipeline needs all of its inputs; the segment column is simply
+        # constant within each segment
+        features = list(preprocessor.input_columns)
+    else:
+        features = [f for f in (features or DEFAULT_FEATURES) if f != column]
+
+    start = time.perf_counter()
+    directory = ensure_snapshot()
+    segments = _segments(StudentTable.load(directory, [column]), column)
+    if len(segments) > MAX_SEGMENTS:
+        raise ValueError(f"{column!r} has {len(segments)} distinct values; "
+                         f"segmenting is limited to {MAX_SEGMENTS}")
+    # Largest segments first, so a big one does not start last and finish alone
+    to_train = sorted((s for s in segments if s[2] >= min_rows), key=lambda s: -s[2])
+
+    models, outcomes = {}, {}
+    with span('model.train_segments', model_type=model_type, column=column,
+              segments=len(to_train)) as fields:
+        if to_train:
+            workers = min(len(to_train), max_workers or os.cpu_count() or 1)
+            # spawn, not fork: the parent may be running Qt and pool threads
+            # Workers keep their timings in memory; the parent owns the
+            # size-rotated metrics file
+            executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                           initializer=metrics.configure, initargs=(None,))
+            try:
+                futures = {
+                    executor.submit(_train_segment, directory, column, key, features,
+                                    model_type, preprocessor): label
+                    for label, key, _ in to_train
+                }
+                for future in as_completed(futures):
+                    label = futures[future]
+                    models[label], accuracy, seconds = future.result()
+                    outcomes[label] = (accuracy, seconds)
+                    if progress is not None:
+                        progress(len(outcomes), len(to_train))
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+        fields['rows'] = sum(n for _, _, n in to_train)
+
+    results = pd.DataFrame([{
+        'segment': label,
+        'students': n,
+        'accuracy': outcomes.get(label, (np.nan, np.nan))[0],
+        'seconds': outcomes.get(label, (np.nan, np.nan))[1],
+    } for label, _, n in segments])
+    return SegmentedModels(column, model_type, features, models, results,
+                           time.perf_counter() - start)